@@ -0,0 +1,65 @@
+# commands.py
+import click
+import frappe
+from frappe.commands import pass_context, get_site
+
+
+@click.command("rebuild-dashboard-rollups")
+@pass_context
+def rebuild_dashboard_rollups(context):
+    """Recompute the dashboard rollup tables from submitted Time Entries and Legal Invoices"""
+    from law_firm.law_firm.rollups import rebuild_rollups
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        rebuild_rollups()
+        click.echo(f"Dashboard rollups rebuilt for {site}")
+    finally:
+        frappe.destroy()
+
+
+@click.command("reconcile-case-counters")
+@pass_context
+def reconcile_case_counters(context):
+    """Recompute the hour, billing, document and hearing counters of every Legal Case"""
+    from law_firm.law_firm.case_counters import reconcile_case_counters as reconcile
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        reconcile()
+        click.echo(f"Case counters reconciled for {site}")
+    finally:
+        frappe.destroy()
+
+
+@click.command("check-query-plans")
+@pass_context
+def check_query_plans(context):
+    """EXPLAIN the dashboard and report queries and fail if any falls back to a full table scan"""
+    from law_firm.law_firm.indexes import check_query_plans as find_full_scans
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        full_scans = find_full_scans()
+    finally:
+        frappe.destroy()
+
+    for scan in full_scans:
+        click.secho(f"Full scan on {scan['table']} ({scan['type']}, ~{scan['rows']} rows):\n{scan['query']}\n", fg="red")
+
+    if full_scans:
+        raise SystemExit(1)
+    click.echo("No full table scans in dashboard or report queries")
+
+
+commands = [
+    rebuild_dashboard_rollups,
+    reconcile_case_counters,
+    check_query_plans
+]
@@ -43,6 +43,86 @@ app_version = "1.0.0"
 #     }
 # }
 
+doc_events = {
+    "Legal Case": {
+        "after_insert": "law_firm.law_firm.activity.record_activity",
+        "on_update": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_submit": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_cancel": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_trash": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ]
+    },
+    "Time Entry": {
+        "on_update": "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+        "on_submit": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_cancel": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_trash": "law_firm.law_firm.dashboard_cache.invalidate_for_doc"
+    },
+    "Legal Invoice": {
+        "on_update": "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+        "on_update_after_submit": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_submit": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_cancel": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_trash": "law_firm.law_firm.dashboard_cache.invalidate_for_doc"
+    },
+    "Court Hearing": {
+        "after_insert": "law_firm.law_firm.activity.record_activity",
+        "on_update": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ],
+        "on_trash": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.client_portal.invalidate_for_doc"
+        ]
+    },
+    "Legal Document": {
+        "after_insert": "law_firm.law_firm.activity.record_activity",
+        "on_update": [
+            "law_firm.law_firm.dashboard_cache.invalidate_for_doc",
+            "law_firm.law_firm.activity.record_activity"
+        ],
+        "on_trash": "law_firm.law_firm.dashboard_cache.invalidate_for_doc"
+    },
+    "Client": {
+        "on_update": "law_firm.law_firm.client_portal.invalidate_for_doc",
+        "on_trash": "law_firm.law_firm.client_portal.invalidate_for_doc"
+    }
+}
+
 # # Scheduled Tasks
 # scheduler_events = {
 #     "daily": [
@@ -57,6 +137,23 @@ app_version = "1.0.0"
 #     ]
 # }
 
+scheduler_events = {
+    "daily": [
+        "law_firm.law_firm.invoice_aging.refresh_invoice_aging"
+    ],
+    "weekly": [
+        "law_firm.law_firm.case_counters.reconcile_case_counters"
+    ],
+    "monthly": [
+        "law_firm.law_firm.api.archive_old_documents"
+    ],
+    "cron": {
+        "*/5 * * * *": [
+            "law_firm.law_firm.hearing_reminders.dispatch_hearing_reminders"
+        ]
+    }
+}
+
 # # Authentication and authorization
 # has_permission = {
 #     "Legal Case": "law_firm.law_firm.doctype.legal_case.legal_case.has_permission",
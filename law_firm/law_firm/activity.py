@@ -0,0 +1,150 @@
+# activity.py
+"""
+Append-only Case Activity log.
+
+Doc events on the case-related doctypes append one row per meaningful change.
+Reads page through the log newest-first with a (activity_time, name) keyset
+cursor, so any page - however deep - is a single indexed range read.
+"""
+import frappe
+from frappe import _
+from frappe.utils import now, cint, get_datetime
+
+# (doctype, doc event) -> activity type recorded for it
+ACTIVITY_TYPES = {
+    ("Legal Case", "after_insert"): "Case Opened",
+    ("Legal Case", "on_update"): "Case Updated",
+    ("Legal Case", "on_cancel"): "Case Cancelled",
+    ("Time Entry", "on_submit"): "Time Logged",
+    ("Time Entry", "on_cancel"): "Time Entry Cancelled",
+    ("Legal Document", "after_insert"): "Document Added",
+    ("Legal Document", "on_update"): "Document Updated",
+    ("Court Hearing", "after_insert"): "Hearing Scheduled",
+    ("Court Hearing", "on_update"): "Hearing Updated",
+    ("Legal Invoice", "on_submit"): "Invoice Issued",
+    ("Legal Invoice", "on_cancel"): "Invoice Cancelled"
+}
+
+MAX_PAGE_SIZE = 100
+
+
+def record_activity(doc, method=None):
+    """Doc event hook: append a Case Activity row for this change"""
+    activity_type = ACTIVITY_TYPES.get((doc.doctype, method))
+    if not activity_type:
+        return
+
+    # Inserts already produced an after_insert row; skip the on_update that follows it
+    if method == "on_update" and doc.flags.in_insert:
+        return
+
+    title, subtitle = describe(doc)
+    legal_case = doc.name if doc.doctype == "Legal Case" else doc.get("legal_case")
+
+    frappe.get_doc({
+        "doctype": "Case Activity",
+        "activity_type": activity_type,
+        "activity_time": now(),
+        "user": frappe.session.user,
+        "legal_case": legal_case,
+        "client": doc.get("client") or get_case_client(legal_case),
+        "title": title,
+        "subtitle": subtitle,
+        "reference_doctype": doc.doctype,
+        "reference_name": doc.name
+    }).db_insert()
+
+def describe(doc):
+    """Title and subtitle shown for a document in the activity feed"""
+    if doc.doctype == "Legal Case":
+        return doc.case_title, f"Status: {doc.status}"
+    if doc.doctype == "Time Entry":
+        return f"{doc.activity_type} - {doc.hours} hours", f"Case: {doc.legal_case}"
+    if doc.doctype == "Legal Document":
+        return doc.document_name, f"{doc.document_type} ({doc.status})"
+    if doc.doctype == "Court Hearing":
+        return doc.hearing_title or doc.hearing_type, f"{doc.hearing_type} on {doc.hearing_date}"
+    if doc.doctype == "Legal Invoice":
+        return f"Invoice {doc.name}", f"Amount: {doc.grand_total}"
+    return doc.name, None
+
+def get_case_client(legal_case):
+    if not legal_case:
+        return None
+    return frappe.db.get_value("Legal Case", legal_case, "client")
+
+@frappe.whitelist()
+def get_case_activities(cursor=None, legal_case=None, client=None, user=None, limit=20):
+    """
+    Get a page of firm activity, newest first.
+    Pass the returned next_cursor back to fetch the following page.
+    """
+    frappe.has_permission("Case Activity", throw=True)
+    # The log is read with raw SQL, so a case or client filter needs read access to that record
+    if legal_case:
+        frappe.has_permission("Legal Case", "read", legal_case, throw=True)
+    if client:
+        frappe.has_permission("Client", "read", client, throw=True)
+    return get_activity_page(cursor=cursor, legal_case=legal_case, client=client, user=user, limit=limit)
+
+def get_activity_page(cursor=None, legal_case=None, client=None, user=None, since=None, limit=20):
+    """Read one keyset page of the activity log"""
+    limit = min(max(cint(limit), 1), MAX_PAGE_SIZE)
+    conditions = []
+    values = {"limit": limit + 1}
+
+    for fieldname, value in (("legal_case", legal_case), ("client", client), ("user", user)):
+        if value:
+            conditions.append(f"{fieldname} = %({fieldname})s")
+            values[fieldname] = value
+
+    if since:
+        conditions.append("activity_time >= %(since)s")
+        values["since"] = since
+
+    if cursor:
+        cursor_time, cursor_name = parse_cursor(cursor)
+        conditions.append("""(activity_time < %(cursor_time)s
+            OR (activity_time = %(cursor_time)s AND name < %(cursor_name)s))""")
+        values.update({"cursor_time": cursor_time, "cursor_name": cursor_name})
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = frappe.db.sql(f"""
+        SELECT name, activity_type, activity_time, user, legal_case, client,
+            title, subtitle, reference_doctype, reference_name
+        FROM `tabCase Activity`
+        {where}
+        ORDER BY activity_time DESC, name DESC
+        LIMIT %(limit)s
+    """, values, as_dict=True)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "activities": [format_activity(row) for row in rows],
+        "next_cursor": make_cursor(rows[-1]) if has_more else None
+    }
+
+def format_activity(row):
+    """Shape a log row like the entries the dashboard feed has always returned"""
+    return {
+        "type": row.activity_type,
+        "title": row.title,
+        "subtitle": row.subtitle,
+        "user": row.user,
+        "timestamp": row.activity_time,
+        "legal_case": row.legal_case,
+        "client": row.client,
+        "link": f"/app/{frappe.scrub(row.reference_doctype).replace('_', '-')}/{row.reference_name}"
+    }
+
+def make_cursor(row):
+    return f"{row.activity_time}|{row.name}"
+
+def parse_cursor(cursor):
+    try:
+        cursor_time, cursor_name = cursor.split("|", 1)
+        return get_datetime(cursor_time), cursor_name
+    except ValueError:
+        frappe.throw(_("Invalid activity cursor"))
@@ -1,32 +1,55 @@
 # api.py
 import frappe
 from frappe import _
-from frappe.utils import now, today, add_days, get_datetime
+from frappe.utils import today, add_days, add_months, get_first_day, cint
 import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from law_firm.law_firm.dashboard_cache import get_cached_section, invalidate_sections, SECTION_DEPENDENCIES
+from law_firm.law_firm.activity import get_activity_page
+from law_firm.law_firm.time_entry_ingest import insert_time_entries
+from law_firm.law_firm.timeline import get_timeline_page
+from law_firm.law_firm.client_portal import get_portal_data, invalidate_all_client_portals
+from law_firm.law_firm.lead_conversion import find_existing_client, create_client, create_case
+from law_firm.law_firm.hearing_reminders import dispatch_hearing_reminders
+from law_firm.law_firm.batch_jobs import run_batch_job, run_single_step_job, keyset_chunks, update_chunks
+from law_firm.law_firm.deadlines import CLOSED_CASE_STATUSES, cancel_deadlines
+from law_firm.law_firm.case_archive import ARCHIVE_CONDITIONS, ARCHIVE_CHUNK_SIZE, get_archive_values, archive_cases
 
 @frappe.whitelist()
 def get_law_firm_dashboard():
     """Get comprehensive dashboard data for law firm"""
     return {
-        "summary_cards": get_summary_cards(),
-        "case_statistics": get_case_statistics(),
-        "billing_overview": get_billing_overview(),
-        "recent_activities": get_recent_activities(),
-        "upcoming_deadlines": get_upcoming_deadlines(),
-        "team_productivity": get_team_productivity()
+        section: get_cached_section(section, compute)
+        for section, compute in DASHBOARD_SECTIONS.items()
     }
 
 def get_summary_cards():
     """Get summary statistics for dashboard cards"""
+    # Three round trips: the record counts, this month's time totals and this month's revenue
+    counts = get_summary_counts()
+    time_totals = get_monthly_time_totals()
+
     return {
-        "total_clients": frappe.db.count("Client", {"status": "Active"}),
-        "active_cases": frappe.db.count("Legal Case", {"status": ["in", ["Open", "In Progress"]]}),
-        "pending_invoices": frappe.db.count("Legal Invoice", {"status": "Unpaid"}),
+        "total_clients": counts.total_clients,
+        "active_cases": counts.active_cases,
+        "pending_invoices": counts.pending_invoices,
         "total_revenue_this_month": get_monthly_revenue(),
-        "billable_hours_this_month": get_monthly_billable_hours(),
-        "team_utilization": get_team_utilization()
+        "billable_hours_this_month": time_totals.billable_hours,
+        "team_utilization": get_team_utilization(time_totals.total_hours, counts.attorney_count)
     }
 
+def get_summary_counts():
+    """Count active clients, open cases, unpaid invoices and attorneys in one statement"""
+    return frappe.db.sql("""
+        SELECT
+            (SELECT COUNT(*) FROM `tabClient` WHERE status = 'Active') as total_clients,
+            (SELECT COUNT(*) FROM `tabLegal Case` WHERE status IN ('Open', 'In Progress')) as active_cases,
+            (SELECT COUNT(*) FROM `tabLegal Invoice` WHERE status = 'Unpaid') as pending_invoices,
+            (SELECT COUNT(*) FROM `tabUser` WHERE role_profile_name = 'Attorney') as attorney_count
+    """, as_dict=True)[0]
+
 def get_case_statistics():
     """Get case statistics by practice area and status"""
     # Cases by practice area
@@ -53,30 +76,33 @@ def get_case_statistics():
 
 def get_billing_overview():
     """Get billing overview for the firm"""
-    # Monthly billing trends
+    # Half-open window on the bare date column so the range can use its index
+    window = {"from_date": add_months(today(), -12), "to_date": add_days(today(), 1)}
+
+    # Monthly billing trends, read from the daily invoice rollup
     monthly_billing = frappe.db.sql("""
         SELECT 
-            MONTH(posting_date) as month,
-            YEAR(posting_date) as year,
-            SUM(total_amount) as total_billed,
-            SUM(outstanding_amount) as outstanding
-        FROM `tabLegal Invoice`
-        WHERE posting_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-        GROUP BY YEAR(posting_date), MONTH(posting_date)
-        ORDER BY year, month
-    """, as_dict=True)
+            MONTH(r.month) as month,
+            YEAR(r.month) as year,
+            SUM(r.total_billed) as total_billed,
+            SUM(r.outstanding) as outstanding
+        FROM `tabLegal Invoice Rollup` r
+        WHERE r.rollup_date >= %(from_date)s AND r.rollup_date < %(to_date)s
+        GROUP BY r.month
+        ORDER BY r.month
+    """, window, as_dict=True)
     
     # Top billing clients
     top_clients = frappe.db.sql("""
         SELECT 
             client,
-            SUM(total_amount) as total_billed
-        FROM `tabLegal Invoice`
-        WHERE posting_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
+            SUM(total_billed) as total_billed
+        FROM `tabLegal Invoice Rollup`
+        WHERE rollup_date >= %(from_date)s AND rollup_date < %(to_date)s
         GROUP BY client
         ORDER BY total_billed DESC
         LIMIT 10
-    """, as_dict=True)
+    """, window, as_dict=True)
     
     return {
         "monthly_trends": monthly_billing,
@@ -87,207 +113,183 @@ def get_billing_overview():
 def get_monthly_revenue():
     """Calculate total revenue for current month"""
     result = frappe.db.sql("""
-        SELECT SUM(total_amount) as revenue
-        FROM `tabLegal Invoice`
-        WHERE MONTH(posting_date) = MONTH(CURDATE())
-        AND YEAR(posting_date) = YEAR(CURDATE())
-        AND docstatus = 1
-    """)[0][0]
+        SELECT SUM(total_billed) as revenue
+        FROM `tabLegal Invoice Rollup`
+        WHERE month = %s
+    """, get_first_day(today()))[0][0]
     
     return result or 0
 
+def get_monthly_time_totals():
+    """Total and billable hours for current month, read in a single pass over the rollup"""
+    # Non-billable entries carry zero billable_hours, so the rollup sum is exact
+    return frappe.db.sql("""
+        SELECT
+            IFNULL(SUM(hours), 0) as total_hours,
+            IFNULL(SUM(billable_hours), 0) as billable_hours
+        FROM `tabTime Entry Rollup`
+        WHERE month = %s
+    """, get_first_day(today()), as_dict=True)[0]
+
 def get_monthly_billable_hours():
     """Calculate billable hours for current month"""
-    result = frappe.db.sql("""
-        SELECT SUM(billable_hours) as hours
-        FROM `tabTime Entry`
-        WHERE MONTH(activity_date) = MONTH(CURDATE())
-        AND YEAR(activity_date) = YEAR(CURDATE())
-        AND billable = 1
-        AND docstatus = 1
-    """)[0][0]
-    
-    return result or 0
+    return get_monthly_time_totals().billable_hours
 
-def get_team_utilization():
+def get_team_utilization(total_hours=None, attorney_count=None):
     """Calculate team utilization percentage"""
     # This is a simplified calculation
     # In reality, you'd want more sophisticated utilization tracking
-    total_hours = frappe.db.sql("""
-        SELECT SUM(hours) as total
-        FROM `tabTime Entry`
-        WHERE MONTH(activity_date) = MONTH(CURDATE())
-        AND YEAR(activity_date) = YEAR(CURDATE())
-        AND docstatus = 1
-    """)[0][0] or 0
+    if total_hours is None:
+        total_hours = get_monthly_time_totals().total_hours
     
     # Assuming 8 hours/day * 22 working days * number of attorneys
-    attorney_count = frappe.db.count("User", {"role_profile_name": "Attorney"})
+    if attorney_count is None:
+        attorney_count = frappe.db.count("User", {"role_profile_name": "Attorney"})
     expected_hours = attorney_count * 8 * 22
     
     return (total_hours / expected_hours * 100) if expected_hours > 0 else 0
 
 def get_recent_activities():
     """Get recent activities across the firm"""
-    activities = []
-    
-    # Recent case updates
-    recent_cases = frappe.get_all("Legal Case",
-        filters={"modified": [">=", add_days(today(), -7)]},
-        fields=["name", "case_title", "status", "modified", "modified_by"],
-        order_by="modified desc",
-        limit=10
-    )
-    
-    for case in recent_cases:
-        activities.append({
-            "type": "Case Updated",
-            "title": case.case_title,
-            "subtitle": f"Status: {case.status}",
-            "user": case.modified_by,
-            "timestamp": case.modified,
-            "link": f"/app/legal-case/{case.name}"
-        })
-    
-    # Recent time entries
-    recent_time = frappe.get_all("Time Entry",
-        filters={"activity_date": [">=", add_days(today(), -7)]},
-        fields=["legal_case", "activity_type", "hours", "employee", "activity_date"],
-        order_by="activity_date desc",
-        limit=10
-    )
-    
-    for entry in recent_time:
-        activities.append({
-            "type": "Time Logged",
-            "title": f"{entry.activity_type} - {entry.hours} hours",
-            "subtitle": f"Case: {entry.legal_case}",
-            "user": entry.employee,
-            "timestamp": entry.activity_date,
-            "link": "#"
-        })
-    
-    # Sort by timestamp and return latest 20
-    activities.sort(key=lambda x: x["timestamp"], reverse=True)
-    return activities[:20]
+    # Latest 20 entries of the last week from the Case Activity log
+    return get_activity_page(since=add_days(today(), -7), limit=20)["activities"]
 
 def get_upcoming_deadlines():
     """Get upcoming deadlines and important dates"""
-    deadlines = []
-    
-    # Statute of limitations approaching
-    sol_cases = frappe.get_all("Legal Case",
-        filters={
-            "statute_of_limitations": ["between", [today(), add_days(today(), 60)]],
-            "status": ["!=", "Closed"]
-        },
-        fields=["name", "case_title", "statute_of_limitations", "client"],
-        order_by="statute_of_limitations asc"
-    )
-    
-    for case in sol_cases:
-        deadlines.append({
-            "type": "Statute of Limitations",
-            "title": case.case_title,
-            "date": case.statute_of_limitations,
-            "client": case.client,
-            "priority": "High",
-            "link": f"/app/legal-case/{case.name}"
-        })
-    
-    # Upcoming hearings
-    hearings = frappe.get_all("Court Hearing",
-        filters={
-            "hearing_date": ["between", [now(), add_days(now(), 30)]],
-            "status": ["!=", "Completed"]
-        },
-        fields=["name", "hearing_type", "hearing_date", "legal_case"],
-        order_by="hearing_date asc"
-    )
-    
-    for hearing in hearings:
-        deadlines.append({
-            "type": "Court Hearing",
-            "title": f"{hearing.hearing_type}",
-            "date": hearing.hearing_date,
-            "case": hearing.legal_case,
-            "priority": "Medium",
-            "link": f"/app/court-hearing/{hearing.name}"
-        })
-    
-    return sorted(deadlines, key=lambda x: x["date"])[:15]
+    # Statutes of limitations within 60 days and hearings within 30 days, from the deadline calendar.
+    # Hearings have one calendar row per attending attorney, hence the DISTINCT.
+    deadlines = frappe.db.sql("""
+        SELECT DISTINCT deadline_type, title, deadline_date, deadline_time, priority,
+            legal_case, client, reference_doctype, reference_name
+        FROM `tabCase Deadline`
+        WHERE deadline_date >= %(today)s AND deadline_date < %(sol_until)s
+        AND status = 'Active'
+        AND (deadline_type = 'Statute of Limitations' OR deadline_date < %(hearing_until)s)
+        ORDER BY deadline_date, deadline_time
+        LIMIT 15
+    """, {
+        "today": today(),
+        "sol_until": add_days(today(), 61),
+        "hearing_until": add_days(today(), 31)
+    }, as_dict=True)
+    
+    return [{
+        "type": deadline.deadline_type,
+        "title": deadline.title,
+        "date": deadline.deadline_date,
+        "client": deadline.client,
+        "case": deadline.legal_case,
+        "priority": deadline.priority,
+        "link": f"/app/{frappe.scrub(deadline.reference_doctype).replace('_', '-')}/{deadline.reference_name}"
+    } for deadline in deadlines]
 
 def get_team_productivity():
     """Get team productivity metrics"""
     team_stats = frappe.db.sql("""
         SELECT 
             employee,
-            COUNT(*) as total_entries,
+            SUM(entry_count) as total_entries,
             SUM(hours) as total_hours,
             SUM(billable_hours) as billable_hours,
             SUM(billable_amount) as revenue_generated
-        FROM `tabTime Entry`
-        WHERE activity_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-        AND docstatus = 1
+        FROM `tabTime Entry Rollup`
+        WHERE rollup_date >= %(from_date)s AND rollup_date < %(to_date)s
         GROUP BY employee
         ORDER BY revenue_generated DESC
-    """, as_dict=True)
+    """, {"from_date": add_days(today(), -30), "to_date": add_days(today(), 1)}, as_dict=True)
     
     return team_stats
 
+DASHBOARD_SECTIONS = {
+    "summary_cards": get_summary_cards,
+    "case_statistics": get_case_statistics,
+    "billing_overview": get_billing_overview,
+    "recent_activities": get_recent_activities,
+    "upcoming_deadlines": get_upcoming_deadlines,
+    "team_productivity": get_team_productivity
+}
+
+@frappe.whitelist()
+def get_dashboard_sections(sections=None):
+    """
+    Get only the requested dashboard sections, evaluated concurrently.
+    Lets the desk page render the cards above the fold without waiting for the slowest section.
+    """
+    sections = frappe.parse_json(sections) if isinstance(sections, str) else sections
+    sections = sections or list(DASHBOARD_SECTIONS)
+
+    unknown = [str(section) for section in sections
+        if not isinstance(section, str) or section not in DASHBOARD_SECTIONS]
+    if unknown:
+        frappe.throw(_("Unknown dashboard section(s): {0}").format(", ".join(unknown)))
+    # One worker (and connection) per distinct section, however often the caller repeats it
+    sections = list(dict.fromkeys(sections))
+
+    if len(sections) == 1:
+        results = {sections[0]: compute_dashboard_section(sections[0])}
+    else:
+        # Each worker opens its own connection, so sections do not queue on one cursor
+        site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+        with ThreadPoolExecutor(max_workers=min(len(sections), len(DASHBOARD_SECTIONS))) as executor:
+            futures = {
+                section: executor.submit(compute_dashboard_section_on_connection, section, site, sites_path, user)
+                for section in sections
+            }
+            results = {section: future.result() for section, future in futures.items()}
+
+    return {
+        "sections": {section: data for section, (data, _elapsed) in results.items()},
+        "timings": {section: elapsed for section, (_data, elapsed) in results.items()}
+    }
+
+def compute_dashboard_section(section):
+    """Return (data, milliseconds taken) for one dashboard section"""
+    start = time.perf_counter()
+    data = get_cached_section(section, DASHBOARD_SECTIONS[section])
+    return data, round((time.perf_counter() - start) * 1000, 2)
+
+def compute_dashboard_section_on_connection(section, site, sites_path, user):
+    """Compute a dashboard section in a worker thread with its own site context and DB connection"""
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    try:
+        frappe.set_user(user)
+        return compute_dashboard_section(section)
+    finally:
+        frappe.destroy()
+
 @frappe.whitelist()
 def create_case_from_lead(lead_name, case_title, practice_area):
-    """Create a legal case from a lead"""
+    """Create a legal case from a lead (for many leads use lead_conversion.start_lead_conversion)"""
     lead = frappe.get_doc("Lead", lead_name)
     
     # First create client if doesn't exist
     client_name = create_client_from_lead(lead)
     
-    # Create the legal case
-    case = frappe.new_doc("Legal Case")
-    case.case_title = case_title
-    case.client = client_name
-    case.practice_area = practice_area
-    case.status = "Open"
-    case.date_opened = today()
-    case.case_description = f"Case created from lead: {lead.lead_name}"
-    
-    case.insert()
+    # Create the legal case; client and case are committed together
+    case_name = create_case(lead, client_name, case_title, practice_area)
     frappe.db.commit()
     
-    return case.name
+    return case_name
 
 def create_client_from_lead(lead):
-    """Create client from lead data"""
-    if frappe.db.exists("Client", {"email": lead.email_id}):
-        return frappe.db.get_value("Client", {"email": lead.email_id}, "name")
-    
-    client = frappe.new_doc("Client")
-    client.client_name = lead.lead_name
-    client.client_type = "Individual" # Assuming lead is an individual unless specified
-    client.email = lead.email_id
-    client.phone = lead.phone
-    client.mobile = lead.mobile_no
-    client.status = "Prospective"
-    
-    # ERPNext stores addresses in a separate DocType, Address.
-    # This is a simplified approach, you might want to create a full Address document.
-    # Here, we'll just populate the client's fields directly.
-    client.address_line_1 = lead.address_line1
-    client.address_line_2 = lead.address_line2
-    client.city = lead.city
-    client.state = lead.state
-    client.country = lead.country
-    
-    client.insert()
-    frappe.db.commit()
-    
-    return client.name
+    """Create client from lead data, reusing a client with the same normalized email or phone"""
+    return find_existing_client(lead) or create_client(lead).name
 
 @frappe.whitelist()
-def bulk_time_entry(entries_json):
-    """Create multiple time entries at once"""
+def bulk_time_entry(entries_json, bulk_mode=False):
+    """
+    Create multiple time entries at once.
+    With bulk_mode the batch is validated in memory and written with multi-row INSERTs;
+    the response is then {"created": [...], "errors": [...]} and invalid rows do not abort the batch.
+    """
     entries = json.loads(entries_json) if isinstance(entries_json, str) else entries_json
+
+    if cint(bulk_mode):
+        result = insert_time_entries(entries)
+        frappe.db.commit()
+        return result
+
     created_entries = []
     
     for entry_data in entries:
@@ -299,27 +301,65 @@ def bulk_time_entry(entries_json):
     frappe.db.commit()
     return created_entries
 
+# Doctypes whose rows feed the memoized case reports
+CASE_REPORT_SOURCES = ["Time Entry", "Legal Invoice", "Legal Document", "Court Hearing"]
+CASE_REPORT_TTL = 24 * 60 * 60
+MAX_CASE_REPORT_ROWS = 500
+
 @frappe.whitelist()
-def generate_case_report(case_name, report_type="summary"):
-    """Generate various types of case reports"""
+def generate_case_report(case_name, report_type="summary", include_rows=0, start=0, page_length=100, cursor=None):
+    """
+    Generate various types of case reports.
+    Summary and billing reports are memoized until a row they are built from changes;
+    with include_rows the billing report also carries one page of the raw time entries.
+    The timeline is paged with the next_cursor of the previous page.
+    """
     case = frappe.get_doc("Legal Case", case_name)
-    
+    case.check_permission("read")
+
     if report_type == "summary":
-        return generate_case_summary_report(case)
+        return get_memoized_case_report(case, report_type, generate_case_summary_report)
     elif report_type == "billing":
-        return generate_case_billing_report(case)
+        report = get_memoized_case_report(case, report_type, generate_case_billing_report)
+        if cint(include_rows):
+            report = {**report, "time_entries": get_case_time_entries(case.name, start, page_length)}
+        return report
     elif report_type == "timeline":
-        return generate_case_timeline_report(case)
+        return generate_case_timeline_report(case, cursor, page_length)
     
     return {}
 
+def get_memoized_case_report(case, report_type, generate):
+    """Cached report for (case, report_type), keyed on the version of every row it reads"""
+    key = f"law_firm:case_report:{case.name}:{report_type}:{get_case_report_version(case)}"
+    report = frappe.cache().get_value(key)
+    if report is None:
+        report = generate(case)
+        frappe.cache().set_value(key, report, expires_in_sec=CASE_REPORT_TTL)
+    return report
+
+def get_case_report_version(case):
+    """
+    Latest modified and row count of each doctype feeding the case reports, read from
+    (legal_case, modified) indexes; the count catches deleted rows that MAX(modified) would miss.
+    """
+    subqueries = ", ".join(
+        f"(SELECT CONCAT(IFNULL(MAX(modified), ''), '/', COUNT(*)) FROM `tab{doctype}` WHERE legal_case = %(case)s)"
+        for doctype in CASE_REPORT_SOURCES
+    )
+    version = frappe.db.sql(f"SELECT {subqueries}", {"case": case.name})[0]
+    return hashlib.sha1("|".join([str(case.modified), *version]).encode()).hexdigest()
+
 def generate_case_summary_report(case):
     """Generate case summary report"""
-    # Get time entries
-    time_entries = frappe.get_all("Time Entry",
-        filters={"legal_case": case.name, "docstatus": 1},
-        fields=["activity_type", "hours", "billable_hours", "billable_amount", "activity_date"]
-    )
+    # Aggregate time entries per activity type in the database
+    by_type = frappe.db.sql("""
+        SELECT activity_type, COUNT(*) as count, SUM(hours) as hours,
+            SUM(billable_hours) as billable_hours, SUM(billable_amount) as billable_amount
+        FROM `tabTime Entry`
+        WHERE legal_case = %s AND docstatus = 1
+        GROUP BY activity_type
+    """, case.name, as_dict=True)
     
     # Get documents
     documents = frappe.get_all("Legal Document",
@@ -336,220 +376,127 @@ def generate_case_summary_report(case):
     return {
         "case_info": case.as_dict(),
         "time_summary": {
-            "total_hours": sum([te.hours or 0 for te in time_entries]),
-            "billable_hours": sum([te.billable_hours or 0 for te in time_entries]),
-            "total_billed": sum([te.billable_amount or 0 for te in time_entries]),
-            "entries_by_type": group_by_activity_type(time_entries)
+            "total_hours": sum(row.hours or 0 for row in by_type),
+            "billable_hours": sum(row.billable_hours or 0 for row in by_type),
+            "total_billed": sum(row.billable_amount or 0 for row in by_type),
+            "entries_by_type": {
+                row.activity_type: {
+                    "hours": row.hours or 0,
+                    "billable_amount": row.billable_amount or 0,
+                    "count": row.count
+                } for row in by_type
+            }
         },
         "documents": documents,
         "hearings": hearings
     }
 
-def group_by_activity_type(time_entries):
-    """Group time entries by activity type"""
-    grouped = {}
-    for entry in time_entries:
-        activity_type = entry.activity_type
-        if activity_type not in grouped:
-            grouped[activity_type] = {"hours": 0, "billable_amount": 0, "count": 0}
-        
-        grouped[activity_type]["hours"] += entry.hours or 0
-        grouped[activity_type]["billable_amount"] += entry.billable_amount or 0
-        grouped[activity_type]["count"] += 1
-    
-    return grouped
-
 def generate_case_billing_report(case):
     """Generate case billing report"""
-    # Get all time entries for the case
-    time_entries = frappe.get_all("Time Entry",
-        filters={"legal_case": case.name, "docstatus": 1},
-        fields=["employee", "activity_type", "activity_date", "hours", "billable_hours", "billable_amount"]
-    )
+    # Time per attorney and activity type, aggregated in the database
+    time_summary = frappe.db.sql("""
+        SELECT employee, activity_type, COUNT(*) as count, SUM(hours) as hours,
+            SUM(billable_hours) as billable_hours, SUM(billable_amount) as billable_amount
+        FROM `tabTime Entry`
+        WHERE legal_case = %s AND docstatus = 1
+        GROUP BY employee, activity_type
+        ORDER BY employee, activity_type
+    """, case.name, as_dict=True)
     
     # Get all invoices linked to the case
     invoices = frappe.get_all("Legal Invoice",
         filters={"legal_case": case.name, "docstatus": 1},
-        fields=["name", "posting_date", "total_amount", "outstanding_amount", "status"]
+        fields=["name", "invoice_date", "grand_total", "balance_due", "status"],
+        order_by="invoice_date"
     )
     
     return {
         "case_info": case.as_dict(),
-        "time_entries": time_entries,
+        "time_summary": time_summary,
         "invoices": invoices,
-        "total_billed": sum(i.total_amount for i in invoices),
-        "total_outstanding": sum(i.outstanding_amount for i in invoices),
+        "total_billed": sum(i.grand_total or 0 for i in invoices),
+        "total_outstanding": sum(i.balance_due or 0 for i in invoices),
     }
 
-def generate_case_timeline_report(case):
-    """Generate a timeline of activities for a case"""
-    timeline = []
-    
-    # Add time entries
-    time_entries = frappe.get_all("Time Entry",
-        filters={"legal_case": case.name, "docstatus": 1},
-        fields=["name", "activity_date", "employee", "activity_type", "hours"]
+def get_case_time_entries(case_name, start=0, page_length=100):
+    """One page of a case's submitted time entries, newest first"""
+    page_length = min(cint(page_length) or 100, MAX_CASE_REPORT_ROWS)
+    return frappe.get_all("Time Entry",
+        filters={"legal_case": case_name, "docstatus": 1},
+        fields=["name", "employee", "activity_type", "activity_date", "hours", "billable_hours", "billable_amount"],
+        order_by="activity_date desc, name desc",
+        start=cint(start),
+        page_length=page_length
     )
-    for entry in time_entries:
-        timeline.append({
-            "type": "Time Entry",
-            "date": entry.activity_date,
-            "title": f"Logged {entry.hours} hours for {entry.activity_type}",
-            "author": entry.employee,
-            "link": f"/app/time-entry/{entry.name}"
-        })
-        
-    # Add hearings
-    hearings = frappe.get_all("Court Hearing",
-        filters={"legal_case": case.name},
-        fields=["name", "hearing_date", "hearing_type", "status"]
-    )
-    for hearing in hearings:
-        timeline.append({
-            "type": "Court Hearing",
-            "date": hearing.hearing_date,
-            "title": f"{hearing.hearing_type} ({hearing.status})",
-            "author": None,
-            "link": f"/app/court-hearing/{hearing.name}"
-        })
-
-    # Sort the timeline by date
-    timeline.sort(key=lambda x: x["date"])
-    return {"timeline": timeline, "case_info": case.as_dict()}
+
+def generate_case_timeline_report(case, cursor=None, limit=50):
+    """Generate one page of the case timeline across time entries, hearings, documents and invoices"""
+    return {**get_timeline_page(case.name, cursor, limit), "case_info": case.as_dict()}
 
 @frappe.whitelist()
-def get_client_portal_data(client_email):
-    """Get data for client portal"""
-    # Get client by email
-    client = frappe.get_doc("Client", {"email": client_email})
-    
-    # Get client's cases
-    cases = frappe.get_all("Legal Case",
-        filters={"client": client.name},
-        fields=["name", "case_title", "status", "practice_area", "date_opened", "lead_attorney"]
-    )
-    
-    # Get recent time entries for client's cases
-    recent_activities = frappe.get_all("Time Entry",
-        filters={"client": client.name, "docstatus": 1},
-        fields=["activity_type", "hours", "activity_date", "legal_case"],
-        order_by="activity_date desc",
-        limit=20
-    )
-    
-    # Get invoices
-    invoices = frappe.get_all("Legal Invoice",
-        filters={"client": client.name},
-        fields=["name", "posting_date", "total_amount", "outstanding_amount", "status"]
-    )
-    
-    return {
-        "client": client.as_dict(),
-        "cases": cases,
-        "recent_activities": recent_activities,
-        "invoices": invoices,
-        "summary": {
-            "total_cases": len(cases),
-            "active_cases": len([c for c in cases if c.status in ["Open", "In Progress"]]),
-            "total_outstanding": sum([inv.outstanding_amount or 0 for inv in invoices])
-        }
-    }
+def get_client_portal_data(client_email, cases_start=0, invoices_start=0, page_length=20):
+    """Get data for client portal (portal fields only, paged, cached per client with an ETag)"""
+    return get_portal_data(client_email, cases_start, invoices_start, page_length)
 
 # Background Jobs
 def send_hearing_reminders():
-    """Send reminders for upcoming hearings"""
-    upcoming_hearings = frappe.get_all("Court Hearing",
-        filters={
-            "hearing_date": ["between", [now(), add_days(now(), 1)]],
-            "reminder_sent": 0
-        },
-        fields=["name", "hearing_type", "hearing_date", "legal_case", "attorney"]
-    )
-    
-    for hearing in upcoming_hearings:
-        # Send email to attorney
-        if hearing.attorney:
-            frappe.sendmail(
-                recipients=[hearing.attorney],
-                subject=f"Reminder: {hearing.hearing_type} Tomorrow",
-                message=f"""
-                Dear Attorney,
-                
-                This is a reminder that you have a {hearing.hearing_type} scheduled for tomorrow at {hearing.hearing_date}.
-                
-                Case: {hearing.legal_case}
-                
-                Please ensure you are prepared.
-                
-                Best regards,
-                Law Firm Management System
-                """
-            )
-        
-        # Mark reminder as sent
-        frappe.db.set_value("Court Hearing", hearing.name, "reminder_sent", 1)
-    
-    frappe.db.commit()
+    """Send reminders for upcoming hearings (queued per configured offset by hearing_reminders)"""
+    dispatch_hearing_reminders()
 
 def update_case_statuses():
-    """Update case statuses based on various criteria"""
-    # Close cases that are past statute of limitations
-    overdue_cases = frappe.get_all("Legal Case",
-        filters={
-            "statute_of_limitations": ["<", today()],
-            "status": ["!=", "Closed"]
-        }
+    """
+    Close cases that are past their statute of limitations, one committed chunk at a time.
+    Cases already in a closed status (Settled, Dismissed, Cancelled, Archived) keep it.
+    """
+    conditions = "statute_of_limitations < %(today)s AND status NOT IN %(closed)s"
+    values = {"today": today(), "closed": tuple(CLOSED_CASE_STATUSES)}
+    close_cases = update_chunks("Legal Case",
+        "status = 'Closed', case_outcome = 'Statute Expired', date_closed = IFNULL(date_closed, %(today)s)",
+        conditions, values,
+        # A closed case no longer has a statute of limitations deadline in the calendar
+        on_update=lambda closed: cancel_deadlines("Legal Case", closed)
     )
-    
-    for case in overdue_cases:
-        frappe.db.set_value("Legal Case", case.name, "status", "Closed")
-        frappe.db.set_value("Legal Case", case.name, "case_outcome", "Statute Expired")
-    
-    frappe.db.commit()
+
+    run = run_batch_job("update_case_statuses", keyset_chunks("Legal Case", conditions, values), close_cases)
+    if run and run.rows_processed:
+        invalidate_case_caches()
 
 # --- NEW FUNCTIONS ADDED BELOW ---
 
 def archive_old_documents():
     """
     Archives legal documents and cases that are old or closed.
-    This function can be triggered by a scheduled job.
+    Each case's records are moved to a compressed archive file and the case is left as a stub.
+    This function can be triggered by a scheduled job; progress and metrics are kept in Batch Job Run.
     """
-    frappe.log_error(title="Archive Documents", message="Starting archive process for old cases and documents.")
-    
-    # Example logic:
-    # Find closed cases that were modified more than 5 years ago
-    cases_to_archive = frappe.get_all(
-        "Legal Case",
-        filters={
-            "status": "Closed",
-            "modified": ["<", frappe.utils.add_years(today(), -5)]
-        }
+    run = run_batch_job("archive_old_documents",
+        keyset_chunks("Legal Case", ARCHIVE_CONDITIONS, get_archive_values()),
+        archive_cases,
+        chunk_size=ARCHIVE_CHUNK_SIZE
     )
-    
-    for case in cases_to_archive:
-        frappe.db.set_value("Legal Case", case.name, "status", "Archived")
-        frappe.log_error(title="Archive Documents", message=f"Case {case.name} has been archived.")
-    
-    frappe.db.commit()
-    frappe.log_error(title="Archive Documents", message="Archive process completed.")
+    if run and run.rows_processed:
+        invalidate_case_caches()
+
+def invalidate_case_caches():
+    """Drop the dashboard sections and client portals that show case statuses after a batch update"""
+    invalidate_sections(SECTION_DEPENDENCIES["Legal Case"])
+    invalidate_all_client_portals()
 
 def generate_weekly_reports():
     """
     Generates and sends weekly performance reports to key users.
-    This function can be scheduled to run weekly.
+    This function can be scheduled to run weekly; each run is recorded in Batch Job Run.
     """
-    frappe.log_error(title="Weekly Reports", message="Starting weekly report generation.")
-    
-    # Example logic:
-    # You would typically generate a report using data from a specific time period
-    # and then send it via email.
-    
-    # Simple report generation
+    run_single_step_job("generate_weekly_reports", build_weekly_report)
+
+def build_weekly_report():
+    """Compute the weekly summary and send it"""
     billable_hours = frappe.db.sql("""
         SELECT SUM(billable_hours) as hours
         FROM `tabTime Entry`
-        WHERE activity_date BETWEEN CURDATE() - INTERVAL 7 DAY AND CURDATE()
-    """)[0][0] or 0
+        WHERE docstatus = 1
+        AND activity_date >= %s AND activity_date < %s
+    """, (add_days(today(), -7), add_days(today(), 1)))[0][0] or 0
     
     open_cases = frappe.db.count("Legal Case", filters={"status": ["in", ["Open", "In Progress"]]})
     
@@ -570,4 +517,4 @@ def generate_weekly_reports():
     # Replace with actual recipient emails
     # frappe.sendmail(recipients=["manager1@example.com", "manager2@example.com"], subject=subject, message=message)
     
-    frappe.log_error(title="Weekly Reports", message="Weekly reports generated and sent.")
\ No newline at end of file
+    return 1
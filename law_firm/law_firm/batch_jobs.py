@@ -0,0 +1,207 @@
+# batch_jobs.py
+"""
+Chunked, resumable runner for scheduled maintenance jobs.
+
+A job is a pair of functions: one selects the next chunk of candidates
+after a keyset checkpoint (the last name processed), the other applies the
+change to the whole chunk, usually with one set-based UPDATE ... WHERE name
+IN (...). Each chunk is committed on its own together with the job's Batch
+Job Run row, which holds the checkpoint, counters and per-chunk timings. A
+run that fails or whose worker dies is resumed from its checkpoint by the
+next invocation instead of starting over; a job already running elsewhere
+is skipped.
+
+The heartbeat is only written between chunks, and a single-step job is one
+long chunk. A Running run is therefore only taken over once its heartbeat is
+older than the longest worker queue timeout: by then the job that held it has
+been killed, so a slow chunk is never mistaken for a dead worker.
+"""
+import json
+import time
+from math import ceil
+
+import frappe
+from frappe.utils import add_days, add_to_date, now_datetime
+from frappe.utils.background_jobs import get_queues_timeout
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_METRICS = 200
+STALE_AFTER_MINUTES = 30  # least time without a heartbeat before a Running job is taken over
+STALE_MARGIN_MINUTES = 5  # added to the longest queue timeout
+RUN_RETENTION_DAYS = 90
+START_LOCK_TIMEOUT = 30  # seconds a worker may hold a job's start lock while it claims the run
+
+
+def keyset_chunks(doctype, conditions, values=None):
+    """
+    Chunk selector over the names of a doctype matching `conditions` (SQL, with %(name)s
+    placeholders for `values`), in name order after the checkpoint.
+    """
+    def select_chunk(after, limit):
+        return frappe.db.sql_list(f"""
+            SELECT name
+            FROM `tab{doctype}`
+            WHERE {conditions} AND name > %(after)s
+            ORDER BY name
+            LIMIT %(limit)s
+        """, {**(values or {}), "after": after, "limit": limit})
+
+    return select_chunk
+
+def update_chunks(doctype, assignments, conditions, values=None, on_update=None):
+    """
+    Chunk processor setting `assignments` (SQL) on a chunk of names with one UPDATE.
+    The chunk is first narrowed to the names still matching the conditions and locked, so rows changed
+    since they were selected are left alone and not counted; on_update(names) gets the names changed.
+    """
+    def process_chunk(names):
+        changed = frappe.db.sql_list(f"""
+            SELECT name
+            FROM `tab{doctype}`
+            WHERE name IN %(names)s AND {conditions}
+            FOR UPDATE
+        """, {**(values or {}), "names": tuple(names)})
+        if not changed:
+            return 0
+
+        frappe.db.sql(f"""
+            UPDATE `tab{doctype}`
+            SET {assignments}, modified = %(modified)s
+            WHERE name IN %(changed)s
+        """, {**(values or {}), "changed": tuple(changed), "modified": now_datetime()})
+        if on_update:
+            on_update(changed)
+        return len(changed)
+
+    return process_chunk
+
+def run_batch_job(job_name, select_chunk, process_chunk, chunk_size=DEFAULT_CHUNK_SIZE, exclusive=True):
+    """
+    Run a job chunk by chunk until the selector comes back short, committing each chunk with its
+    checkpoint and metrics. process_chunk(rows) returns the number of rows it changed.
+    With exclusive=False several workers may run the job at once, each with its own run record.
+    Returns the Batch Job Run, or None when the job is already running elsewhere.
+    """
+    run = start_run(job_name, exclusive)
+    if not run:
+        return None
+
+    metrics = json.loads(run.chunk_metrics or "[]")
+    after = run.last_name or ""
+
+    try:
+        while True:
+            chunk_started = time.monotonic()
+            rows = select_chunk(after, chunk_size)
+            if not rows:
+                break
+
+            names = [row if isinstance(row, str) else row.name for row in rows]
+            processed = process_chunk(rows)
+            seconds = round(time.monotonic() - chunk_started, 3)
+
+            after = max(after, names[-1]) if exclusive else ""
+            metrics = (metrics + [{"first": names[0], "last": names[-1], "rows": len(rows),
+                "processed": processed, "seconds": seconds}])[-MAX_CHUNK_METRICS:]
+
+            # The checkpoint is committed in the same transaction as the chunk it covers
+            run.db_set({
+                "last_name": after,
+                "chunks_processed": run.chunks_processed + 1,
+                "rows_processed": run.rows_processed + processed,
+                "duration": run.duration + seconds,
+                "chunk_metrics": json.dumps(metrics, indent=1),
+                "heartbeat": now_datetime()
+            }, update_modified=False)
+            frappe.db.commit()
+
+            if len(rows) < chunk_size:
+                break
+    except Exception:
+        frappe.db.rollback()
+        run.db_set({"status": "Failed", "error": frappe.get_traceback()[-2000:]}, commit=True)
+        raise
+
+    if not exclusive and not run.chunks_processed:
+        # Shared jobs poll often; runs that found nothing to do are not kept
+        frappe.db.delete("Batch Job Run", {"name": run.name})
+        frappe.db.commit()
+        return run
+
+    run.db_set({"status": "Completed", "finished_at": now_datetime()}, commit=True)
+    return run
+
+def run_single_step_job(job_name, step):
+    """Record a job that has nothing to chunk over (e.g. a report) as a run with one chunk"""
+    done = []
+
+    def select_chunk(after, limit):
+        return [] if done else [job_name]
+
+    def process_chunk(rows):
+        done.append(True)
+        return step() or 0
+
+    return run_batch_job(job_name, select_chunk, process_chunk, chunk_size=1)
+
+def start_run(job_name, exclusive=True):
+    """Resume the job's unfinished run from its checkpoint, or start a new one"""
+    frappe.db.delete("Batch Job Run", {"modified": ("<", add_days(now_datetime(), -RUN_RETENTION_DAYS))})
+    if not exclusive:
+        return insert_run(job_name)
+
+    # Workers starting together would all see no Running run; only the lock holder decides and claims
+    cache = frappe.cache()
+    lock_key = cache.make_key(f"law_firm:batch_job:{job_name}:start")
+    if not cache.set(lock_key, 1, nx=True, ex=START_LOCK_TIMEOUT):
+        return None
+    try:
+        return claim_run(job_name)
+    finally:
+        cache.delete(lock_key)
+
+def claim_run(job_name):
+    """Take over the job's unfinished run unless another worker is still running it, else insert a new one"""
+    unfinished = frappe.get_all("Batch Job Run",
+        filters={"job_name": job_name, "status": ["in", ["Running", "Failed"]]},
+        fields=["name", "status", "heartbeat"],
+        order_by="creation desc",
+        limit=1
+    )
+
+    if unfinished:
+        previous = unfinished[0]
+        stale_before = add_to_date(now_datetime(), minutes=-get_stale_after_minutes())
+        if previous.status == "Running" and previous.heartbeat and previous.heartbeat > stale_before:
+            return None
+
+        run = frappe.get_doc("Batch Job Run", previous.name)
+        run.db_set({
+            "status": "Running",
+            "attempts": run.attempts + 1,
+            "heartbeat": now_datetime(),
+            "error": None
+        }, commit=True)
+        return run
+
+    return insert_run(job_name)
+
+def get_stale_after_minutes():
+    """
+    Minutes without a heartbeat after which a Running run counts as dead: longer than any queue's
+    job timeout (site config included), so the worker running it must have been killed.
+    """
+    longest = max(get_queues_timeout().values(), default=0)
+    return max(STALE_AFTER_MINUTES, ceil(longest / 60) + STALE_MARGIN_MINUTES)
+
+def insert_run(job_name):
+    run = frappe.get_doc({
+        "doctype": "Batch Job Run",
+        "job_name": job_name,
+        "status": "Running",
+        "started_at": now_datetime(),
+        "heartbeat": now_datetime()
+    })
+    run.insert(ignore_permissions=True)
+    frappe.db.commit()
+    return run
@@ -0,0 +1,271 @@
+# billing.py
+"""
+Billing runs: turn approved, un-invoiced time into Legal Invoices in bulk.
+
+A run walks the cases that have unbilled time in legal_case order, a chunk
+of cases at a time. Each chunk locks its entries with one indexed query,
+builds one invoice per case and client with an Invoice Item per entry, then
+marks every billed entry with a single set-based UPDATE joined through the
+invoice items. Invoices, entry updates and the run's checkpoint commit
+together, so an interrupted run resumes after the last committed case and
+never bills an entry twice. Cases whose invoice fails are logged on the run
+and stay unbilled for the next run.
+
+Invoices saved outside a run mark the entries on their items themselves, and
+cancelling an invoice releases them; an amended invoice keeps the item links
+and marks the same entries again.
+"""
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, now
+from law_firm.law_firm.time_entry_ingest import MAX_LOGGED_ERRORS
+
+BILLING_RUN_JOB_TIMEOUT = 6 * 60 * 60
+
+PAYMENT_TERM_DAYS = {
+    "Net 15": 15,
+    "Net 30": 30,
+    "Net 60": 60,
+    "Due on Receipt": 0
+}
+
+# Time Entry conditions for approved billable time that is not on an invoice yet
+UNBILLED_CONDITIONS = """
+    invoiced = 0
+    AND billing_status = 'Approved'
+    AND docstatus = 1
+    AND billable = 1
+    AND legal_case IS NOT NULL
+    AND activity_date <= %(period_end)s
+"""
+
+
+@frappe.whitelist()
+def start_billing_run(run_name):
+    """Queue a Billing Run, or resume one that was interrupted"""
+    run = frappe.get_doc("Billing Run", run_name)
+    run.check_permission("write")
+
+    if run.status == "Completed":
+        frappe.throw(_("Billing Run {0} has already completed").format(run_name))
+
+    running = frappe.db.get_value("Billing Run",
+        {"status": ["in", ["Queued", "In Progress"]], "name": ["!=", run_name]})
+    if running:
+        frappe.throw(_("Billing Run {0} is still running").format(running))
+
+    run.db_set("status", "Queued")
+    frappe.enqueue(run_billing,
+        queue="long",
+        timeout=BILLING_RUN_JOB_TIMEOUT,
+        job_id=f"billing_run::{run_name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        run_name=run_name
+    )
+
+def run_billing(run_name):
+    """Background job: invoice the unbilled time of every case, chunk by chunk"""
+    run = frappe.get_doc("Billing Run", run_name)
+    if run.status == "Completed":
+        return
+
+    run.db_set({"status": "In Progress", "started_at": run.started_at or now()}, commit=True)
+    if not run.total_cases:
+        run.db_set("total_cases", count_unbilled_cases(run.period_end), commit=True)
+
+    errors = json.loads(run.run_errors or "[]")
+
+    try:
+        while True:
+            cases = get_unbilled_cases(run.period_end, after=run.last_case, limit=run.chunk_size)
+            if not cases:
+                break
+
+            invoices, entries_billed, chunk_errors = bill_cases(run, cases)
+            errors = (errors + chunk_errors)[:MAX_LOGGED_ERRORS]
+
+            # The checkpoint is committed in the same transaction as the invoices it covers
+            run.db_set({
+                "last_case": cases[-1],
+                "cases_processed": run.cases_processed + len(cases),
+                "invoices_created": run.invoices_created + len(invoices),
+                "entries_billed": run.entries_billed + entries_billed,
+                "errors_count": run.errors_count + len(chunk_errors),
+                "run_errors": json.dumps(errors, indent=1)
+            }, update_modified=False)
+            frappe.db.commit()
+            publish_billing_progress(run)
+    except Exception:
+        frappe.db.rollback()
+        run.db_set("status", "Failed", commit=True)
+        run.log_error("Billing Run failed")
+        raise
+
+    run.db_set({"status": "Completed", "finished_at": now()}, commit=True)
+    publish_billing_progress(run)
+
+def count_unbilled_cases(period_end):
+    """Number of cases with unbilled time in the period"""
+    return frappe.db.sql(f"""
+        SELECT COUNT(DISTINCT legal_case)
+        FROM `tabTime Entry`
+        WHERE {UNBILLED_CONDITIONS}
+    """, {"period_end": period_end})[0][0]
+
+def get_unbilled_cases(period_end, after=None, limit=200):
+    """Next `limit` cases with unbilled time, in legal_case order after the checkpoint"""
+    return [row[0] for row in frappe.db.sql(f"""
+        SELECT legal_case
+        FROM `tabTime Entry`
+        WHERE {UNBILLED_CONDITIONS}
+        AND legal_case > %(after)s
+        GROUP BY legal_case
+        ORDER BY legal_case
+        LIMIT %(limit)s
+    """, {"period_end": period_end, "after": after or "", "limit": limit})]
+
+def bill_cases(run, cases):
+    """
+    Invoice the unbilled time of a chunk of cases.
+    Returns (invoice names, entries billed, errors keyed by case).
+    """
+    # Locking the entries keeps a concurrent run or manual invoice from billing them as well
+    entries = frappe.db.sql(f"""
+        SELECT name, legal_case, client, activity_date, activity_type, description,
+            billable_hours, billing_rate
+        FROM `tabTime Entry`
+        WHERE {UNBILLED_CONDITIONS}
+        AND legal_case IN %(cases)s
+        ORDER BY legal_case, client, activity_date, from_time, name
+        FOR UPDATE
+    """, {"period_end": run.period_end, "cases": tuple(cases)}, as_dict=True)
+
+    # Case statuses for the archive check of every invoice, in one query
+    case_statuses = dict(frappe.get_all("Legal Case",
+        filters={"name": ["in", cases]},
+        fields=["name", "status"],
+        as_list=True
+    ))
+
+    groups = {}
+    for entry in entries:
+        groups.setdefault((entry.legal_case, entry.client), []).append(entry)
+
+    invoices, entries_billed, errors = [], 0, []
+    for (legal_case, client), group in groups.items():
+        frappe.db.savepoint("billing_run_invoice")
+        try:
+            invoices.append(create_invoice(run, legal_case, client, group, case_statuses.get(legal_case)))
+            entries_billed += len(group)
+        except Exception as e:
+            frappe.db.rollback(save_point="billing_run_invoice")
+            errors.append({"legal_case": legal_case, "client": client, "error": str(e)})
+        finally:
+            frappe.local.message_log = []
+
+    mark_entries_invoiced(invoices)
+    return invoices, entries_billed, errors
+
+def create_invoice(run, legal_case, client, entries, case_status=None):
+    """Create the invoice of one case and client, one Invoice Item per time entry"""
+    if not client:
+        frappe.throw(_("Time entries of Legal Case {0} have no client").format(legal_case))
+
+    invoice = frappe.get_doc({
+        "doctype": "Legal Invoice",
+        "legal_case": legal_case,
+        "client": client,
+        "invoice_date": run.invoice_date,
+        "due_date": add_days(run.invoice_date, PAYMENT_TERM_DAYS.get(run.payment_terms, 30)),
+        "payment_terms": run.payment_terms,
+        "items": [{
+            "item_code": run.service_item,
+            "description": f"{entry.activity_date} - {entry.activity_type}: {entry.description}",
+            "quantity": entry.billable_hours,
+            "rate": entry.billing_rate,
+            "time_entry": entry.name
+        } for entry in entries]
+    })
+    invoice.flags.case_status = case_status
+    # The run marks the entries of the whole chunk with one UPDATE in mark_entries_invoiced
+    invoice.flags.skip_time_entry_sync = True
+    invoice.insert()
+    if run.submit_invoices:
+        invoice.submit()
+    return invoice.name
+
+def mark_entries_invoiced(invoices):
+    """Point every entry billed on `invoices` at its invoice with one UPDATE"""
+    if not invoices:
+        return
+
+    frappe.db.sql("""
+        UPDATE `tabTime Entry` te
+        JOIN `tabInvoice Item` ii ON ii.time_entry = te.name
+        SET te.invoiced = 1,
+            te.invoice_reference = ii.parent,
+            te.billing_status = 'Invoiced',
+            te.modified = %(now)s
+        WHERE ii.parenttype = 'Legal Invoice'
+        AND ii.parent IN %(invoices)s
+        AND te.invoiced = 0
+    """, {"invoices": tuple(invoices), "now": now()})
+
+def sync_time_entries(invoice_name):
+    """Point the entries on an invoice's items at it and release the ones no longer on it"""
+    frappe.db.sql("""
+        UPDATE `tabTime Entry` te
+        LEFT JOIN `tabInvoice Item` ii ON ii.time_entry = te.name
+            AND ii.parenttype = 'Legal Invoice' AND ii.parent = %(invoice)s
+        SET te.invoiced = 0,
+            te.invoice_reference = NULL,
+            te.billing_status = 'Approved',
+            te.modified = %(now)s
+        WHERE te.invoice_reference = %(invoice)s
+        AND ii.name IS NULL
+        AND te.docstatus = 1
+    """, {"invoice": invoice_name, "now": now()})
+    mark_entries_invoiced([invoice_name])
+
+def check_time_entries_unbilled(invoice):
+    """Refuse items whose time entry is already billed on another invoice"""
+    entries = {item.time_entry for item in invoice.items if item.time_entry}
+    if not entries:
+        return
+
+    billed = frappe.db.sql("""
+        SELECT name, invoice_reference
+        FROM `tabTime Entry`
+        WHERE name IN %(entries)s AND invoiced = 1
+        AND IFNULL(invoice_reference, '') != %(invoice)s
+    """, {"entries": tuple(entries), "invoice": invoice.name or ""}, as_dict=True)
+    if billed:
+        frappe.throw(_("Time Entry {0} is already billed on Legal Invoice {1}")
+            .format(billed[0].name, billed[0].invoice_reference))
+
+def release_time_entries(invoice_name):
+    """Return the time billed on a cancelled or deleted invoice to the unbilled pool"""
+    frappe.db.sql("""
+        UPDATE `tabTime Entry`
+        SET invoiced = 0,
+            invoice_reference = NULL,
+            billing_status = 'Approved',
+            modified = %(now)s
+        WHERE invoice_reference = %(invoice)s
+        AND docstatus = 1
+    """, {"invoice": invoice_name, "now": now()})
+
+def publish_billing_progress(run):
+    """Push the run's progress to anyone watching the document"""
+    frappe.publish_realtime("billing_run_progress", {
+        "name": run.name,
+        "status": run.status,
+        "total_cases": run.total_cases,
+        "cases_processed": run.cases_processed,
+        "invoices_created": run.invoices_created,
+        "entries_billed": run.entries_billed,
+        "errors_count": run.errors_count
+    }, doctype=run.doctype, docname=run.name, user=run.owner)
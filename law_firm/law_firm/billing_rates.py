@@ -0,0 +1,142 @@
+# billing_rates.py
+"""
+Billing rate resolution.
+
+Billing Rate rows are effective-dated and scoped to a Legal Case, a Client,
+a Practice Area or the whole firm, optionally narrowed to one attorney and
+one activity type. The most specific rate wins: case over client over
+practice area over firm-wide, then attorney-specific, then activity-specific.
+
+The enabled rates are small enough to hold in memory. They are loaded once
+into a RateTable indexed by scope, so resolving a rate is a fixed number of
+dict lookups. The table is shared through Redis under a generation-stamped
+key, kept per process until the generation moves, and pinned to frappe.local
+for the rest of the request or job, so a bulk run costs one Redis read in
+total rather than a query per entry.
+"""
+from bisect import bisect_right
+
+import frappe
+from frappe.utils import getdate, flt
+
+# Scopes in precedence order; None is the firm-wide default
+RATE_SCOPES = ("legal_case", "client", "practice_area", None)
+
+RATES_TTL = 24 * 60 * 60  # seconds an unchanged rate table stays in Redis
+MAX_RESOLVED = 50000  # memoized resolutions kept per table before the memo is reset
+
+# site -> RateTable, reused by every request in this process until the generation changes
+_process_tables = {}
+
+
+class RateTable:
+    """In-memory index of the enabled Billing Rates of one generation"""
+
+    def __init__(self, rates, generation):
+        self.generation = generation
+        self.periods = {}
+        self.resolved = {}
+
+        for rate in sorted(rates, key=lambda rate: getdate(rate["effective_from"])):
+            scope, value = get_rate_scope(rate)
+            key = (scope, value, rate.get("employee") or None, rate.get("activity_type") or None)
+            self.periods.setdefault(key, ([], []))
+            starts, periods = self.periods[key]
+            starts.append(getdate(rate["effective_from"]))
+            periods.append((getdate(rate["effective_to"]) if rate.get("effective_to") else None, flt(rate["rate"])))
+
+    def resolve(self, employee=None, legal_case=None, client=None, practice_area=None, activity_type=None, on_date=None):
+        """Rate for a piece of work, or None when no Billing Rate applies"""
+        on_date = getdate(on_date)
+        args = (employee, legal_case, client, practice_area, activity_type, on_date)
+        if args not in self.resolved:
+            if len(self.resolved) >= MAX_RESOLVED:
+                self.resolved.clear()
+            self.resolved[args] = self.find_rate(*args)
+        return self.resolved[args]
+
+    def find_rate(self, employee, legal_case, client, practice_area, activity_type, on_date):
+        """Walk the candidate keys from most to least specific; at most sixteen lookups"""
+        scope_values = {"legal_case": legal_case, "client": client, "practice_area": practice_area, None: None}
+        for scope in RATE_SCOPES:
+            value = scope_values[scope]
+            if scope and not value:
+                continue
+            for rate_employee in (employee, None) if employee else (None,):
+                for rate_activity in (activity_type, None) if activity_type else (None,):
+                    rate = self.rate_on(scope, value, rate_employee, rate_activity, on_date)
+                    if rate is not None:
+                        return rate
+        return None
+
+    def rate_on(self, scope, value, employee, activity_type, on_date):
+        """Rate of one exact key in force on a date; periods of a key never overlap"""
+        starts, periods = self.periods.get((scope, value, employee, activity_type), ((), ()))
+        position = bisect_right(starts, on_date) - 1
+        if position < 0:
+            return None
+        effective_to, rate = periods[position]
+        if effective_to and effective_to < on_date:
+            return None
+        return rate
+
+def get_rate_scope(rate):
+    """(scope field, value) of a Billing Rate; at most one scope field is set"""
+    for scope in RATE_SCOPES:
+        if scope and rate.get(scope):
+            return scope, rate[scope]
+    return None, None
+
+def get_rate_table():
+    """RateTable for the current request, from frappe.local, this process or Redis, loading it if needed"""
+    table = getattr(frappe.local, "billing_rate_table", None)
+    if table:
+        return table
+
+    cache = frappe.cache()
+    generation = int(cache.get(cache.make_key("law_firm:billing_rates:generation")) or 0)
+    table = _process_tables.get(frappe.local.site)
+
+    if not table or table.generation != generation:
+        key = f"law_firm:billing_rates:{generation}"
+        rates = cache.get_value(key)
+        if rates is None:
+            rates = load_rates()
+            cache.set_value(key, rates, expires_in_sec=RATES_TTL)
+        table = _process_tables[frappe.local.site] = RateTable(rates, generation)
+
+    frappe.local.billing_rate_table = table
+    return table
+
+def load_rates():
+    """Every enabled Billing Rate as plain dicts"""
+    return [dict(rate) for rate in frappe.get_all("Billing Rate",
+        filters={"enabled": 1},
+        fields=["employee", "legal_case", "client", "practice_area", "activity_type",
+            "effective_from", "effective_to", "rate"]
+    )]
+
+def resolve_rate(employee=None, legal_case=None, client=None, practice_area=None, activity_type=None, on_date=None):
+    """Billing rate for a piece of work, or None when no Billing Rate applies"""
+    return get_rate_table().resolve(employee, legal_case, client, practice_area, activity_type, on_date)
+
+def invalidate_rates():
+    """Move the rate table to a new generation so every process reloads it"""
+    cache = frappe.cache()
+    cache.incr(cache.make_key("law_firm:billing_rates:generation"))
+    frappe.local.billing_rate_table = None
+
+def invalidate_for_rate(doc, method=None):
+    """Drop the cached rate table once a Billing Rate change is committed"""
+    frappe.local.billing_rate_table = None
+    frappe.db.after_commit.add(invalidate_rates)
+
+@frappe.whitelist()
+def get_billing_rate(employee=None, legal_case=None, client=None, practice_area=None, activity_type=None, date=None):
+    """Resolve the billing rate the form would apply; used by the Time Entry and Legal Case forms"""
+    frappe.has_permission("Time Entry", throw=True)
+    if legal_case and not (client and practice_area):
+        case = frappe.db.get_value("Legal Case", legal_case, ["client", "practice_area"], as_dict=True) or {}
+        client = client or case.get("client")
+        practice_area = practice_area or case.get("practice_area")
+    return resolve_rate(employee, legal_case, client, practice_area, activity_type, date)
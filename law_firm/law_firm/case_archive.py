@@ -0,0 +1,262 @@
+# case_archive.py
+"""
+Cold storage for closed matters.
+
+Archiving a case streams every row of its record graph - time entries,
+invoices and their items, documents, hearings with their attorneys and
+witnesses, reminders, deadlines and activity, with the attachments,
+comments and versions of those records - into one gzip-compressed JSONL
+file attached privately to the case, then deletes those rows from the hot
+tables. Attached files stay on disk and are linked again on restore. The Legal Case row stays behind as a stub: status Archived, the
+archive file, and the hour, billing, document and hearing counters it had,
+so lists, headers and portals still show it. Rehydration bulk-inserts the
+rows back from the file and restores the case's previous status; a restored
+case stays hot for another archive period before it is archived again.
+
+The dashboard rollups and aging snapshots are aggregates and stay as they
+are, so firm-wide history is unaffected by archiving; rebuild_rollups and
+the counter reconcile leave the figures of archived cases alone.
+"""
+import gzip
+import json
+import os
+from itertools import groupby
+
+import frappe
+from frappe import _
+from frappe.utils import add_years, now_datetime, today
+
+ARCHIVE_AFTER_YEARS = 5
+ARCHIVE_CHUNK_SIZE = 20  # cases per committed chunk of the batch job
+READ_BATCH_SIZE = 1000
+INSERT_BATCH_SIZE = 500
+REHYDRATE_JOB_TIMEOUT = 60 * 60
+
+ARCHIVABLE_STATUSES = ("Closed", "Settled", "Dismissed")
+
+# Doctypes holding a case's records, each with the child tables stored with it as (doctype, parentfield)
+ARCHIVE_SOURCES = {
+    "Time Entry": [],
+    "Legal Invoice": [("Invoice Item", "items")],
+    "Legal Document": [("Legal Document Reference", "related_documents")],
+    "Court Hearing": [("Case Team Member", "attending_attorneys"), ("Hearing Witness", "witnesses")],
+    "Hearing Reminder": [],
+    "Case Deadline": [],
+    "Case Activity": []
+}
+
+# Rows that reference a record by (doctype column, name column): attachments, comments and versions.
+# They are archived and restored with the record; attached files stay on disk.
+ARCHIVE_REFERENCES = [
+    ("File", "attached_to_doctype", "attached_to_name"),
+    ("Comment", "reference_doctype", "reference_name"),
+    ("Version", "ref_doctype", "docname")
+]
+
+# Cases that may be archived: closed long enough ago, not restored recently and with nothing left to collect
+ARCHIVE_CONDITIONS = """status IN %(statuses)s
+    AND IFNULL(date_closed, DATE(modified)) < %(cutoff)s
+    AND (rehydrated_on IS NULL OR rehydrated_on < %(cutoff)s)
+    AND IFNULL(outstanding_amount, 0) <= 0"""
+
+
+def get_archive_values():
+    return {"statuses": ARCHIVABLE_STATUSES, "cutoff": add_years(today(), -ARCHIVE_AFTER_YEARS)}
+
+def archive_cases(names):
+    """Batch job chunk: archive each case under its own savepoint; returns how many were archived"""
+    archived = 0
+    for name in names:
+        frappe.db.savepoint("case_archive")
+        file_name, path = get_archive_path(name)
+        try:
+            archive_case(name, file_name, path)
+            archived += 1
+        except Exception:
+            frappe.db.rollback(save_point="case_archive")
+            if os.path.exists(path):
+                os.remove(path)
+            frappe.log_error(f"Could not archive Legal Case {name}", "Case Archive")
+    return archived
+
+def get_archive_path(name):
+    """File name and path of a new archive of a case"""
+    file_name = f"{name.replace('/', '-')}-archive-{now_datetime().strftime('%Y%m%d%H%M%S')}.jsonl.gz"
+    return file_name, frappe.get_site_path("private", "files", file_name)
+
+def archive_case(name, file_name, path):
+    """Move one case's records to a compressed archive file and leave the case as a stub"""
+    case = frappe.db.get_value("Legal Case", name, ["name", "status"], as_dict=True)
+    if not case or case.status == "Archived":
+        frappe.throw(_("Legal Case {0} cannot be archived").format(name))
+
+    rows = 0
+    with gzip.open(path, "wt", encoding="utf-8") as archive:
+        for doctype, row in iter_case_rows(name):
+            archive.write(json.dumps({"doctype": doctype, "row": row}, default=str))
+            archive.write("\n")
+            rows += 1
+
+    delete_case_rows(name)
+
+    file = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "attached_to_doctype": "Legal Case",
+        "attached_to_name": name,
+        "is_private": 1
+    })
+    file.insert(ignore_permissions=True)
+
+    frappe.db.sql("""
+        UPDATE `tabLegal Case`
+        SET status_before_archive = status, status = 'Archived', archived_on = %(now)s,
+            archive_file = %(file_url)s, archived_rows = %(rows)s, modified = %(now)s
+        WHERE name = %(name)s
+    """, {"name": name, "now": now_datetime(), "file_url": file.file_url, "rows": rows})
+
+def iter_case_rows(name):
+    """Every row of a case's record graph as (doctype, row), read in keyset batches"""
+    for doctype, children in ARCHIVE_SOURCES.items():
+        yield from iter_rows(f"""
+            SELECT *
+            FROM `tab{doctype}`
+            WHERE legal_case = %(case)s AND name > %(after)s
+            ORDER BY name
+            LIMIT %(limit)s
+        """, doctype, name)
+
+        for child, parentfield in children:
+            yield from iter_rows(f"""
+                SELECT c.*
+                FROM `tab{child}` c
+                JOIN `tab{doctype}` p ON p.name = c.parent
+                WHERE p.legal_case = %(case)s AND c.parenttype = '{doctype}' AND c.parentfield = '{parentfield}'
+                AND c.name > %(after)s
+                ORDER BY c.name
+                LIMIT %(limit)s
+            """, child, name)
+
+        for reference, doctype_column, name_column in ARCHIVE_REFERENCES:
+            yield from iter_rows(f"""
+                SELECT r.*
+                FROM `tab{reference}` r
+                JOIN `tab{doctype}` p ON p.name = r.`{name_column}`
+                WHERE p.legal_case = %(case)s AND r.`{doctype_column}` = '{doctype}'
+                AND r.name > %(after)s
+                ORDER BY r.name
+                LIMIT %(limit)s
+            """, reference, name)
+
+def iter_rows(query, doctype, case):
+    after = ""
+    while True:
+        rows = frappe.db.sql(query, {"case": case, "after": after, "limit": READ_BATCH_SIZE}, as_dict=True)
+        for row in rows:
+            yield doctype, row
+        if len(rows) < READ_BATCH_SIZE:
+            break
+        after = rows[-1].name
+
+def delete_case_rows(name):
+    """Delete a case's record graph from the hot tables, children and references before their parents"""
+    for doctype, children in ARCHIVE_SOURCES.items():
+        for child, parentfield in children:
+            frappe.db.sql(f"""
+                DELETE c
+                FROM `tab{child}` c
+                JOIN `tab{doctype}` p ON p.name = c.parent
+                WHERE p.legal_case = %(case)s AND c.parenttype = '{doctype}' AND c.parentfield = '{parentfield}'
+            """, {"case": name})
+        for reference, doctype_column, name_column in ARCHIVE_REFERENCES:
+            # Only the rows go; attached files stay on disk for the restore
+            frappe.db.sql(f"""
+                DELETE r
+                FROM `tab{reference}` r
+                JOIN `tab{doctype}` p ON p.name = r.`{name_column}`
+                WHERE p.legal_case = %(case)s AND r.`{doctype_column}` = '{doctype}'
+            """, {"case": name})
+        frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE legal_case = %(case)s", {"case": name})
+
+@frappe.whitelist()
+def rehydrate_case(legal_case):
+    """Queue the restore of an archived case's records into the hot tables"""
+    case = frappe.get_doc("Legal Case", legal_case)
+    case.check_permission("write")
+    if case.status != "Archived" or not case.archive_file:
+        frappe.throw(_("Legal Case {0} is not archived").format(legal_case))
+
+    frappe.enqueue(run_case_rehydration,
+        queue="long",
+        timeout=REHYDRATE_JOB_TIMEOUT,
+        job_id=f"case_rehydration::{legal_case}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        legal_case=legal_case
+    )
+
+def run_case_rehydration(legal_case):
+    """Background job: bulk-insert the archived rows, restore the case and drop the archive file"""
+    case = frappe.db.get_value("Legal Case", legal_case,
+        ["name", "status", "archive_file", "status_before_archive"], as_dict=True)
+    if not case or case.status != "Archived":
+        return
+
+    path = frappe.get_site_path(case.archive_file.lstrip("/"))
+    columns = {}
+    restored = 0
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for batch in iter_batches(archive, INSERT_BATCH_SIZE):
+            for doctype, records in groupby(batch, key=lambda record: record["doctype"]):
+                if doctype not in columns:
+                    columns[doctype] = set(frappe.db.get_table_columns(doctype))
+                restored += insert_rows(doctype, [record["row"] for record in records], columns[doctype])
+
+    frappe.db.sql("""
+        UPDATE `tabLegal Case`
+        SET status = %(status)s, status_before_archive = NULL, archived_on = NULL,
+            archive_file = NULL, archived_rows = 0, rehydrated_on = %(now)s, modified = %(now)s
+        WHERE name = %(name)s
+    """, {"name": legal_case, "status": case.status_before_archive or "Closed", "now": now_datetime()})
+
+    for file in frappe.get_all("File", filters={"attached_to_doctype": "Legal Case", "attached_to_name": legal_case,
+            "file_url": case.archive_file}, pluck="name"):
+        frappe.delete_doc("File", file, ignore_permissions=True)
+
+    frappe.db.commit()
+    frappe.publish_realtime("case_rehydrated", {"legal_case": legal_case, "rows": restored}, user=frappe.session.user)
+
+def iter_batches(archive, size):
+    batch = []
+    for line in archive:
+        if line.strip():
+            batch.append(json.loads(line))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert_rows(doctype, rows, table_columns):
+    """Multi-row INSERT of archived rows, keeping only columns the table still has"""
+    fields = [field for field in rows[0] if field in table_columns]
+    frappe.db.bulk_insert(doctype,
+        fields=fields,
+        values=[tuple(row.get(field) for field in fields) for row in rows],
+        ignore_duplicates=True
+    )
+    return len(rows)
+
+def check_case_not_archived(legal_case, status=None):
+    """
+    Refuse new records on an archived case; it has to be rehydrated first.
+    Bulk loaders pass the case status they prefetched to avoid a lookup per document.
+    """
+    if not legal_case:
+        return
+    if status is None:
+        status = frappe.db.get_value("Legal Case", legal_case, "status")
+    if status == "Archived":
+        frappe.throw(_("Legal Case {0} is archived. Restore it before adding or changing its records.")
+            .format(legal_case))
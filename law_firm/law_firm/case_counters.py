@@ -0,0 +1,132 @@
+# case_counters.py
+"""
+Denormalized counters on Legal Case.
+
+Total and billable hours, billed and outstanding amounts and the document
+and hearing counts are kept on the Legal Case row itself. Submitting or
+cancelling a Time Entry or Legal Invoice, and adding or removing a Legal
+Document or Court Hearing, applies its delta with a single increment
+UPDATE, so concurrent writers never overwrite each other and case headers
+and list views read one row. A scheduled reconcile recomputes the counters
+of every case from the source rows, chunk by chunk, to repair any drift
+left by writes that bypassed the document hooks.
+"""
+import frappe
+from frappe.utils import flt, now
+
+RECONCILE_CHUNK_SIZE = 500
+
+COUNTER_FIELDS = ("total_hours", "billable_hours", "billed_amount", "outstanding_amount",
+    "document_count", "hearing_count")
+
+
+def apply_case_counters(legal_case, **deltas):
+    """Add the deltas to the counters of a Legal Case in one atomic UPDATE"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not legal_case or not deltas:
+        return
+
+    assignments = ", ".join(f"`{field}` = IFNULL(`{field}`, 0) + %({field})s" for field in deltas)
+    frappe.db.sql(f"""
+        UPDATE `tabLegal Case`
+        SET {assignments}
+        WHERE name = %(legal_case)s
+    """, {**deltas, "legal_case": legal_case})
+
+def update_time_entry_counters(entry, sign=1):
+    """Add (sign=1) or remove (sign=-1) a submitted Time Entry's hours"""
+    apply_case_counters(entry.legal_case,
+        total_hours=sign * flt(entry.hours),
+        billable_hours=sign * flt(entry.billable_hours)
+    )
+
+def update_invoice_counters(invoice, sign=1):
+    """Add (sign=1) or remove (sign=-1) a submitted Legal Invoice's totals"""
+    apply_case_counters(invoice.legal_case,
+        billed_amount=sign * flt(invoice.grand_total),
+        outstanding_amount=sign * flt(invoice.balance_due)
+    )
+
+def update_invoice_balance_counter(invoice):
+    """Carry a change of balance_due on a submitted invoice (e.g. a payment) to its case"""
+    previous = invoice.get_doc_before_save()
+    if previous:
+        apply_case_counters(invoice.legal_case,
+            outstanding_amount=flt(invoice.balance_due) - flt(previous.balance_due))
+
+def update_count_counter(doc, field, sign=1):
+    """Count a Legal Document or Court Hearing in (sign=1) or out of (sign=-1) its case"""
+    apply_case_counters(doc.legal_case, **{field: sign})
+
+def move_count_counter(doc, field):
+    """Move a Legal Document or Court Hearing's count when it is relinked to another case"""
+    previous = doc.get_doc_before_save()
+    if previous and previous.legal_case != doc.legal_case:
+        apply_case_counters(previous.legal_case, **{field: -1})
+        apply_case_counters(doc.legal_case, **{field: 1})
+
+def get_case_counters(legal_case):
+    """Current counters of a Legal Case, read from its row"""
+    return frappe.db.get_value("Legal Case", legal_case, COUNTER_FIELDS, as_dict=True) or {}
+
+def reconcile_case_counters(chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Scheduled job: recompute the counters of every Legal Case from the source rows.
+    Archived cases keep the counters they had, since their rows are no longer in the hot tables.
+    Each chunk of cases is repaired by one UPDATE joined to per-case aggregates.
+    """
+    last_name = ""
+    while True:
+        names = frappe.db.sql_list("""
+            SELECT name
+            FROM `tabLegal Case`
+            WHERE name > %(last_name)s
+            AND status != 'Archived'
+            ORDER BY name
+            LIMIT %(limit)s
+        """, {"last_name": last_name, "limit": chunk_size})
+        if not names:
+            break
+
+        reconcile_cases(names)
+        frappe.db.commit()
+        last_name = names[-1]
+
+def reconcile_cases(names):
+    """Overwrite the counters of the given cases with aggregates of their source rows"""
+    frappe.db.sql("""
+        UPDATE `tabLegal Case` c
+        LEFT JOIN (
+            SELECT legal_case, SUM(hours) AS hours, SUM(billable_hours) AS billable_hours
+            FROM `tabTime Entry`
+            WHERE legal_case IN %(names)s AND docstatus = 1
+            GROUP BY legal_case
+        ) t ON t.legal_case = c.name
+        LEFT JOIN (
+            SELECT legal_case, SUM(grand_total) AS billed, SUM(balance_due) AS outstanding
+            FROM `tabLegal Invoice`
+            WHERE legal_case IN %(names)s AND docstatus = 1
+            GROUP BY legal_case
+        ) i ON i.legal_case = c.name
+        LEFT JOIN (
+            SELECT legal_case, COUNT(*) AS count
+            FROM `tabLegal Document`
+            WHERE legal_case IN %(names)s
+            GROUP BY legal_case
+        ) d ON d.legal_case = c.name
+        LEFT JOIN (
+            SELECT legal_case, COUNT(*) AS count
+            FROM `tabCourt Hearing`
+            WHERE legal_case IN %(names)s
+            GROUP BY legal_case
+        ) h ON h.legal_case = c.name
+        SET
+            c.total_hours = IFNULL(t.hours, 0),
+            c.billable_hours = IFNULL(t.billable_hours, 0),
+            c.billed_amount = IFNULL(i.billed, 0),
+            c.outstanding_amount = IFNULL(i.outstanding, 0),
+            c.document_count = IFNULL(d.count, 0),
+            c.hearing_count = IFNULL(h.count, 0),
+            c.counters_reconciled_on = %(now)s
+        WHERE c.name IN %(names)s
+    """, {"names": tuple(names), "now": now()})
@@ -0,0 +1,240 @@
+# case_export.py
+"""
+Bulk export of case summary and billing reports.
+
+Instead of one generate_case_report call per case, a background job reads
+the selected cases a chunk at a time with two queries per chunk (time by
+attorney and activity, invoices), takes the case totals from the counters
+kept on Legal Case, and streams the rows out as CSV tables, XLSX sheets or
+one JSON report per case, zipped into a private File.
+"""
+import csv
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime, flt
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_JOB_TIMEOUT = 60 * 60
+EXPORT_FORMATS = ("csv", "xlsx", "json")
+REPORT_TYPES = ("summary", "billing")
+
+CASE_FIELDS = ["name", "case_title", "client", "practice_area", "status", "lead_attorney", "date_opened"]
+# Totals read from the counters maintained on Legal Case instead of being aggregated per chunk
+COUNTER_FIELDS = ["total_hours", "billable_hours", "billed_amount", "outstanding_amount", "document_count",
+    "hearing_count"]
+
+# Tables written for each report type, with their columns
+EXPORT_TABLES = {
+    "cases": CASE_FIELDS + ["total_hours", "billable_hours", "time_value", "invoice_count",
+        "total_billed", "total_outstanding", "document_count", "hearing_count"],
+    "time_by_activity": ["legal_case", "activity_type", "count", "hours", "billable_hours", "billable_amount"],
+    "time_by_attorney": ["legal_case", "employee", "activity_type", "count", "hours", "billable_hours",
+        "billable_amount"],
+    "invoices": ["legal_case", "name", "invoice_date", "grand_total", "balance_due", "status"]
+}
+REPORT_TABLES = {
+    "summary": ["cases", "time_by_activity"],
+    "billing": ["cases", "time_by_attorney", "invoices"]
+}
+
+
+@frappe.whitelist()
+def start_case_report_export(filters=None, report_types=None, file_format="csv"):
+    """
+    Queue an export of the summary and/or billing reports of every Legal Case matching `filters`
+    (e.g. {"practice_area": "Tax Law"} or {"client": "..."}). Progress and the resulting file URL
+    are published to the requesting user.
+    """
+    frappe.has_permission("Legal Case", "export", throw=True)
+
+    filters = frappe.parse_json(filters) if isinstance(filters, str) else (filters or {})
+    report_types = frappe.parse_json(report_types) if isinstance(report_types, str) else report_types
+    report_types = [report_type for report_type in (report_types or REPORT_TYPES) if report_type in REPORT_TYPES]
+    if not report_types:
+        frappe.throw(_("Choose at least one of: {0}").format(", ".join(REPORT_TYPES)))
+    if file_format not in EXPORT_FORMATS:
+        frappe.throw(_("Format must be one of: {0}").format(", ".join(EXPORT_FORMATS)))
+
+    frappe.enqueue(run_case_report_export,
+        queue="long",
+        timeout=EXPORT_JOB_TIMEOUT,
+        filters=filters,
+        report_types=report_types,
+        file_format=file_format
+    )
+
+def run_case_report_export(filters, report_types, file_format="csv"):
+    """Background job: export the matching cases chunk by chunk and publish the ZIP"""
+    cases = frappe.get_list("Legal Case", filters=filters, fields=CASE_FIELDS + COUNTER_FIELDS, order_by="name",
+        limit_page_length=0)
+    tables = list(dict.fromkeys(table for report_type in report_types for table in REPORT_TABLES[report_type]))
+
+    workdir = tempfile.mkdtemp(prefix="case_export_")
+    try:
+        writer = get_writer(file_format, workdir, tables)
+        for start in range(0, len(cases), EXPORT_CHUNK_SIZE):
+            chunk = cases[start:start + EXPORT_CHUNK_SIZE]
+            writer.write_chunk(build_chunk_tables(chunk, tables))
+            publish_export_progress(len(cases), start + len(chunk))
+        writer.close()
+
+        file_url = save_zip(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    frappe.publish_realtime("case_report_export_ready", {"file_url": file_url, "cases": len(cases)},
+        user=frappe.session.user)
+
+def build_chunk_tables(cases, tables):
+    """Rows of every requested table for a chunk of cases, from one query per source"""
+    names = tuple(case.name for case in cases)
+    rows = {table: [] for table in tables}
+
+    time_rows = frappe.db.sql("""
+        SELECT legal_case, employee, activity_type, COUNT(*) as count, SUM(hours) as hours,
+            SUM(billable_hours) as billable_hours, SUM(billable_amount) as billable_amount
+        FROM `tabTime Entry`
+        WHERE legal_case IN %(cases)s AND docstatus = 1
+        GROUP BY legal_case, employee, activity_type
+        ORDER BY legal_case, employee, activity_type
+    """, {"cases": names}, as_dict=True)
+    invoices = frappe.db.sql("""
+        SELECT legal_case, name, invoice_date, grand_total, balance_due, status
+        FROM `tabLegal Invoice`
+        WHERE legal_case IN %(cases)s AND docstatus = 1
+        ORDER BY legal_case, invoice_date
+    """, {"cases": names}, as_dict=True)
+
+    time_values, by_activity = {}, {}
+    for row in time_rows:
+        time_values[row.legal_case] = time_values.get(row.legal_case, 0) + flt(row.billable_amount)
+
+        activity = by_activity.setdefault((row.legal_case, row.activity_type), {
+            "legal_case": row.legal_case, "activity_type": row.activity_type,
+            "count": 0, "hours": 0, "billable_hours": 0, "billable_amount": 0
+        })
+        for field in ("count", "hours", "billable_hours", "billable_amount"):
+            activity[field] += flt(row[field])
+
+    invoice_counts = {}
+    for invoice in invoices:
+        invoice_counts[invoice.legal_case] = invoice_counts.get(invoice.legal_case, 0) + 1
+
+    for case in cases:
+        rows["cases"].append({
+            **case,
+            "time_value": time_values.get(case.name, 0),
+            "invoice_count": invoice_counts.get(case.name, 0),
+            "total_billed": case.billed_amount or 0,
+            "total_outstanding": case.outstanding_amount or 0
+        })
+    if "time_by_activity" in rows:
+        rows["time_by_activity"] = list(by_activity.values())
+    if "time_by_attorney" in rows:
+        rows["time_by_attorney"] = time_rows
+    if "invoices" in rows:
+        rows["invoices"] = invoices
+
+    return rows
+
+def get_writer(file_format, workdir, tables):
+    if file_format == "json":
+        return JSONCaseWriter(workdir, tables)
+    if file_format == "xlsx":
+        return XLSXTableWriter(workdir, tables)
+    return CSVTableWriter(workdir, tables)
+
+class CSVTableWriter:
+    """One CSV file per table, appended to chunk by chunk"""
+
+    def __init__(self, workdir, tables):
+        self.files = {table: open(os.path.join(workdir, f"{table}.csv"), "w", newline="") for table in tables}
+        self.writers = {}
+        for table, file in self.files.items():
+            self.writers[table] = csv.DictWriter(file, fieldnames=EXPORT_TABLES[table], extrasaction="ignore")
+            self.writers[table].writeheader()
+
+    def write_chunk(self, rows):
+        for table, table_rows in rows.items():
+            self.writers[table].writerows(table_rows)
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+class XLSXTableWriter:
+    """One sheet per table in a write-only workbook, so rows are not all held in memory"""
+
+    def __init__(self, workdir, tables):
+        from openpyxl import Workbook
+
+        self.path = os.path.join(workdir, "case_reports.xlsx")
+        self.workbook = Workbook(write_only=True)
+        self.sheets = {}
+        for table in tables:
+            self.sheets[table] = self.workbook.create_sheet(title=table)
+            self.sheets[table].append(EXPORT_TABLES[table])
+
+    def write_chunk(self, rows):
+        for table, table_rows in rows.items():
+            columns = EXPORT_TABLES[table]
+            for row in table_rows:
+                self.sheets[table].append([row.get(column) for column in columns])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+class JSONCaseWriter:
+    """One JSON report per case, holding that case's rows of every table"""
+
+    def __init__(self, workdir, tables):
+        self.directory = os.path.join(workdir, "cases")
+        os.makedirs(self.directory)
+
+    def write_chunk(self, rows):
+        reports = {}
+        for case in rows["cases"]:
+            reports[case["name"]] = {"case": case}
+        for table, table_rows in rows.items():
+            if table == "cases":
+                continue
+            for row in table_rows:
+                reports[row["legal_case"]].setdefault(table, []).append(row)
+
+        for name, report in reports.items():
+            with open(os.path.join(self.directory, f"{name.replace('/', '-')}.json"), "w") as f:
+                json.dump(report, f, default=str, indent=1)
+
+    def close(self):
+        pass
+
+def save_zip(workdir):
+    """Zip everything the writer produced into a private File; returns its URL"""
+    zip_name = f"case-reports-{now_datetime().strftime('%Y%m%d-%H%M%S')}-{frappe.generate_hash(length=6)}.zip"
+    zip_path = frappe.get_site_path("private", "files", zip_name)
+
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for root, _dirs, files in os.walk(workdir):
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                archive.write(path, arcname=os.path.relpath(path, workdir))
+
+    file = frappe.get_doc({
+        "doctype": "File",
+        "file_name": zip_name,
+        "file_url": f"/private/files/{zip_name}",
+        "is_private": 1
+    })
+    file.insert(ignore_permissions=True)
+    frappe.db.commit()
+    return file.file_url
+
+def publish_export_progress(total, done):
+    frappe.publish_progress(done * 100 / total if total else 100, title=_("Exporting case reports"),
+        description=_("{0} of {1} cases").format(done, total))
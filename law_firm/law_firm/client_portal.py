@@ -0,0 +1,175 @@
+# client_portal.py
+"""
+Data service behind the client portal.
+
+The client is resolved through the indexed Client.email column and only the
+fields the portal shows are read. Cases and invoices come in pages, and the
+summary is taken from the counters kept on Legal Case. Each response is
+cached per client under a generation-stamped key with an ETag of its
+content; events on the client's cases, invoices and time entries move the
+client to a new generation. A refresh that sends the ETag back in
+If-None-Match while nothing changed is answered with 304 and no body, at
+the cost of one indexed lookup and two Redis reads.
+"""
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+PORTAL_TTL = 60 * 60
+MAX_PORTAL_PAGE = 100
+RECENT_ACTIVITY_COUNT = 20
+
+PORTAL_CLIENT_FIELDS = ["name", "client_name", "client_type", "status", "client_id", "email", "mobile", "phone",
+    "primary_contact", "preferred_contact", "full_address", "billing_currency", "payment_terms", "client_since"]
+PORTAL_CASE_FIELDS = ["name", "case_title", "status", "practice_area", "date_opened", "lead_attorney",
+    "next_hearing_date", "total_hours", "outstanding_amount"]
+PORTAL_INVOICE_FIELDS = ["name", "legal_case", "invoice_date", "due_date", "grand_total", "balance_due", "status"]
+PORTAL_ACTIVITY_FIELDS = ["activity_type", "hours", "activity_date", "legal_case"]
+
+ACTIVE_CASE_STATUSES = ("Open", "In Progress")
+
+
+def get_portal_data(client_email, cases_start=0, invoices_start=0, page_length=20):
+    """
+    Portal payload for the client with this email, from cache when nothing changed.
+    Returns None with HTTP 304 when the request's If-None-Match matches the current ETag.
+    """
+    client = get_portal_client(client_email)
+    cases_start, invoices_start = cint(cases_start), cint(invoices_start)
+    page_length = min(cint(page_length) or 20, MAX_PORTAL_PAGE)
+
+    cache = frappe.cache()
+    key = (f"law_firm:client_portal:{client.name}:{get_generation(client.name)}:"
+        f"{cases_start}:{invoices_start}:{page_length}")
+    cached = cache.get_value(key)
+    if cached is None:
+        data = build_portal_data(client, cases_start, invoices_start, page_length)
+        cached = {"etag": make_etag(data), "data": data}
+        cache.set_value(key, cached, expires_in_sec=PORTAL_TTL)
+
+    set_response_header("ETag", cached["etag"])
+    set_response_header("Cache-Control", "private, no-cache")
+    if cached["etag"] in get_if_none_match():
+        frappe.local.response["http_status_code"] = 304
+        return None
+
+    return cached["data"]
+
+def get_portal_client(client_email):
+    """Portal fields of the client with this email; only its own user or readers of that client may ask"""
+    email = (client_email or "").strip()
+    if not email:
+        frappe.throw(_("Client email is required"))
+
+    is_own_portal = email.lower() == (frappe.session.user or "").lower()
+    if not is_own_portal and not frappe.has_permission("Client", "read"):
+        raise frappe.PermissionError(_("Not permitted to view this client's portal"))
+
+    client = frappe.db.get_value("Client", {"email": email}, PORTAL_CLIENT_FIELDS, as_dict=True)
+    if not client:
+        frappe.throw(_("No client found for {0}").format(email), frappe.DoesNotExistError)
+
+    # Client readers may still be limited to some clients by User Permissions
+    if not is_own_portal:
+        frappe.has_permission("Client", "read", client.name, throw=True)
+    return client
+
+def build_portal_data(client, cases_start, invoices_start, page_length):
+    """One page of cases and invoices, recent activity and the summary, all projected to portal fields"""
+    summary = frappe.db.sql("""
+        SELECT COUNT(*) AS total_cases,
+            IFNULL(SUM(status IN %(active)s), 0) AS active_cases,
+            IFNULL(SUM(outstanding_amount), 0) AS total_outstanding
+        FROM `tabLegal Case`
+        WHERE client = %(client)s
+    """, {"client": client.name, "active": ACTIVE_CASE_STATUSES}, as_dict=True)[0]
+
+    cases = frappe.get_all("Legal Case",
+        filters={"client": client.name},
+        fields=PORTAL_CASE_FIELDS,
+        order_by="date_opened desc, name desc",
+        limit_start=cases_start,
+        limit_page_length=page_length
+    )
+    invoices = frappe.get_all("Legal Invoice",
+        filters={"client": client.name, "docstatus": 1},
+        fields=PORTAL_INVOICE_FIELDS,
+        order_by="invoice_date desc, name desc",
+        limit_start=invoices_start,
+        limit_page_length=page_length + 1
+    )
+    recent_activities = frappe.get_all("Time Entry",
+        filters={"client": client.name, "docstatus": 1},
+        fields=PORTAL_ACTIVITY_FIELDS,
+        order_by="activity_date desc",
+        limit_page_length=RECENT_ACTIVITY_COUNT
+    )
+
+    has_more_invoices = len(invoices) > page_length
+    return {
+        "client": client,
+        "cases": {
+            "data": cases,
+            "next_start": cases_start + page_length if cases_start + page_length < summary.total_cases else None
+        },
+        "invoices": {
+            "data": invoices[:page_length],
+            "next_start": invoices_start + page_length if has_more_invoices else None
+        },
+        "recent_activities": recent_activities,
+        "summary": summary
+    }
+
+def make_etag(data):
+    return '"{0}"'.format(hashlib.sha1(frappe.as_json(data).encode()).hexdigest())
+
+def get_if_none_match():
+    """ETags listed in the request's If-None-Match header"""
+    header = frappe.get_request_header("If-None-Match") or ""
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+def set_response_header(name, value):
+    headers = getattr(frappe.local, "response_headers", None)
+    if headers is not None:
+        headers[name] = value
+
+def get_generation(client):
+    """Current generation of a client's portal cache, offset by the firm-wide generation"""
+    cache = frappe.cache()
+    generations = [cache.get(cache.make_key(f"law_firm:client_portal:{scope}:generation"))
+        for scope in (client, "all")]
+    return "-".join(str(int(generation or 0)) for generation in generations)
+
+def invalidate_client_portal(clients):
+    """Move the given clients to a new portal generation so their cached payloads are ignored"""
+    cache = frappe.cache()
+    for client in clients:
+        cache.incr(cache.make_key(f"law_firm:client_portal:{client}:generation"))
+
+def invalidate_all_client_portals():
+    """Drop every cached portal payload, after bulk updates that touch many clients"""
+    cache = frappe.cache()
+    cache.incr(cache.make_key("law_firm:client_portal:all:generation"))
+
+def invalidate_for_doc(doc, method=None):
+    """Doc event hook: drop the portal cache of the clients this document belongs to once committed"""
+    clients = {get_doc_client(doc)}
+    previous = doc.get_doc_before_save() if doc.doctype != "Client" else None
+    if previous:
+        clients.add(get_doc_client(previous))
+
+    clients.discard(None)
+    clients.discard("")
+    if clients:
+        frappe.db.after_commit.add(lambda: invalidate_client_portal(clients))
+
+def get_doc_client(doc):
+    """Client a document belongs to; documents without a client field (e.g. Court Hearing) go through their case"""
+    if doc.doctype == "Client":
+        return doc.name
+    if doc.meta.has_field("client"):
+        return doc.get("client")
+    if doc.get("legal_case"):
+        return frappe.db.get_value("Legal Case", doc.legal_case, "client")
@@ -0,0 +1,87 @@
+# dashboard_cache.py
+"""
+Per-section cache for the firm dashboard.
+
+Each section is stored in the site Redis cache under a generation-stamped key.
+Doc events bump the generation of the sections a doctype feeds, so a stale
+value is never read again and simply expires. Concurrent misses are coalesced
+behind a short Redis lock so only one worker recomputes a section.
+"""
+import time
+
+import frappe
+
+# Seconds each section may be served from cache before it is recomputed
+SECTION_TTL = {
+    "summary_cards": 300,
+    "case_statistics": 900,
+    "billing_overview": 900,
+    "recent_activities": 60,
+    "upcoming_deadlines": 600,
+    "team_productivity": 900
+}
+
+# Sections whose data comes (at least partly) from each doctype
+SECTION_DEPENDENCIES = {
+    "Legal Case": ["summary_cards", "case_statistics", "recent_activities", "upcoming_deadlines"],
+    "Time Entry": ["summary_cards", "recent_activities", "team_productivity"],
+    "Legal Invoice": ["summary_cards", "billing_overview", "recent_activities"],
+    "Court Hearing": ["upcoming_deadlines", "recent_activities"],
+    "Legal Document": ["recent_activities"]
+}
+
+LOCK_TIMEOUT = 30  # seconds a worker may hold the recompute lock
+POLL_INTERVAL = 0.1  # seconds between checks while another worker recomputes
+
+
+def get_cached_section(section, compute):
+    """Return a dashboard section from cache, computing it at most once across workers"""
+    cache = frappe.cache()
+    key = get_section_key(section)
+
+    value = cache.get_value(key)
+    if value is not None:
+        return value
+
+    lock_key = cache.make_key(f"{key}:lock")
+    if cache.set(lock_key, 1, nx=True, ex=LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set_value(key, value, expires_in_sec=SECTION_TTL[section])
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    # Another worker holds the lock; wait for its result instead of piling on the database
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get_value(key)
+        if value is not None:
+            return value
+        # lock_key is already prefixed; exists() would prefix it again
+        if cache.get(lock_key) is None:
+            break
+
+    return compute()
+
+def get_section_key(section):
+    """Cache key for the current generation of a section"""
+    return f"law_firm:dashboard:{section}:{get_generation(section)}"
+
+def get_generation(section):
+    """Current generation counter of a section"""
+    cache = frappe.cache()
+    return int(cache.get(cache.make_key(f"law_firm:dashboard:{section}:generation")) or 0)
+
+def invalidate_sections(sections):
+    """Move the given sections to a new generation so their cached values are ignored"""
+    cache = frappe.cache()
+    for section in sections:
+        cache.incr(cache.make_key(f"law_firm:dashboard:{section}:generation"))
+
+def invalidate_for_doc(doc, method=None):
+    """Doc event hook: drop the dashboard sections fed by this document once the change is committed"""
+    sections = SECTION_DEPENDENCIES.get(doc.doctype)
+    if sections:
+        frappe.db.after_commit.add(lambda: invalidate_sections(sections))
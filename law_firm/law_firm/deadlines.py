@@ -0,0 +1,269 @@
+# deadlines.py
+"""
+Denormalized deadline calendar.
+
+Statutes of limitations and court hearings are copied into Case Deadline,
+one row per deadline and responsible attorney, so calendar views are range
+reads on (deadline_date, attorney). Rows are never deleted: a deadline that
+goes away becomes a Cancelled tombstone with a fresh `modified`, which is
+what lets calendar clients sync incrementally.
+"""
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import getdate, get_time, get_datetime, now, cint
+from werkzeug.wrappers import Response
+
+CLOSED_CASE_STATUSES = ["Closed", "Settled", "Dismissed", "Cancelled", "Archived"]
+INACTIVE_HEARING_STATUSES = ["Completed", "Cancelled"]
+
+# Fields compared when deciding whether a deadline row needs rewriting
+DEADLINE_FIELDS = ["deadline_type", "deadline_date", "deadline_time", "attorney", "title",
+    "priority", "legal_case", "client"]
+
+MAX_WINDOW_ROWS = 500
+
+
+def deadline_key(reference_doctype, reference_name, deadline_type, attorney):
+    """Deterministic Case Deadline name (mirrored by the SQL in rebuild_deadlines)"""
+    key = "|".join([reference_doctype, reference_name, deadline_type, attorney or ""])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def sync_case_deadlines(case):
+    """Keep the statute of limitations deadline of a Legal Case in the calendar"""
+    deadlines = []
+    if case.statute_of_limitations and case.status not in CLOSED_CASE_STATUSES:
+        deadlines.append({
+            "deadline_type": "Statute of Limitations",
+            "deadline_date": case.statute_of_limitations,
+            "deadline_time": None,
+            "attorney": case.lead_attorney,
+            "title": case.case_title,
+            "priority": "High",
+            "legal_case": case.name,
+            "client": case.client
+        })
+
+    sync_deadlines("Legal Case", case.name, deadlines)
+
+def sync_hearing_deadlines(hearing):
+    """Keep a Court Hearing in the calendar of every attending attorney"""
+    deadlines = []
+    if hearing.hearing_date and hearing.status not in INACTIVE_HEARING_STATUSES:
+        client = frappe.db.get_value("Legal Case", hearing.legal_case, "client")
+        attorneys = {member.team_member for member in hearing.attending_attorneys if member.team_member}
+        for attorney in sorted(attorneys) or [None]:
+            deadlines.append({
+                "deadline_type": "Court Hearing",
+                "deadline_date": hearing.hearing_date,
+                "deadline_time": hearing.hearing_time,
+                "attorney": attorney,
+                "title": hearing.hearing_title or hearing.hearing_type,
+                "priority": "Medium",
+                "legal_case": hearing.legal_case,
+                "client": client
+            })
+
+    sync_deadlines("Court Hearing", hearing.name, deadlines)
+
+def clear_deadlines(reference_doctype, reference_name):
+    """Tombstone every deadline of a document that was cancelled or deleted"""
+    sync_deadlines(reference_doctype, reference_name, [])
+
+def cancel_deadlines(reference_doctype, reference_names):
+    """Tombstone the active deadlines of many documents with one UPDATE (for set-based batch jobs)"""
+    if reference_names:
+        frappe.db.sql("""
+            UPDATE `tabCase Deadline`
+            SET status = 'Cancelled', modified = %(now)s
+            WHERE reference_doctype = %(doctype)s AND reference_name IN %(names)s AND status != 'Cancelled'
+        """, {"now": now(), "doctype": reference_doctype, "names": tuple(reference_names)})
+
+def sync_deadlines(reference_doctype, reference_name, deadlines):
+    """
+    Make the Case Deadline rows of one source document match `deadlines`.
+    Unchanged rows are left alone so their `modified` - the sync watermark - does not move.
+    """
+    existing = {
+        row.name: row for row in frappe.get_all("Case Deadline",
+            filters={"reference_doctype": reference_doctype, "reference_name": reference_name},
+            fields=["name", "status"] + DEADLINE_FIELDS
+        )
+    }
+
+    for deadline in deadlines:
+        name = deadline_key(reference_doctype, reference_name, deadline["deadline_type"], deadline["attorney"])
+        values = {**normalize_deadline(deadline), "status": "Active"}
+        current = existing.pop(name, None)
+
+        if not current:
+            frappe.get_doc({
+                "doctype": "Case Deadline",
+                "name": name,
+                "reference_doctype": reference_doctype,
+                "reference_name": reference_name,
+                **values
+            }).db_insert()
+        elif normalize_deadline(current) != normalize_deadline(values) or current.status != "Active":
+            frappe.db.set_value("Case Deadline", name, values)
+
+    for name, current in existing.items():
+        if current.status != "Cancelled":
+            frappe.db.set_value("Case Deadline", name, "status", "Cancelled")
+
+def normalize_deadline(deadline):
+    """Comparable copy of a deadline, whether it came from a document or from the database"""
+    values = {fieldname: deadline.get(fieldname) or None for fieldname in DEADLINE_FIELDS}
+    if values["deadline_date"]:
+        values["deadline_date"] = getdate(values["deadline_date"])
+    if values["deadline_time"]:
+        values["deadline_time"] = get_time(values["deadline_time"])
+    return values
+
+@frappe.whitelist()
+def get_deadlines(from_date, to_date, attorney=None, limit=MAX_WINDOW_ROWS):
+    """Get the active deadlines in the half-open window [from_date, to_date), optionally for one attorney"""
+    frappe.has_permission("Case Deadline", throw=True)
+
+    conditions = ["deadline_date >= %(from_date)s", "deadline_date < %(to_date)s", "status = 'Active'"]
+    values = {
+        "from_date": getdate(from_date),
+        "to_date": getdate(to_date),
+        "limit": min(cint(limit) or MAX_WINDOW_ROWS, MAX_WINDOW_ROWS)
+    }
+    if attorney:
+        conditions.append("attorney = %(attorney)s")
+        values["attorney"] = attorney
+
+    return frappe.db.sql(f"""
+        SELECT name, deadline_type, deadline_date, deadline_time, attorney, title,
+            priority, legal_case, client, reference_doctype, reference_name
+        FROM `tabCase Deadline`
+        WHERE {' AND '.join(conditions)}
+        ORDER BY deadline_date, deadline_time
+        LIMIT %(limit)s
+    """, values, as_dict=True)
+
+@frappe.whitelist()
+def get_attorney_calendar(attorney=None, sync_token=None):
+    """
+    iCalendar feed of one attorney's deadlines.
+    Without a sync_token the feed holds every active deadline from today on; with the
+    X-Sync-Token returned by a previous call it holds only what changed since, with
+    removed deadlines sent as cancelled events.
+    """
+    attorney = attorney or frappe.session.user
+    if attorney != frappe.session.user:
+        frappe.only_for("Legal Manager")
+
+    if sync_token:
+        rows = frappe.db.sql("""
+            SELECT name, deadline_type, deadline_date, deadline_time, title, status,
+                legal_case, modified
+            FROM `tabCase Deadline`
+            WHERE attorney = %s AND modified > %s
+            ORDER BY modified
+        """, (attorney, parse_sync_token(sync_token)), as_dict=True)
+    else:
+        rows = frappe.db.sql("""
+            SELECT name, deadline_type, deadline_date, deadline_time, title, status,
+                legal_case, modified
+            FROM `tabCase Deadline`
+            WHERE deadline_date >= %s AND attorney = %s AND status = 'Active'
+            ORDER BY deadline_date
+        """, (getdate(), attorney), as_dict=True)
+
+    # The newest row seen becomes the watermark; with no changes the old token stays valid
+    next_token = str(max(row.modified for row in rows)) if rows else (sync_token or now())
+
+    response = Response(build_ics(rows), mimetype="text/calendar")
+    response.headers["Content-Disposition"] = 'inline; filename="deadlines.ics"'
+    response.headers["X-Sync-Token"] = next_token
+    return response
+
+def parse_sync_token(sync_token):
+    """Watermark timestamp carried by a calendar sync token"""
+    try:
+        return get_datetime(sync_token)
+    except Exception:
+        frappe.throw(_("Invalid calendar sync token"))
+
+def build_ics(rows):
+    """Render deadline rows as an iCalendar document"""
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Law Firm Management System//Deadlines//EN",
+        "CALSCALE:GREGORIAN"
+    ]
+
+    for row in rows:
+        date = getdate(row.deadline_date)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{row.name}@law-firm",
+            f"DTSTAMP:{get_datetime(row.modified).strftime('%Y%m%dT%H%M%S')}"
+        ]
+        if row.deadline_time:
+            start = get_datetime(f"{date} {get_time(row.deadline_time)}")
+            lines.append(f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}")
+        else:
+            lines.append(f"DTSTART;VALUE=DATE:{date.strftime('%Y%m%d')}")
+        lines += [
+            f"SUMMARY:{escape_ics_text(f'{row.deadline_type}: {row.title}')}",
+            f"DESCRIPTION:{escape_ics_text(f'Case: {row.legal_case}')}",
+            f"STATUS:{'CANCELLED' if row.status == 'Cancelled' else 'CONFIRMED'}",
+            "END:VEVENT"
+        ]
+
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+def escape_ics_text(text):
+    """Escape a TEXT value per RFC 5545"""
+    return (str(text or "").replace("\\", "\\\\").replace(";", "\\;")
+        .replace(",", "\\,").replace("\n", "\\n"))
+
+def rebuild_deadlines():
+    """Recreate the whole deadline calendar from Legal Cases and Court Hearings (set-based)"""
+    timestamp = now()
+    closed = ", ".join(frappe.db.escape(status) for status in CLOSED_CASE_STATUSES)
+    inactive = ", ".join(frappe.db.escape(status) for status in INACTIVE_HEARING_STATUSES)
+
+    frappe.db.sql("DELETE FROM `tabCase Deadline`")
+    frappe.db.sql(f"""
+        INSERT INTO `tabCase Deadline`
+            (name, creation, modified, owner, modified_by, deadline_type, deadline_date,
+             attorney, title, priority, status, legal_case, client, reference_doctype, reference_name)
+        SELECT
+            SHA1(CONCAT_WS('|', 'Legal Case', c.name, 'Statute of Limitations', IFNULL(c.lead_attorney, ''))),
+            %(now)s, %(now)s, 'Administrator', 'Administrator',
+            'Statute of Limitations', c.statute_of_limitations,
+            c.lead_attorney, c.case_title, 'High', 'Active', c.name, c.client, 'Legal Case', c.name
+        FROM `tabLegal Case` c
+        WHERE c.statute_of_limitations IS NOT NULL
+        AND c.status NOT IN ({closed})
+    """, {"now": timestamp})
+    frappe.db.sql(f"""
+        INSERT INTO `tabCase Deadline`
+            (name, creation, modified, owner, modified_by, deadline_type, deadline_date, deadline_time,
+             attorney, title, priority, status, legal_case, client, reference_doctype, reference_name)
+        SELECT
+            SHA1(CONCAT_WS('|', 'Court Hearing', h.name, 'Court Hearing', IFNULL(m.team_member, ''))),
+            %(now)s, %(now)s, 'Administrator', 'Administrator',
+            'Court Hearing', h.hearing_date, h.hearing_time,
+            m.team_member, IFNULL(h.hearing_title, h.hearing_type), 'Medium', 'Active',
+            h.legal_case, c.client, 'Court Hearing', h.name
+        FROM `tabCourt Hearing` h
+        LEFT JOIN `tabLegal Case` c ON c.name = h.legal_case
+        LEFT JOIN (
+            SELECT DISTINCT parent, team_member
+            FROM `tabCase Team Member`
+            WHERE parenttype = 'Court Hearing' AND parentfield = 'attending_attorneys'
+            AND team_member IS NOT NULL
+        ) m ON m.parent = h.name
+        WHERE h.hearing_date IS NOT NULL
+        AND IFNULL(h.status, '') NOT IN ({inactive})
+    """, {"now": timestamp})
+    frappe.db.commit()
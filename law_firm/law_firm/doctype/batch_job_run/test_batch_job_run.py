@@ -0,0 +1,41 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+from frappe.utils.background_jobs import get_queues_timeout
+from law_firm.law_firm.batch_jobs import claim_run, get_stale_after_minutes
+
+TEST_JOB = "_test_batch_job"
+
+
+class TestBatchJobRun(FrappeTestCase):
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def make_running(self, minutes_since_heartbeat):
+        return frappe.get_doc({
+            "doctype": "Batch Job Run",
+            "job_name": TEST_JOB,
+            "status": "Running",
+            "started_at": now_datetime(),
+            "heartbeat": add_to_date(now_datetime(), minutes=-minutes_since_heartbeat)
+        }).insert(ignore_permissions=True)
+
+    def claim(self):
+        # Claiming commits; the test keeps it in one transaction that tearDown rolls back
+        with patch.object(frappe.db, "commit"):
+            return claim_run(TEST_JOB)
+
+    def test_runs_are_not_stale_before_any_queue_timeout(self):
+        self.assertGreater(get_stale_after_minutes() * 60, max(get_queues_timeout().values()))
+
+    def test_running_job_within_the_stale_threshold_is_not_taken_over(self):
+        self.make_running(get_stale_after_minutes() - 1)
+        self.assertIsNone(self.claim())
+
+    def test_running_job_past_the_stale_threshold_is_taken_over(self):
+        run = self.make_running(get_stale_after_minutes() + 1)
+        claimed = self.claim()
+        self.assertEqual(claimed.name, run.name)
+        self.assertEqual(frappe.db.get_value("Batch Job Run", run.name, "attempts"), run.attempts + 1)
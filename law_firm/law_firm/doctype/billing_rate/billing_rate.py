@@ -0,0 +1,60 @@
+import frappe
+from frappe.model.document import Document
+from frappe import _
+from frappe.utils import getdate
+from law_firm.law_firm.billing_rates import invalidate_for_rate
+
+class BillingRate(Document):
+    def validate(self):
+        """
+        Validate the rate, its scope and its effective period
+        """
+        if self.rate is None or self.rate <= 0:
+            frappe.throw(_("Hourly Rate must be a positive number"))
+
+        scopes = [field for field in ("legal_case", "client", "practice_area") if self.get(field)]
+        if len(scopes) > 1:
+            frappe.throw(_("A Billing Rate can apply to a Legal Case, a Client or a Practice Area, not several at once"))
+
+        if self.effective_to and getdate(self.effective_to) < getdate(self.effective_from):
+            frappe.throw(_("Effective To cannot be before Effective From"))
+
+        self.validate_overlap()
+
+    def validate_overlap(self):
+        """
+        Two enabled rates for the same scope, attorney and activity type cannot be in force on the same day
+        """
+        if not self.enabled:
+            return
+
+        overlapping = frappe.db.sql("""
+            SELECT name
+            FROM `tabBilling Rate`
+            WHERE enabled = 1 AND name != %(name)s
+            AND IFNULL(employee, '') = %(employee)s
+            AND IFNULL(legal_case, '') = %(legal_case)s
+            AND IFNULL(client, '') = %(client)s
+            AND IFNULL(practice_area, '') = %(practice_area)s
+            AND IFNULL(activity_type, '') = %(activity_type)s
+            AND (effective_to IS NULL OR effective_to >= %(effective_from)s)
+            AND (%(effective_to)s IS NULL OR effective_from <= %(effective_to)s)
+            LIMIT 1
+        """, {
+            "name": self.name or "",
+            "employee": self.employee or "",
+            "legal_case": self.legal_case or "",
+            "client": self.client or "",
+            "practice_area": self.practice_area or "",
+            "activity_type": self.activity_type or "",
+            "effective_from": self.effective_from,
+            "effective_to": self.effective_to or None
+        })
+        if overlapping:
+            frappe.throw(_("Billing Rate {0} already covers part of this period for the same scope").format(overlapping[0][0]))
+
+    def on_update(self):
+        invalidate_for_rate(self)
+
+    def on_trash(self):
+        invalidate_for_rate(self)
@@ -0,0 +1,73 @@
+from frappe.tests.utils import FrappeTestCase
+from law_firm.law_firm.billing_rates import RateTable
+
+
+def make_rate(rate, effective_from="2024-01-01", effective_to=None, **scope):
+    return {"rate": rate, "effective_from": effective_from, "effective_to": effective_to, **scope}
+
+
+class TestBillingRate(FrappeTestCase):
+    def test_effective_date_boundaries(self):
+        table = RateTable([
+            make_rate(100, "2024-01-01", "2024-03-31"),
+            make_rate(120, "2024-05-01")
+        ], generation=0)
+
+        self.assertIsNone(table.resolve(on_date="2023-12-31"))
+        # Both ends of a period are inclusive
+        self.assertEqual(table.resolve(on_date="2024-01-01"), 100)
+        self.assertEqual(table.resolve(on_date="2024-03-31"), 100)
+        # No rate in the gap between two periods
+        self.assertIsNone(table.resolve(on_date="2024-04-15"))
+        self.assertEqual(table.resolve(on_date="2024-05-01"), 120)
+        # An open-ended period runs on
+        self.assertEqual(table.resolve(on_date="2030-01-01"), 120)
+
+    def test_periods_are_ordered_by_start_whatever_the_load_order(self):
+        table = RateTable([
+            make_rate(150, "2025-01-01"),
+            make_rate(100, "2024-01-01", "2024-12-31")
+        ], generation=0)
+
+        self.assertEqual(table.resolve(on_date="2024-12-31"), 100)
+        self.assertEqual(table.resolve(on_date="2025-01-01"), 150)
+
+    def test_scope_precedence(self):
+        table = RateTable([
+            make_rate(100),
+            make_rate(200, practice_area="Family Law"),
+            make_rate(300, client="CLI-1"),
+            make_rate(400, legal_case="CASE-1")
+        ], generation=0)
+
+        work = {"client": "CLI-1", "practice_area": "Family Law", "on_date": "2024-06-01"}
+        self.assertEqual(table.resolve(legal_case="CASE-1", **work), 400)
+        self.assertEqual(table.resolve(legal_case="CASE-2", **work), 300)
+        self.assertEqual(table.resolve(client="CLI-2", practice_area="Family Law", on_date="2024-06-01"), 200)
+        self.assertEqual(table.resolve(client="CLI-2", practice_area="Tax Law", on_date="2024-06-01"), 100)
+
+    def test_attorney_and_activity_narrow_within_a_scope(self):
+        table = RateTable([
+            make_rate(300, client="CLI-1"),
+            make_rate(310, client="CLI-1", activity_type="Research"),
+            make_rate(320, client="CLI-1", employee="EMP-1"),
+            make_rate(330, client="CLI-1", employee="EMP-1", activity_type="Research"),
+            # A firm-wide attorney rate is less specific than any client rate
+            make_rate(900, employee="EMP-1")
+        ], generation=0)
+
+        on_date = "2024-06-01"
+        self.assertEqual(table.resolve("EMP-1", client="CLI-1", activity_type="Research", on_date=on_date), 330)
+        self.assertEqual(table.resolve("EMP-1", client="CLI-1", activity_type="Travel", on_date=on_date), 320)
+        self.assertEqual(table.resolve("EMP-2", client="CLI-1", activity_type="Research", on_date=on_date), 310)
+        self.assertEqual(table.resolve("EMP-2", client="CLI-1", on_date=on_date), 300)
+        self.assertEqual(table.resolve("EMP-1", client="CLI-2", on_date=on_date), 900)
+
+    def test_expired_specific_rate_falls_back_to_broader_scope(self):
+        table = RateTable([
+            make_rate(100),
+            make_rate(400, "2024-01-01", "2024-06-30", legal_case="CASE-1")
+        ], generation=0)
+
+        self.assertEqual(table.resolve(legal_case="CASE-1", on_date="2024-06-30"), 400)
+        self.assertEqual(table.resolve(legal_case="CASE-1", on_date="2024-07-01"), 100)
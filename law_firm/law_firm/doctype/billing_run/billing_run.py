@@ -0,0 +1,24 @@
+import frappe
+from frappe.model.document import Document
+from frappe import _
+from frappe.utils import getdate
+
+MAX_CHUNK_SIZE = 1000
+
+class BillingRun(Document):
+    def validate(self):
+        """
+        Validate the billing period and chunk size
+        """
+        if getdate(self.period_end) > getdate(self.invoice_date):
+            frappe.throw(_("Period End cannot be after the Invoice Date"))
+
+        if not self.chunk_size or self.chunk_size <= 0:
+            self.chunk_size = 200
+        elif self.chunk_size > MAX_CHUNK_SIZE:
+            frappe.throw(_("Chunk Size cannot be more than {0}").format(MAX_CHUNK_SIZE))
+
+        if not self.is_new() and self.cases_processed and (
+            self.has_value_changed("period_end") or self.has_value_changed("invoice_date")
+        ):
+            frappe.throw(_("The billing period cannot be changed once the run has started"))
@@ -0,0 +1,85 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from law_firm.law_firm.billing import bill_cases
+
+TEST_ITEM = "_Test Legal Services"
+TEST_EMPLOYEE = "_Test Billing Attorney"
+
+
+class TestBillingRun(FrappeTestCase):
+    def setUp(self):
+        # Inserted without controllers: only the rows the run reads and links to are needed
+        for doctype, name in (("Item", TEST_ITEM), ("Employee", TEST_EMPLOYEE)):
+            if not frappe.db.exists(doctype, name):
+                frappe.get_doc({"doctype": doctype, "name": name}).db_insert()
+
+        client = frappe.get_doc({
+            "doctype": "Client",
+            "naming_series": "CLI-.YYYY.-",
+            "client_name": "_Test Billing Client",
+            "client_type": "Individual"
+        })
+        client.db_insert()
+        self.client = client.name
+
+        case = frappe.get_doc({
+            "doctype": "Legal Case",
+            "naming_series": "CASE-.YYYY.-",
+            "case_title": "_Test Billing Run Case",
+            "client": self.client,
+            "status": "Open"
+        })
+        case.db_insert()
+        self.case = case.name
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def make_approved_entry(self, hours):
+        entry = frappe.get_doc({
+            "doctype": "Time Entry",
+            "naming_series": "TE-.YYYY.-",
+            "employee": TEST_EMPLOYEE,
+            "legal_case": self.case,
+            "client": self.client,
+            "activity_date": "2024-03-01",
+            "from_time": "09:00:00",
+            "to_time": "10:00:00",
+            "activity_type": "Research",
+            "description": "Research",
+            "billable": 1,
+            "billable_hours": hours,
+            "billing_rate": 200,
+            "billing_status": "Approved",
+            "docstatus": 1
+        })
+        entry.db_insert()
+        return entry.name
+
+    def test_run_invoices_approved_time_and_marks_it_invoiced(self):
+        entries = [self.make_approved_entry(1), self.make_approved_entry(2.5)]
+        run = frappe.get_doc({
+            "doctype": "Billing Run",
+            "invoice_date": "2024-04-01",
+            "period_end": "2024-03-31",
+            "service_item": TEST_ITEM,
+            "payment_terms": "Net 30"
+        })
+
+        invoices, entries_billed, errors = bill_cases(run, [self.case])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(invoices), 1)
+        self.assertEqual(entries_billed, 2)
+
+        invoice = frappe.get_doc("Legal Invoice", invoices[0])
+        self.assertEqual(invoice.payment_terms, "Net 30")
+        self.assertEqual(str(invoice.due_date), "2024-05-01")
+        self.assertEqual(sorted(item.time_entry for item in invoice.items), sorted(entries))
+        self.assertEqual(invoice.grand_total, 700)
+
+        for entry in entries:
+            row = frappe.db.get_value("Time Entry", entry,
+                ["invoiced", "invoice_reference", "billing_status"], as_dict=True)
+            self.assertEqual((row.invoiced, row.invoice_reference, row.billing_status),
+                (1, invoice.name, "Invoiced"))
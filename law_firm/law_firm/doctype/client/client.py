@@ -2,6 +2,7 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import nowdate, getdate, validate_email_address
 from frappe import _
+from law_firm.law_firm.lead_conversion import normalize_email, normalize_phone
 
 class Client(Document):
     def before_insert(self):
@@ -24,6 +25,7 @@ class Client(Document):
         self.validate_billing_info()
         self.update_client_id()
         self.set_full_address()
+        self.set_normalized_contact()
         
     def validate_contact_info(self):
         """
@@ -110,6 +112,15 @@ class Client(Document):
         
         self.full_address = ", ".join(address_parts) if address_parts else None
     
+    def set_normalized_contact(self):
+        """
+        Store the email trimmed and lowercased and both numbers reduced to digits, so
+        duplicate clients can be matched with indexed equality lookups
+        """
+        self.email = normalize_email(self.email)
+        self.normalized_mobile = normalize_phone(self.mobile)
+        self.normalized_phone = normalize_phone(self.phone)
+    
     def on_update(self):
         """
         Update last contact date and log changes
@@ -126,8 +137,10 @@ class Client(Document):
     
     def after_insert(self):
         """
-        Actions after client is created
+        Actions after client is created; bulk lead conversion queues them instead
         """
+        if self.flags.defer_setup:
+            return
         self.create_client_folder()
         self.send_welcome_email()
     
@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from law_firm.law_firm.client_portal import get_portal_client
+from law_firm.law_firm.lead_conversion import ClientMatcher, convert_chunk, run_client_setup
+
+TEST_LEAD = "_Test Conversion Lead"
+TEST_EMAIL = "_test_conversion_lead@example.com"
+TEST_PORTAL_USER = "_test_portal_attorney@example.com"
+
+
+class TestLeadConversion(FrappeTestCase):
+    def setUp(self):
+        # Inserted without controllers: conversion only reads the lead's contact fields
+        frappe.get_doc({
+            "doctype": "Lead",
+            "name": TEST_LEAD,
+            "lead_name": "Conversion Lead",
+            "email_id": TEST_EMAIL,
+            "mobile_no": "+1 (555) 010-2030"
+        }).db_insert()
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def convert(self, rows):
+        summary = {"clients_created": 0, "clients_matched": 0, "cases_created": 0, "errors": []}
+        # Everything the chunk writes is rolled back in tearDown; client setup is only queued
+        with patch.object(frappe.db, "commit"), patch.object(frappe, "enqueue") as enqueue:
+            convert_chunk(rows, ClientMatcher(), summary)
+        return summary, enqueue
+
+    def test_unmatched_lead_creates_client_and_case(self):
+        summary, enqueue = self.convert([{
+            "lead": TEST_LEAD,
+            "case_title": "_Test Converted Case",
+            "practice_area": "Family Law"
+        }])
+
+        self.assertEqual(summary["errors"], [])
+        self.assertEqual((summary["clients_created"], summary["clients_matched"], summary["cases_created"]),
+            (1, 0, 1))
+
+        client = frappe.get_doc("Client", {"email": TEST_EMAIL})
+        self.assertEqual(client.status, "Prospect")
+        self.assertEqual(client.normalized_mobile, "5550102030")
+
+        case = frappe.get_doc("Legal Case", {"client": client.name})
+        self.assertEqual((case.case_title, case.practice_area, case.status, case.priority),
+            ("_Test Converted Case", "Family Law", "Open", "Medium"))
+
+        enqueue.assert_called_once()
+        self.assertIs(enqueue.call_args.args[0], run_client_setup)
+        self.assertEqual(enqueue.call_args.kwargs["clients"], [client.name])
+
+    def test_lead_matching_an_existing_client_only_creates_a_case(self):
+        client = frappe.get_doc({
+            "doctype": "Client",
+            "naming_series": "CLI-.YYYY.-",
+            "client_name": "Existing Client",
+            "client_type": "Individual",
+            "normalized_mobile": "5550102030"
+        })
+        client.db_insert()
+
+        summary, enqueue = self.convert([{"lead": TEST_LEAD, "practice_area": "Family Law"}])
+
+        self.assertEqual((summary["clients_created"], summary["clients_matched"], summary["cases_created"]),
+            (0, 1, 1))
+        self.assertTrue(frappe.db.exists("Legal Case", {"client": client.name}))
+        enqueue.assert_not_called()
+
+
+class TestClientPortal(FrappeTestCase):
+    def setUp(self):
+        if not frappe.db.exists("Role", "Attorney"):
+            frappe.get_doc({"doctype": "Role", "role_name": "Attorney"}).insert(ignore_permissions=True)
+        if not frappe.db.exists("User", TEST_PORTAL_USER):
+            frappe.get_doc({
+                "doctype": "User",
+                "email": TEST_PORTAL_USER,
+                "first_name": "Portal Attorney",
+                "send_welcome_email": 0,
+                "roles": [{"role": "Attorney"}]
+            }).insert(ignore_permissions=True)
+
+        self.clients = {}
+        for label in ("A", "B"):
+            client = frappe.get_doc({
+                "doctype": "Client",
+                "naming_series": "CLI-.YYYY.-",
+                "client_name": f"_Test Portal Client {label}",
+                "client_type": "Individual",
+                "email": f"_test_portal_client_{label.lower()}@example.com"
+            })
+            client.db_insert()
+            self.clients[label] = client
+
+        # The attorney may only see client A
+        frappe.get_doc({
+            "doctype": "User Permission",
+            "user": TEST_PORTAL_USER,
+            "allow": "Client",
+            "for_value": self.clients["A"].name
+        }).insert(ignore_permissions=True)
+
+    def tearDown(self):
+        frappe.set_user("Administrator")
+        frappe.db.rollback()
+        frappe.clear_cache(user=TEST_PORTAL_USER)
+
+    def test_reader_restricted_to_another_client_is_refused(self):
+        frappe.set_user(TEST_PORTAL_USER)
+        self.assertEqual(get_portal_client(self.clients["A"].email).name, self.clients["A"].name)
+        self.assertRaises(frappe.PermissionError, get_portal_client, self.clients["B"].email)
@@ -1,9 +1,14 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import nowdate, getdate
+from law_firm.law_firm.deadlines import sync_hearing_deadlines, clear_deadlines
+from law_firm.law_firm.case_counters import update_count_counter, move_count_counter
+from law_firm.law_firm.hearing_reminders import sync_hearing_reminders, clear_hearing_reminders
+from law_firm.law_firm.case_archive import check_case_not_archived
 
 class CourtHearing(Document):
     def validate(self):
+        check_case_not_archived(self.legal_case)
         self.validate_hearing_date()
         self.validate_participants()
 
@@ -15,9 +20,26 @@ class CourtHearing(Document):
         if not self.attending_attorneys:
             frappe.throw("At least one attending attorney is required")
 
+    def after_insert(self):
+        update_count_counter(self, "hearing_count", 1)
+
     def on_update(self):
+        # Move the hearing count if the hearing was relinked to another case
+        move_count_counter(self, "hearing_count")
+
         # Update next hearing date in linked legal case
         if self.legal_case and self.hearing_date:
             legal_case = frappe.get_doc("Legal Case", self.legal_case)
             if not legal_case.next_hearing_date or getdate(self.hearing_date) > getdate(legal_case.next_hearing_date):
-                legal_case.db_set('next_hearing_date', self.hearing_date)
\ No newline at end of file
+                legal_case.db_set('next_hearing_date', self.hearing_date)
+
+        # Keep the hearing in each attending attorney's deadline calendar
+        sync_hearing_deadlines(self)
+
+        # Arm, reschedule or cancel the reminders before the hearing
+        sync_hearing_reminders(self)
+
+    def on_trash(self):
+        clear_deadlines("Court Hearing", self.name)
+        clear_hearing_reminders(self.name)
+        update_count_counter(self, "hearing_count", -1)
\ No newline at end of file
@@ -0,0 +1,174 @@
+import frappe
+from frappe.database import get_db
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, add_to_date, get_datetime, now_datetime, nowdate
+from law_firm.law_firm.hearing_reminders import (
+    claim_due_reminders,
+    get_hearing_datetime,
+    get_reminder_offsets,
+    send_claimed_reminders,
+    sync_hearing_reminders
+)
+
+TEST_ATTORNEY = "_test_hearing_attorney@example.com"
+
+
+class TestHearingReminder(FrappeTestCase):
+    """
+    Claiming needs a second connection to see another worker's locks, so the fixtures
+    are committed and removed again in tearDown. Emails go to the Email Queue, which
+    stands in for the SMTP sink.
+    """
+
+    def setUp(self):
+        if not frappe.db.exists("User", TEST_ATTORNEY):
+            frappe.get_doc({
+                "doctype": "User",
+                "email": TEST_ATTORNEY,
+                "first_name": "Hearing Attorney",
+                "send_welcome_email": 0
+            }).insert(ignore_permissions=True)
+
+        # Inserted without controllers: only the rows the reminder queries read are needed
+        case = frappe.get_doc({
+            "doctype": "Legal Case",
+            "naming_series": "CASE-.YYYY.-",
+            "case_title": "_Test Hearing Reminder Case",
+            "status": "Open"
+        })
+        case.db_insert()
+        self.case = case.name
+        self.hearings = []
+        frappe.db.commit()
+
+    def tearDown(self):
+        frappe.db.rollback()
+        if self.hearings:
+            queued = frappe.get_all("Email Queue",
+                filters={"reference_doctype": "Court Hearing", "reference_name": ["in", self.hearings]},
+                pluck="name")
+            if queued:
+                frappe.db.delete("Email Queue Recipient", {"parent": ["in", queued]})
+                frappe.db.delete("Email Queue", {"name": ["in", queued]})
+            frappe.db.delete("Hearing Reminder", {"court_hearing": ["in", self.hearings]})
+            frappe.db.delete("Case Team Member", {"parenttype": "Court Hearing", "parent": ["in", self.hearings]})
+            frappe.db.delete("Court Hearing", {"name": ["in", self.hearings]})
+        frappe.db.delete("Legal Case", {"name": self.case})
+        frappe.db.commit()
+
+    def make_hearing(self, days_ahead, with_attorney=True):
+        hearing = frappe.get_doc({
+            "doctype": "Court Hearing",
+            "hearing_title": "_Test Hearing",
+            "legal_case": self.case,
+            "hearing_date": add_days(nowdate(), days_ahead),
+            "hearing_time": "10:00:00"
+        })
+        hearing.db_insert()
+        self.hearings.append(hearing.name)
+
+        if with_attorney:
+            frappe.get_doc({
+                "doctype": "Case Team Member",
+                "parent": hearing.name,
+                "parenttype": "Court Hearing",
+                "parentfield": "attending_attorneys",
+                "team_member": TEST_ATTORNEY,
+                "role": "Lead Attorney"
+            }).db_insert()
+        return hearing
+
+    def make_due_reminder(self, hearing, offset):
+        return frappe.get_doc({
+            "doctype": "Hearing Reminder",
+            "court_hearing": hearing.name,
+            "legal_case": hearing.legal_case,
+            "reminder_offset": offset,
+            "remind_at": add_to_date(now_datetime(), minutes=-1),
+            "hearing_at": get_hearing_datetime(hearing),
+            "status": "Pending"
+        }).insert(ignore_permissions=True).name
+
+    def get_reminders(self, hearing):
+        return {row.reminder_offset: row for row in frappe.get_all("Hearing Reminder",
+            filters={"court_hearing": hearing.name},
+            fields=["name", "reminder_offset", "remind_at", "status"]
+        )}
+
+    def test_claim_skips_reminders_locked_by_another_worker(self):
+        hearing = self.make_hearing(2)
+        due = {self.make_due_reminder(hearing, "1d"), self.make_due_reminder(hearing, "2h")}
+        frappe.db.commit()
+
+        # This transaction now holds the row locks of everything it claimed
+        claimed = {reminder.name for reminder in claim_due_reminders(100)}
+        self.assertTrue(due <= claimed)
+
+        worker_db = get_db(host=frappe.conf.db_host, user=frappe.conf.db_name, password=frappe.conf.db_password)
+        worker_db.connect()
+        main_db = frappe.local.db
+        frappe.local.db = worker_db
+        try:
+            claimed_elsewhere = {reminder.name for reminder in claim_due_reminders(100)}
+        finally:
+            frappe.local.db = main_db
+            worker_db.close()
+
+        self.assertFalse(due & claimed_elsewhere)
+
+    def test_claimed_chunk_is_marked_sent_or_skipped(self):
+        hearing = self.make_hearing(2)
+        unattended = self.make_hearing(2, with_attorney=False)
+        sent = self.make_due_reminder(hearing, "1d")
+        skipped = self.make_due_reminder(unattended, "1d")
+        frappe.db.commit()
+
+        reminders = [reminder for reminder in claim_due_reminders(100) if reminder.name in (sent, skipped)]
+        self.assertEqual(send_claimed_reminders(reminders), 1)
+
+        sent_row = frappe.db.get_value("Hearing Reminder", sent, ["status", "recipients", "sent_at"], as_dict=True)
+        self.assertEqual(sent_row.status, "Sent")
+        self.assertEqual(sent_row.recipients, TEST_ATTORNEY)
+        self.assertTrue(sent_row.sent_at)
+        self.assertEqual(frappe.db.get_value("Hearing Reminder", skipped, "status"), "Skipped")
+
+        self.assertTrue(frappe.db.exists("Email Queue",
+            {"reference_doctype": "Court Hearing", "reference_name": hearing.name}))
+        self.assertFalse(frappe.db.exists("Email Queue",
+            {"reference_doctype": "Court Hearing", "reference_name": unattended.name}))
+
+        # A sent reminder is not claimed again
+        self.assertNotIn(sent, {reminder.name for reminder in claim_due_reminders(100)})
+
+    def test_moving_a_hearing_reschedules_its_reminders(self):
+        hearing = self.make_hearing(10)
+        sync_hearing_reminders(hearing)
+        armed = self.get_reminders(hearing)
+        self.assertEqual(set(armed), {label for label, _delta in get_reminder_offsets()})
+
+        hearing.hearing_date = add_days(nowdate(), 3)
+        sync_hearing_reminders(hearing)
+        moved = self.get_reminders(hearing)
+
+        hearing_at = get_hearing_datetime(hearing)
+        for label, delta in get_reminder_offsets():
+            # Rescheduled in place, not recreated
+            self.assertEqual(moved[label].name, armed[label].name)
+            if hearing_at - delta > now_datetime():
+                self.assertEqual(moved[label].status, "Pending")
+                self.assertEqual(get_datetime(moved[label].remind_at), hearing_at - delta)
+            else:
+                self.assertEqual(moved[label].status, "Cancelled")
+
+    def test_cancelling_a_hearing_cancels_its_pending_reminders(self):
+        hearing = self.make_hearing(10)
+        sync_hearing_reminders(hearing)
+        self.assertTrue(all(row.status == "Pending" for row in self.get_reminders(hearing).values()))
+
+        hearing = frappe.get_doc("Court Hearing", hearing.name)
+        hearing.status = "Cancelled"
+        hearing.save(ignore_permissions=True)
+
+        reminders = self.get_reminders(hearing)
+        self.assertEqual(set(reminders), {label for label, _delta in get_reminder_offsets()})
+        self.assertTrue(all(row.status == "Cancelled" for row in reminders.values()))
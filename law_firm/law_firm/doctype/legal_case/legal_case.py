@@ -5,6 +5,8 @@ from frappe.utils import nowdate, getdate
 from frappe.model.mapper import get_mapped_doc
 from frappe import _
 import json
+from law_firm.law_firm.deadlines import sync_case_deadlines, clear_deadlines
+from law_firm.law_firm.case_counters import get_case_counters
 
 
 class LegalCase(Document):
@@ -27,6 +29,22 @@ class LegalCase(Document):
         self.validate_dates()
         self.validate_billing_method()
         self.validate_case_status()  # Added new validation method
+        self.update_deadline_calendar()
+        self.refresh_counters()
+
+    def before_update_after_submit(self):
+        self.refresh_counters()
+
+    def before_cancel(self):
+        self.refresh_counters()
+
+    def refresh_counters(self):
+        """
+        Reloads the counters maintained by case_counters so saving a form opened
+        before the latest Time Entry, Invoice, Document or Hearing does not overwrite them.
+        """
+        if not self.is_new():
+            self.update(get_case_counters(self.name))
 
     def validate_dates(self):
         """
@@ -101,6 +119,12 @@ class LegalCase(Document):
         if self.status not in ["Closed", "Settled", "Dismissed"] and self.date_closed:
             self.date_closed = None
 
+    def update_deadline_calendar(self):
+        """
+        Keeps this case's statute of limitations in the Case Deadline calendar.
+        """
+        sync_case_deadlines(self)
+
     def on_submit(self):
         """
         Actions to perform when a Legal Case is submitted.
@@ -126,4 +150,11 @@ class LegalCase(Document):
                 f"Legal Case {self.name} has been cancelled.",
                 doctype="Legal Case",
                 name=self.name
-            )
\ No newline at end of file
+            )
+        clear_deadlines("Legal Case", self.name)
+
+    def on_trash(self):
+        """
+        Removes this case's deadlines from the calendar when it is deleted.
+        """
+        clear_deadlines("Legal Case", self.name)
\ No newline at end of file
@@ -0,0 +1,276 @@
+import glob
+import os
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, get_datetime, getdate, today
+from law_firm.law_firm.api import update_case_statuses
+from law_firm.law_firm.case_archive import archive_cases, delete_case_rows, iter_case_rows, run_case_rehydration
+from law_firm.law_firm.timeline import TIMELINE_SOURCES, get_timeline_page
+
+TEST_CASE = "_Test Timeline Case"
+
+# (doctype, name, date, extra values); several rows share a timestamp, across and within sources
+TIMELINE_ROWS = [
+    ("Time Entry", "_Test TL TE-2", "2024-03-01", {"docstatus": 1, "hours": 1, "activity_type": "Research"}),
+    ("Time Entry", "_Test TL TE-1", "2024-03-01", {"docstatus": 1, "hours": 2, "activity_type": "Research"}),
+    ("Time Entry", "_Test TL TE-3", "2024-03-02", {"docstatus": 1, "hours": 3, "activity_type": "Travel"}),
+    ("Time Entry", "_Test TL TE-DRAFT", "2024-03-01", {"docstatus": 0, "hours": 4, "activity_type": "Travel"}),
+    ("Court Hearing", "_Test TL HEAR-1", "2024-03-01", {"hearing_type": "Trial", "status": "Scheduled"}),
+    ("Court Hearing", "_Test TL HEAR-2", "2024-03-02", {"hearing_type": "Trial", "status": "Scheduled"}),
+    ("Legal Document", "_Test TL DOC-1", "2024-03-01 00:00:00", {"document_name": "Brief"}),
+    ("Legal Document", "_Test TL DOC-2", "2024-03-01 15:00:00", {"document_name": "Motion"}),
+    ("Legal Invoice", "_Test TL INV-1", "2024-03-01", {"docstatus": 1, "grand_total": 500, "status": "Unpaid"}),
+    ("Legal Invoice", "_Test TL INV-DRAFT", "2024-03-03", {"docstatus": 0, "grand_total": 50, "status": "Draft"})
+]
+
+
+class TestLegalCase(FrappeTestCase):
+    def setUp(self):
+        date_fields = {source["doctype"]: source["date_field"] for source in TIMELINE_SOURCES}
+        for doctype, name, date, values in TIMELINE_ROWS:
+            frappe.get_doc({
+                "doctype": doctype,
+                "name": name,
+                "legal_case": TEST_CASE,
+                date_fields[doctype]: date,
+                **values
+            }).db_insert()
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def get_expected_names(self, descending=False):
+        """Timeline order worked out independently: (timestamp, source rank, name), drafts left out"""
+        ranks = {source["doctype"]: rank for rank, source in enumerate(TIMELINE_SOURCES)}
+        rows = [(get_datetime(date), ranks[doctype], name) for doctype, name, date, values in TIMELINE_ROWS
+            if values.get("docstatus", 0) == 1 or doctype in ("Court Hearing", "Legal Document")]
+        return [name for _date, _rank, name in sorted(rows, reverse=descending)]
+
+    def read_all_pages(self, limit, descending=False):
+        names, cursor, pages = [], None, 0
+        while True:
+            page = get_timeline_page(TEST_CASE, cursor, limit, descending)
+            names += [entry["link"].rsplit("/", 1)[1] for entry in page["timeline"]]
+            cursor = page["next_cursor"]
+            pages += 1
+            if not cursor or pages > len(TIMELINE_ROWS):
+                return names
+
+    def test_first_page_follows_merge_order(self):
+        page = get_timeline_page(TEST_CASE, limit=3)
+        self.assertEqual([entry["link"].rsplit("/", 1)[1] for entry in page["timeline"]],
+            self.get_expected_names()[:3])
+        self.assertTrue(page["next_cursor"])
+
+    def test_paging_neither_skips_nor_repeats_rows_at_ties(self):
+        for descending in (False, True):
+            for limit in (1, 2, 3, 50):
+                with self.subTest(descending=descending, limit=limit):
+                    self.assertEqual(self.read_all_pages(limit, descending), self.get_expected_names(descending))
+
+    def test_last_page_has_no_cursor(self):
+        page = get_timeline_page(TEST_CASE, limit=50)
+        self.assertEqual(len(page["timeline"]), len(self.get_expected_names()))
+        self.assertIsNone(page["next_cursor"])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertRaises(frappe.ValidationError, get_timeline_page, TEST_CASE, "not-a-cursor")
+
+
+class TestCaseStatusJob(FrappeTestCase):
+    def setUp(self):
+        # A run left unfinished by an earlier job would resume past these cases
+        frappe.db.delete("Batch Job Run", {"job_name": "update_case_statuses"})
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def make_case(self, status, statute_days, date_closed=None):
+        case = frappe.get_doc({
+            "doctype": "Legal Case",
+            "naming_series": "CASE-.YYYY.-",
+            "case_title": f"_Test Status Job {status}",
+            "status": status,
+            "statute_of_limitations": add_days(today(), statute_days),
+            "date_closed": date_closed
+        })
+        case.db_insert()
+        return case.name
+
+    def run_job(self):
+        # The job commits each chunk; the test keeps it in one transaction that tearDown rolls back
+        with patch.object(frappe.db, "commit"):
+            update_case_statuses()
+
+    def get_case(self, name):
+        return frappe.db.get_value("Legal Case", name, ["status", "case_outcome", "date_closed"], as_dict=True)
+
+    def test_expired_open_case_is_closed(self):
+        expired = self.make_case("Open", -1)
+        self.run_job()
+
+        case = self.get_case(expired)
+        self.assertEqual((case.status, case.case_outcome), ("Closed", "Statute Expired"))
+        self.assertEqual(case.date_closed, getdate(today()))
+
+    def test_cases_already_in_a_closed_status_are_left_alone(self):
+        # Settled, Dismissed, Cancelled and Archived cases keep their status and outcome
+        untouched = {status: self.make_case(status, -1, date_closed="2024-01-31")
+            for status in ("Closed", "Settled", "Dismissed", "Cancelled", "Archived")}
+        self.run_job()
+
+        for status, name in untouched.items():
+            case = self.get_case(name)
+            self.assertEqual((case.status, case.case_outcome, case.date_closed),
+                (status, None, getdate("2024-01-31")))
+
+    def test_case_within_its_statute_stays_open(self):
+        active = self.make_case("Open", 30)
+        self.run_job()
+
+        self.assertEqual(self.get_case(active).status, "Open")
+
+
+class TestCaseArchive(FrappeTestCase):
+    def setUp(self):
+        # Inserted without controllers: archiving works on the stored rows of the case's record graph
+        case = frappe.get_doc({
+            "doctype": "Legal Case",
+            "naming_series": "CASE-.YYYY.-",
+            "case_title": "_Test Archive Case",
+            "status": "Closed",
+            "date_closed": "2015-01-31"
+        })
+        case.db_insert()
+        self.case = case.name
+
+        entries = []
+        for hours in (1, 2):
+            entry = frappe.get_doc({
+                "doctype": "Time Entry",
+                "naming_series": "TE-.YYYY.-",
+                "legal_case": self.case,
+                "activity_date": "2014-06-02",
+                "from_time": "09:00:00",
+                "to_time": f"{9 + hours:02d}:00:00",
+                "hours": hours,
+                "activity_type": "Research",
+                "description": "Research",
+                "docstatus": 1
+            })
+            entry.db_insert()
+            entries.append(entry.name)
+
+        invoice = frappe.get_doc({
+            "doctype": "Legal Invoice",
+            "legal_case": self.case,
+            "invoice_date": "2014-07-01",
+            "due_date": "2014-07-31",
+            "grand_total": 300,
+            "status": "Paid",
+            "docstatus": 1
+        })
+        invoice.db_insert()
+        for idx, entry in enumerate(entries, 1):
+            frappe.get_doc({
+                "doctype": "Invoice Item",
+                "parent": invoice.name,
+                "parenttype": "Legal Invoice",
+                "parentfield": "items",
+                "idx": idx,
+                "description": f"Line {idx}",
+                "quantity": idx,
+                "rate": 100,
+                "amount": idx * 100,
+                "time_entry": entry,
+                "docstatus": 1
+            }).db_insert()
+
+        hearing = frappe.get_doc({
+            "doctype": "Court Hearing",
+            "hearing_title": "_Test Archive Hearing",
+            "legal_case": self.case,
+            "hearing_date": "2014-09-15",
+            "hearing_time": "10:00:00",
+            "status": "Completed"
+        })
+        hearing.db_insert()
+        frappe.get_doc({
+            "doctype": "Case Team Member",
+            "parent": hearing.name,
+            "parenttype": "Court Hearing",
+            "parentfield": "attending_attorneys",
+            "team_member": "Administrator",
+            "role": "Lead Attorney"
+        }).db_insert()
+
+        frappe.get_doc({
+            "doctype": "File",
+            "file_name": "_test_archive_note.pdf",
+            "file_url": "/private/files/_test_archive_note.pdf",
+            "attached_to_doctype": "Time Entry",
+            "attached_to_name": entries[0],
+            "is_private": 1
+        }).db_insert()
+        frappe.get_doc({
+            "doctype": "Comment",
+            "comment_type": "Comment",
+            "reference_doctype": "Court Hearing",
+            "reference_name": hearing.name,
+            "content": "Adjourned to the afternoon"
+        }).db_insert()
+
+    def tearDown(self):
+        frappe.db.rollback()
+        for path in self.get_archive_files():
+            os.remove(path)
+
+    def get_archive_files(self):
+        return glob.glob(frappe.get_site_path("private", "files", f"{self.case}-archive-*.jsonl.gz"))
+
+    def get_graph(self):
+        """Every stored row of the case's record graph, by (doctype, name)"""
+        return {(doctype, row.name): row for doctype, row in iter_case_rows(self.case)}
+
+    def test_archive_and_rehydrate_round_trip(self):
+        graph = self.get_graph()
+        self.assertEqual(sorted({doctype for doctype, _name in graph}),
+            ["Case Team Member", "Comment", "Court Hearing", "File", "Invoice Item", "Legal Invoice", "Time Entry"])
+
+        self.assertEqual(archive_cases([self.case]), 1)
+
+        self.assertEqual(self.get_graph(), {})
+        self.assertFalse(frappe.db.exists("Invoice Item", {"parent": ["in",
+            [name for doctype, name in graph if doctype == "Legal Invoice"]]}))
+        stub = frappe.db.get_value("Legal Case", self.case,
+            ["status", "status_before_archive", "archived_rows", "archive_file"], as_dict=True)
+        self.assertEqual((stub.status, stub.status_before_archive, stub.archived_rows), ("Archived", "Closed", len(graph)))
+        self.assertTrue(os.path.exists(frappe.get_site_path(stub.archive_file.lstrip("/"))))
+
+        # The job commits when it is done; the test keeps it in one transaction that tearDown rolls back
+        with patch.object(frappe.db, "commit"):
+            run_case_rehydration(self.case)
+
+        self.assertEqual(self.get_graph(), graph)
+        restored = frappe.db.get_value("Legal Case", self.case,
+            ["status", "status_before_archive", "archive_file", "archived_rows", "rehydrated_on"], as_dict=True)
+        self.assertEqual((restored.status, restored.status_before_archive, restored.archive_file, restored.archived_rows),
+            ("Closed", None, None, 0))
+        self.assertTrue(restored.rehydrated_on)
+        self.assertFalse(frappe.db.exists("File", {"file_url": stub.archive_file}))
+
+    def test_failed_archive_rolls_back_and_removes_the_file(self):
+        graph = self.get_graph()
+
+        def delete_then_fail(name):
+            delete_case_rows(name)
+            raise frappe.ValidationError("disk full")
+
+        with patch("law_firm.law_firm.case_archive.delete_case_rows", side_effect=delete_then_fail):
+            self.assertEqual(archive_cases([self.case]), 0)
+
+        self.assertEqual(self.get_graph(), graph)
+        self.assertEqual(frappe.db.get_value("Legal Case", self.case, "status"), "Closed")
+        self.assertEqual(self.get_archive_files(), [])
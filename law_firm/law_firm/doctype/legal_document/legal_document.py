@@ -1,6 +1,8 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import nowdate
+from law_firm.law_firm.case_counters import update_count_counter, move_count_counter
+from law_firm.law_firm.case_archive import check_case_not_archived
 
 class LegalDocument(Document):
     def before_insert(self):
@@ -29,6 +31,7 @@ class LegalDocument(Document):
         """
         Main validation method
         """
+        check_case_not_archived(self.legal_case)
         self.validate_required_fields()
         self.validate_document_rules()
 
@@ -53,4 +56,22 @@ class LegalDocument(Document):
             frappe.throw("Pleadings must be linked to a Legal Case")
         
         if self.document_type in ["Motion", "Brief", "Affidavit"] and not self.legal_case:
-            frappe.throw(f"{self.document_type}s must be linked to a Legal Case")
\ No newline at end of file
+            frappe.throw(f"{self.document_type}s must be linked to a Legal Case")
+
+    def after_insert(self):
+        """
+        Count the document on its case
+        """
+        update_count_counter(self, "document_count", 1)
+
+    def on_update(self):
+        """
+        Move the document count if the document was relinked to another case
+        """
+        move_count_counter(self, "document_count")
+
+    def on_trash(self):
+        """
+        Remove the document from its case's count
+        """
+        update_count_counter(self, "document_count", -1)
@@ -0,0 +1,56 @@
+// file: law_firm/law_firm/doctype/legal_invoice/legal_invoice.js
+
+frappe.ui.form.on('Legal Invoice', {
+    refresh: function(frm) {
+        // Large invoices open with their first page of items; the rest is loaded on request.
+        const page = frm.doc.__onload && frm.doc.__onload.items_page;
+        frm.items_next_start = page ? page.next_start : null;
+        frm.items_total = page ? page.total : null;
+        frm.trigger('update_items_paging');
+    },
+
+    update_items_paging: function(frm) {
+        const paged = Boolean(frm.items_next_start);
+
+        // The server puts back the items a paged save did not send, so rows cannot be added or removed until all are loaded
+        frm.doc.__items_paged = paged ? 1 : 0;
+        frm.set_df_property('items', 'read_only', paged || frm.doc.docstatus !== 0);
+        frm.set_df_property('items', 'description', paged
+            ? __('Showing {0} of {1} items', [frm.doc.items.length, frm.items_total])
+            : '');
+
+        frm.remove_custom_button(__('Load More Items'));
+        if (paged) {
+            frm.add_custom_button(__('Load More Items'), () => frm.trigger('load_more_items'));
+        }
+    },
+
+    load_more_items: function(frm) {
+        frappe.call({
+            method: 'law_firm.law_firm.doctype.legal_invoice.legal_invoice.get_invoice_items',
+            args: {
+                invoice: frm.doc.name,
+                start: frm.items_next_start
+            },
+            freeze: true
+        }).then(r => {
+            // Add the stored rows as they are, not as new items
+            r.message.items.forEach(item => {
+                const row = Object.assign({
+                    doctype: 'Invoice Item',
+                    parent: frm.doc.name,
+                    parenttype: 'Legal Invoice',
+                    parentfield: 'items',
+                    docstatus: frm.doc.docstatus
+                }, item);
+                frappe.model.add_to_locals(row);
+                frm.doc.items.push(row);
+            });
+
+            frm.items_next_start = r.message.next_start;
+            frm.items_total = r.message.total;
+            frm.refresh_field('items');
+            frm.trigger('update_items_paging');
+        });
+    }
+});
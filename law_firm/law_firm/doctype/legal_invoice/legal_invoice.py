@@ -1,17 +1,47 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 import frappe
 from frappe.model.document import Document
-from frappe.utils import nowdate, getdate, flt
+from frappe.model.naming import set_new_name
+from frappe.utils import nowdate, getdate, flt, cint, now
+from law_firm.law_firm.rollups import update_invoice_rollup, update_invoice_balance_rollup
+from law_firm.law_firm.billing import release_time_entries, sync_time_entries, check_time_entries_unbilled
+from law_firm.law_firm.invoice_aging import get_aging_bucket
+from law_firm.law_firm.case_counters import update_invoice_counters, update_invoice_balance_counter
+from law_firm.law_firm.case_archive import check_case_not_archived
+
+# Invoices with at least this many items only validate and persist the rows that changed
+LARGE_INVOICE_ITEMS = 500
+ITEMS_PAGE_LENGTH = 100
+MAX_ITEMS_PAGE = 500
+
+# Invoice Item fields compared to decide whether a stored row needs rewriting
+ITEM_FIELDS = ("idx", "item_code", "description", "quantity", "rate", "amount", "time_entry")
 
 class LegalInvoice(Document):
+    def onload(self):
+        """A large invoice opens with its first page of items; the form loads the rest from get_invoice_items"""
+        if not self.is_large_invoice():
+            return
+
+        total = len(self.items)
+        self.set("items", self.items[:ITEMS_PAGE_LENGTH])
+        self.set_onload("items_page", {"total": total, "next_start": self.items[-1].idx})
+
     def before_validate(self):
         """Calculate values before validation runs"""
+        self.restore_unloaded_items()
         self.calculate_totals()
+        self.flags.changed_items = self.get_changed_items()
 
     def validate(self):
         """Perform validation checks"""
+        check_case_not_archived(self.legal_case, self.flags.case_status)
         self.validate_dates()
         self.validate_amounts()
         self.validate_status()
+        if not self.flags.skip_time_entry_sync:
+            check_time_entries_unbilled(self)
 
     def validate_dates(self):
         if self.due_date and self.invoice_date:
@@ -22,8 +52,9 @@ class LegalInvoice(Document):
         if flt(self.balance_due) < 0:
             frappe.throw("Balance due cannot be negative")
         
-        # Validate items
-        for item in self.items:
+        # Validate items; stored rows of a large invoice were validated when they were saved
+        changed_items = self.flags.changed_items
+        for item in self.items if changed_items is None else changed_items:
             if flt(item.quantity) <= 0:
                 frappe.throw(f"Quantity must be greater than 0 for item {item.item_code or item.description}")
             if flt(item.rate) < 0:
@@ -43,27 +74,204 @@ class LegalInvoice(Document):
         else:
             self.status = "Draft"
 
+        self.set_aging()
+
+    def set_aging(self):
+        """Days overdue and aging bucket of the outstanding balance (refreshed nightly by invoice_aging)"""
+        if flt(self.balance_due) <= 0:
+            self.days_overdue = 0
+            self.aging_bucket = ""
+            return
+
+        days = (getdate(nowdate()) - getdate(self.due_date)).days if self.due_date else 0
+        self.days_overdue = max(days, 0)
+        self.aging_bucket = get_aging_bucket(days)
+
     def calculate_totals(self):
-        """Calculate all financial totals"""
-        # Calculate item amounts and subtotal
-        subtotal = 0
+        """Calculate all financial totals in a single Decimal pass over the items"""
+        quantum = Decimal(1).scaleb(-cint(self.precision("amount", "items") or 2))
+
+        subtotal = Decimal(0)
         for item in self.items:
-            item.amount = flt(item.quantity) * flt(item.rate)
-            subtotal += flt(item.amount)
+            amount = (to_decimal(item.quantity) * to_decimal(item.rate)).quantize(quantum, ROUND_HALF_UP)
+            item.amount = float(amount)
+            subtotal += amount
+
+        tax_amount = (subtotal * to_decimal(self.tax_rate) / 100).quantize(quantum, ROUND_HALF_UP)
+        grand_total = subtotal + tax_amount - to_decimal(self.discount_amount)
+
+        self.subtotal = float(subtotal)
+        self.tax_amount = float(tax_amount)
+        self.grand_total = float(grand_total)
+        self.balance_due = float(grand_total - to_decimal(self.amount_paid))
+
+    def is_large_invoice(self):
+        return len(self.items) >= LARGE_INVOICE_ITEMS
+
+    def restore_unloaded_items(self):
+        """
+        A large invoice saved from the form carries only the item pages loaded so far
+        (the form sends __items_paged); put back the stored items it did not load.
+        """
+        if not self.get("__items_paged") or self.is_new():
+            return
+
+        previous = self.get_doc_before_save()
+        loaded = {item.name for item in self.items}
+        for item in previous.items if previous else []:
+            if item.name not in loaded:
+                self.append("items", item.as_dict())
+
+    def db_insert(self, *args, **kwargs):
+        """The first insert of a large invoice writes its items with multi-row INSERTs"""
+        super().db_insert(*args, **kwargs)
+        if self.is_large_invoice():
+            insert_items(self.items)
+            self.flags.items_inserted = True
+
+    def get_all_children(self, parenttype=None):
+        # Document.insert writes the children returned here one by one, right after db_insert
+        children = super().get_all_children(parenttype)
+        if self.flags.items_inserted:
+            children = [child for child in children if child.parentfield != "items"]
+        return children
+
+    def after_insert(self):
+        self.flags.items_inserted = False
 
-        self.subtotal = subtotal
-        self.tax_amount = flt(self.subtotal) * flt(self.tax_rate or 0) / 100
-        self.grand_total = flt(self.subtotal) + flt(self.tax_amount) - flt(self.discount_amount or 0)
-        self.balance_due = flt(self.grand_total) - flt(self.amount_paid or 0)
+    def get_changed_items(self):
+        """Items that are new or differ from the stored invoice; every item unless this is a large invoice"""
+        previous = self.get_doc_before_save()
+        if not previous or not self.is_large_invoice():
+            return list(self.items)
+
+        stored = {item.name: item_values(item) for item in previous.items}
+        return [item for item in self.items if stored.get(item.name) != item_values(item)]
+
+    def update_child_table(self, fieldname, df=None):
+        """
+        Large invoices write only new and changed items: removed rows go in one DELETE,
+        new rows in multi-row INSERTs, and a docstatus change in one UPDATE.
+        """
+        if fieldname != "items" or not self.is_large_invoice() or self.flags.changed_items is None:
+            return super().update_child_table(fieldname, df)
+
+        previous = self.get_doc_before_save()
+        current_names = {item.name for item in self.items if item.name}
+        removed = [item.name for item in previous.items if item.name not in current_names] if previous else []
+        if removed:
+            frappe.db.sql("DELETE FROM `tabInvoice Item` WHERE name IN %s", (removed,))
+
+        new_items = []
+        for item in self.flags.changed_items:
+            if item.is_new() or not item.name:
+                new_items.append(item)
+            else:
+                item.db_update()
+        insert_items(new_items)
+
+        if previous and previous.docstatus != self.docstatus:
+            frappe.db.sql("""
+                UPDATE `tabInvoice Item`
+                SET docstatus = %s
+                WHERE parent = %s AND parenttype = 'Legal Invoice'
+            """, (self.docstatus, self.name))
+
+    def on_update(self):
+        """Mark the time entries on the items as billed on this invoice, drafts included"""
+        if not self.flags.skip_time_entry_sync:
+            sync_time_entries(self.name)
 
     def on_submit(self):
         """Actions when invoice is submitted"""
         if not self.invoice_date:
             self.invoice_date = nowdate()
         self.db_set('status', 'Unpaid')  # Use db_set to avoid recursion
+        update_invoice_rollup(self, 1)
+        update_invoice_counters(self, 1)
+        if not self.flags.skip_time_entry_sync:
+            sync_time_entries(self.name)
         frappe.msgprint(f"Invoice {self.name} has been submitted successfully.", indicator="green")
 
+    def before_update_after_submit(self):
+        """A payment recorded on a submitted invoice: recompute the balance, status and aging"""
+        # Items cannot change after submit, so a large invoice writes none of them
+        self.restore_unloaded_items()
+        self.flags.changed_items = []
+        self.balance_due = float(to_decimal(self.grand_total) - to_decimal(self.amount_paid))
+        if flt(self.amount_paid) < 0:
+            frappe.throw("Amount paid cannot be negative")
+        if flt(self.balance_due) < 0:
+            frappe.throw("Amount paid cannot exceed the grand total")
+        self.validate_status()
+
+    def on_update_after_submit(self):
+        """Keep the case's and the rollup's outstanding amounts in step with payments on a submitted invoice"""
+        update_invoice_balance_counter(self)
+        update_invoice_balance_rollup(self)
+
+    def before_cancel(self):
+        """Cancelling changes no items; a large invoice only needs their docstatus updated"""
+        self.restore_unloaded_items()
+        self.flags.changed_items = []
+
     def on_cancel(self):
         """Actions when invoice is cancelled"""
         self.db_set('status', 'Cancelled')  # Use db_set to avoid recursion
-        frappe.msgprint(f"Invoice {self.name} has been cancelled.", indicator="red")
\ No newline at end of file
+        update_invoice_rollup(self, -1)
+        update_invoice_counters(self, -1)
+        release_time_entries(self.name)
+        frappe.msgprint(f"Invoice {self.name} has been cancelled.", indicator="red")
+
+    def on_trash(self):
+        """Return the time billed on a deleted draft to the unbilled pool"""
+        release_time_entries(self.name)
+
+def to_decimal(value):
+    return Decimal(str(value or 0))
+
+def item_values(item):
+    return tuple(item.get(fieldname) for fieldname in ITEM_FIELDS)
+
+def insert_items(items):
+    """Insert new Invoice Item rows with multi-row INSERTs"""
+    if not items:
+        return
+
+    timestamp = now()
+    rows = []
+    for item in items:
+        if not item.name:
+            set_new_name(item)
+        item.creation = item.modified = timestamp
+        item.owner = item.modified_by = frappe.session.user
+        rows.append(item.get_valid_dict(convert_dates_to_str=True))
+        item.set("__islocal", False)
+
+    fields = list(rows[0])
+    frappe.db.bulk_insert("Invoice Item",
+        fields=fields,
+        values=[tuple(row.get(field) for field in fields) for row in rows]
+    )
+
+@frappe.whitelist()
+def get_invoice_items(invoice, start=0, page_length=ITEMS_PAGE_LENGTH):
+    """One page of an invoice's items in idx order, with the total count, for large invoices in the form"""
+    frappe.has_permission("Legal Invoice", "read", invoice, throw=True)
+
+    page_length = min(cint(page_length) or ITEMS_PAGE_LENGTH, MAX_ITEMS_PAGE)
+    items = frappe.db.sql("""
+        SELECT name, idx, item_code, description, quantity, rate, amount, time_entry
+        FROM `tabInvoice Item`
+        WHERE parent = %(invoice)s AND parenttype = 'Legal Invoice' AND parentfield = 'items'
+        AND idx > %(start)s
+        ORDER BY idx
+        LIMIT %(page_length)s
+    """, {"invoice": invoice, "start": cint(start), "page_length": page_length}, as_dict=True)
+
+    return {
+        "items": items,
+        "total": frappe.db.count("Invoice Item",
+            {"parent": invoice, "parenttype": "Legal Invoice", "parentfield": "items"}),
+        "next_start": items[-1].idx if len(items) == page_length else None
+    }
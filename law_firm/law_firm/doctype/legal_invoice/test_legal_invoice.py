@@ -0,0 +1,110 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from law_firm.law_firm.doctype.legal_invoice.legal_invoice import (
+    ITEMS_PAGE_LENGTH,
+    LARGE_INVOICE_ITEMS,
+    get_invoice_items
+)
+from law_firm.law_firm.invoice_pdfs import get_stale_renders
+
+TEST_ITEM = "_Test Legal Services"
+
+
+class TestLegalInvoice(FrappeTestCase):
+    def setUp(self):
+        # Inserted without controllers: the invoice only links to them
+        if not frappe.db.exists("Item", TEST_ITEM):
+            frappe.get_doc({"doctype": "Item", "name": TEST_ITEM}).db_insert()
+
+        client = frappe.get_doc({
+            "doctype": "Client",
+            "naming_series": "CLI-.YYYY.-",
+            "client_name": "_Test Invoice Client",
+            "client_type": "Individual"
+        })
+        client.db_insert()
+        case = frappe.get_doc({
+            "doctype": "Legal Case",
+            "naming_series": "CASE-.YYYY.-",
+            "case_title": "_Test Large Invoice Case",
+            "client": client.name,
+            "status": "Open"
+        })
+        case.db_insert()
+
+        self.invoice = frappe.get_doc({
+            "doctype": "Legal Invoice",
+            "legal_case": case.name,
+            "client": client.name,
+            "invoice_date": "2024-04-01",
+            "due_date": "2024-05-01",
+            "items": [{
+                "item_code": TEST_ITEM,
+                "description": f"Line {line}",
+                "quantity": 1,
+                "rate": 10
+            } for line in range(LARGE_INVOICE_ITEMS + 1)]
+        }).insert()
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_first_insert_of_a_large_invoice_stores_every_item_once(self):
+        stored = frappe.get_all("Invoice Item",
+            filters={"parent": self.invoice.name, "parenttype": "Legal Invoice"},
+            fields=["name", "idx", "amount"],
+            order_by="idx"
+        )
+        self.assertEqual([item.idx for item in stored], list(range(1, LARGE_INVOICE_ITEMS + 2)))
+        self.assertEqual(len({item.name for item in stored}), LARGE_INVOICE_ITEMS + 1)
+        self.assertEqual(self.invoice.grand_total, 10 * (LARGE_INVOICE_ITEMS + 1))
+
+    def test_form_opens_on_the_first_page_and_pages_through_the_rest(self):
+        invoice = frappe.get_doc("Legal Invoice", self.invoice.name)
+        invoice.run_method("onload")
+        page = invoice.get_onload().items_page
+        self.assertEqual(len(invoice.items), ITEMS_PAGE_LENGTH)
+        self.assertEqual(page["total"], LARGE_INVOICE_ITEMS + 1)
+
+        loaded, start = len(invoice.items), page["next_start"]
+        while start:
+            result = get_invoice_items(self.invoice.name, start)
+            self.assertEqual(result["total"], LARGE_INVOICE_ITEMS + 1)
+            loaded += len(result["items"])
+            start = result["next_start"]
+        self.assertEqual(loaded, LARGE_INVOICE_ITEMS + 1)
+
+    def test_saving_a_partly_loaded_invoice_keeps_the_unloaded_items(self):
+        invoice = frappe.get_doc("Legal Invoice", self.invoice.name)
+        invoice.run_method("onload")
+        invoice.set("__items_paged", 1)
+        invoice.notes = "Reviewed"
+        invoice.save()
+
+        self.assertEqual(frappe.db.count("Invoice Item", {"parent": self.invoice.name}), LARGE_INVOICE_ITEMS + 1)
+        self.assertEqual(invoice.grand_total, self.invoice.grand_total)
+
+
+class TestInvoicePdfRenders(FrappeTestCase):
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def attach(self, file_name):
+        # Inserted without controllers: only the attachment rows are read
+        file = frappe.get_doc({
+            "doctype": "File",
+            "file_name": file_name,
+            "file_url": f"/private/files/{file_name}",
+            "attached_to_doctype": "Legal Invoice",
+            "attached_to_name": "_Test INV-0001",
+            "is_private": 1
+        })
+        file.db_insert()
+        return file.name
+
+    def test_only_earlier_renders_are_stale(self):
+        old_render = self.attach("_Test INV-0001-0123456789ab.pdf")
+        self.attach("_Test INV-0001-signed.pdf")
+        self.attach("_Test INV-0001-engagement-letter.pdf")
+
+        self.assertEqual(get_stale_renders("_Test INV-0001", "_Test INV-0001-ba9876543210.pdf"), [old_render])
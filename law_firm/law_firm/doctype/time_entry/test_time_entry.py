@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from law_firm.law_firm.time_entry_ingest import insert_time_entries
+from law_firm.law_firm.time_overlaps import get_interval, sweep_overlaps
+
+
+def make_entry(name, employee, start, end):
+    return {"name": name, "employee": employee, "start": datetime.fromisoformat(start),
+        "end": datetime.fromisoformat(end)}
+
+def overlapping_pairs(entries):
+    entries = sorted(entries, key=lambda entry: (entry["employee"], entry["start"]))
+    return [(earlier["name"], later["name"]) for earlier, later in sweep_overlaps(entries)]
+
+
+class TestTimeEntry(FrappeTestCase):
+    def test_interval_of_an_entry_within_a_day(self):
+        self.assertEqual(get_interval("2024-03-01", "09:00:00", "10:30:00"),
+            (datetime(2024, 3, 1, 9, 0), datetime(2024, 3, 1, 10, 30)))
+
+    def test_interval_crossing_midnight_ends_the_next_day(self):
+        self.assertEqual(get_interval("2024-03-01", "23:00:00", "01:00:00"),
+            (datetime(2024, 3, 1, 23, 0), datetime(2024, 3, 2, 1, 0)))
+
+    def test_entries_without_a_time_range_have_no_interval(self):
+        self.assertIsNone(get_interval("2024-03-01", "09:00:00", "09:00:00"))
+        self.assertIsNone(get_interval("2024-03-01", None, "10:00:00"))
+        self.assertIsNone(get_interval(None, "09:00:00", "10:00:00"))
+
+    def test_touching_entries_do_not_overlap(self):
+        self.assertEqual(overlapping_pairs([
+            make_entry("A", "EMP-1", "2024-03-01 09:00", "2024-03-01 10:00"),
+            make_entry("B", "EMP-1", "2024-03-01 10:00", "2024-03-01 11:00")
+        ]), [])
+
+    def test_overlap_across_midnight(self):
+        self.assertEqual(overlapping_pairs([
+            make_entry("NIGHT", "EMP-1", "2024-03-01 23:00", "2024-03-02 01:00"),
+            make_entry("EARLY", "EMP-1", "2024-03-02 00:30", "2024-03-02 02:00")
+        ]), [("NIGHT", "EARLY")])
+
+    def test_later_entries_pair_with_the_entry_reaching_furthest(self):
+        # LONG covers SHORT and LATE; LATE starts after SHORT ends but is still inside LONG
+        self.assertEqual(overlapping_pairs([
+            make_entry("LONG", "EMP-1", "2024-03-01 09:00", "2024-03-01 17:00"),
+            make_entry("SHORT", "EMP-1", "2024-03-01 10:00", "2024-03-01 11:00"),
+            make_entry("LATE", "EMP-1", "2024-03-01 12:00", "2024-03-01 13:00")
+        ]), [("LONG", "SHORT"), ("LONG", "LATE")])
+
+    def test_each_overlapping_entry_is_reported_once(self):
+        self.assertEqual(overlapping_pairs([
+            make_entry("A", "EMP-1", "2024-03-01 09:00", "2024-03-01 12:00"),
+            make_entry("B", "EMP-1", "2024-03-01 10:00", "2024-03-01 14:00"),
+            make_entry("C", "EMP-1", "2024-03-01 11:00", "2024-03-01 13:00")
+        ]), [("A", "B"), ("B", "C")])
+
+    def test_entries_of_different_attorneys_never_overlap(self):
+        self.assertEqual(overlapping_pairs([
+            make_entry("A", "EMP-1", "2024-03-01 09:00", "2024-03-01 17:00"),
+            make_entry("B", "EMP-2", "2024-03-01 10:00", "2024-03-01 11:00")
+        ]), [])
+
+
+class TestBulkTimeEntry(FrappeTestCase):
+    def setUp(self):
+        # Inserted without controllers: the bulk path only reads the case's client, practice area and status
+        # and checks that the linked attorney and client exist
+        for doctype, name in (("Employee", "_Test Bulk Attorney"), ("Client", "_Test Bulk Client")):
+            if not frappe.db.exists(doctype, name):
+                frappe.get_doc({"doctype": doctype, "name": name}).db_insert()
+
+        case = frappe.get_doc({
+            "doctype": "Legal Case",
+            "naming_series": "CASE-.YYYY.-",
+            "case_title": "_Test Bulk Time Entry Case",
+            "client": "_Test Bulk Client",
+            "status": "Open"
+        })
+        case.db_insert()
+        self.case = case.name
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def make_row(self, **values):
+        return {
+            "naming_series": "TE-.YYYY.-",
+            "employee": "_Test Bulk Attorney",
+            "legal_case": self.case,
+            "activity_date": "2024-03-01",
+            "from_time": "09:00:00",
+            "to_time": "10:30:00",
+            "activity_type": "Research",
+            "description": "Case law research",
+            **values
+        }
+
+    def test_valid_rows_are_saved_and_invalid_rows_reported(self):
+        result = insert_time_entries([
+            self.make_row(),
+            self.make_row(from_time="11:00:00", to_time="12:00:00", description=""),
+            self.make_row(from_time="13:00:00", to_time="14:00:00", employee="_Test Unknown Attorney")
+        ])
+
+        self.assertEqual([error["row"] for error in result["errors"]], [1, 2])
+        self.assertIn("_Test Unknown Attorney", result["errors"][1]["error"])
+        self.assertEqual(len(result["created"]), 1)
+
+        saved = frappe.db.get_value("Time Entry", result["created"][0],
+            ["legal_case", "client", "hours", "billing_status", "docstatus"], as_dict=True)
+        self.assertEqual((saved.legal_case, saved.client, saved.hours, saved.billing_status, saved.docstatus),
+            (self.case, "_Test Bulk Client", 1.5, "Draft", 0))
@@ -3,6 +3,11 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import nowdate, get_datetime, get_timespan_from_time_string
+from law_firm.law_firm.rollups import update_time_entry_rollup
+from law_firm.law_firm.case_counters import update_time_entry_counters
+from law_firm.law_firm.billing_rates import resolve_rate
+from law_firm.law_firm.case_archive import check_case_not_archived
+from law_firm.law_firm.time_overlaps import find_overlapping_entry, get_overlap_message
 
 class TimeEntry(Document):
     def before_insert(self):
@@ -24,15 +29,17 @@ class TimeEntry(Document):
         This prevents infinite loops that can occur if calculations are done in validate().
         """
         self.calculate_hours()
-        self.calculate_billable_amount()
         self.set_client_from_case()
+        self.calculate_billable_amount()
 
     def validate(self):
         """
         Performs validation checks before saving the Time Entry.
         Contains only checks, not calculations that modify fields.
         """
+        check_case_not_archived(self.legal_case, self.flags.case_status)
         self.validate_time_and_activity()
+        self.validate_no_overlap()
         self.validate_billing_details()
 
     def calculate_hours(self):
@@ -62,6 +69,7 @@ class TimeEntry(Document):
     def calculate_billable_amount(self):
         """
         Calculates the billable amount if the entry is marked as billable.
+        A missing billing rate is resolved from the Billing Rate table.
         """
         self.billable_amount = 0.0 # Initialize to 0
         
@@ -71,7 +79,10 @@ class TimeEntry(Document):
                 self.billable_hours = self.hours
 
             if not self.billing_rate:
-                frappe.throw("A <b>Billing Rate</b> is required for billable entries.")
+                self.billing_rate = self.get_default_billing_rate()
+
+            if not self.billing_rate:
+                frappe.throw("No <b>Billing Rate</b> applies to this entry. Enter a rate or add one in Billing Rate.")
                 
             if not self.billable_hours or self.billable_hours <= 0:
                 frappe.throw("Billable Hours must be a positive number for billable entries.")
@@ -83,6 +94,18 @@ class TimeEntry(Document):
             self.billing_rate = 0.0
             self.billable_amount = 0.0
 
+    def get_default_billing_rate(self):
+        """
+        Resolves the rate for this attorney, case, client, practice area and activity on the activity date.
+        Bulk loaders pass the case's practice area in flags to avoid a lookup per entry.
+        """
+        practice_area = self.flags.practice_area
+        if practice_area is None and self.legal_case:
+            practice_area = frappe.db.get_value("Legal Case", self.legal_case, "practice_area")
+
+        return resolve_rate(self.employee, self.legal_case, self.client, practice_area,
+            self.activity_type, self.activity_date)
+
     def validate_time_and_activity(self):
         """
         Validates time range and ensures activity details are present.
@@ -102,6 +125,18 @@ class TimeEntry(Document):
         if not self.description:
             frappe.throw("Description of activity is required.")
 
+    def validate_no_overlap(self):
+        """
+        Ensures the attorney has not logged another entry covering part of the same period.
+        Bulk loaders set flags.skip_overlap_check and check the whole batch at once instead.
+        """
+        if self.flags.skip_overlap_check:
+            return
+
+        overlapping = find_overlapping_entry(self)
+        if overlapping:
+            frappe.throw(get_overlap_message(overlapping))
+
     def validate_billing_details(self):
         """
         Validates billing-specific fields based on the 'Billable' checkbox.
@@ -133,15 +168,21 @@ class TimeEntry(Document):
     def on_submit(self):
         """
         Actions to perform when the Time Entry is submitted.
-        Sets the 'Billing Status' to 'Approved'.
+        Sets the 'Billing Status' to 'Approved' and adds the entry to the dashboard rollups
+        and its case's hour counters.
         """
         self.db_set('billing_status', 'Approved')
+        update_time_entry_rollup(self, 1)
+        update_time_entry_counters(self, 1)
         frappe.msgprint(f"Time Entry {self.name} has been approved.", alert=True)
 
     def on_cancel(self):
         """
         Actions to perform when the Time Entry is cancelled.
-        Changes status to 'Cancelled' for better audit trail.
+        Changes status to 'Cancelled' for better audit trail and removes the entry from the dashboard rollups
+        and its case's hour counters.
         """
         self.db_set('billing_status', 'Cancelled')
+        update_time_entry_rollup(self, -1)
+        update_time_entry_counters(self, -1)
         frappe.msgprint(f"Time Entry {self.name} has been cancelled.", alert=True)
\ No newline at end of file
@@ -0,0 +1,22 @@
+import frappe
+from frappe.model.document import Document
+from frappe import _
+
+SUPPORTED_EXTENSIONS = (".csv", ".jsonl")
+MAX_CHUNK_SIZE = 10000
+
+class TimeEntryImport(Document):
+    def validate(self):
+        """
+        Validate the import file and chunk size
+        """
+        if self.import_file and not self.import_file.lower().endswith(SUPPORTED_EXTENSIONS):
+            frappe.throw(_("Import File must be a .csv or .jsonl file"))
+
+        if not self.chunk_size or self.chunk_size <= 0:
+            self.chunk_size = 1000
+        elif self.chunk_size > MAX_CHUNK_SIZE:
+            frappe.throw(_("Chunk Size cannot be more than {0}").format(MAX_CHUNK_SIZE))
+
+        if not self.is_new() and self.has_value_changed("import_file") and self.rows_processed:
+            frappe.throw(_("Import File cannot be changed once the import has started"))
@@ -0,0 +1,202 @@
+# hearing_reminders.py
+"""
+Court hearing reminders.
+
+Every active hearing has one Hearing Reminder row per configured offset
+before it (site config `hearing_reminder_offsets`, default 7d, 1d and 2h),
+kept in step with the hearing's date, time and status when it is saved.
+The dispatcher claims due rows a chunk at a time with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of scheduler workers can
+run it at once without two of them claiming the same reminder. Each chunk
+queues its emails to the attending attorneys and marks its rows with one
+UPDATE in the same transaction, so a reminder is queued exactly once.
+"""
+import re
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import get_datetime, getdate, now_datetime, format_datetime
+from law_firm.law_firm.deadlines import INACTIVE_HEARING_STATUSES
+from law_firm.law_firm.batch_jobs import run_batch_job
+
+DEFAULT_REMINDER_OFFSETS = ["7d", "1d", "2h"]
+DEFAULT_HEARING_TIME = "09:00:00"
+DISPATCH_CHUNK_SIZE = 100
+
+OFFSET_UNITS = {"d": "days", "h": "hours", "m": "minutes"}
+
+
+def get_reminder_offsets():
+    """Configured offsets as (label, timedelta), e.g. [("7d", 7 days), ("2h", 2 hours)]"""
+    offsets = []
+    for label in frappe.conf.get("hearing_reminder_offsets") or DEFAULT_REMINDER_OFFSETS:
+        match = re.fullmatch(r"\s*(\d+)\s*([dhm])\s*", str(label))
+        if not match:
+            frappe.log_error(f"Invalid hearing reminder offset: {label}", "Hearing Reminders")
+            continue
+        offsets.append((f"{match.group(1)}{match.group(2)}",
+            timedelta(**{OFFSET_UNITS[match.group(2)]: int(match.group(1))})))
+    return offsets
+
+def get_hearing_datetime(hearing):
+    """When a hearing starts; hearings without a time are taken to start in the morning"""
+    return get_datetime(f"{getdate(hearing.hearing_date)} {hearing.hearing_time or DEFAULT_HEARING_TIME}")
+
+def sync_hearing_reminders(hearing):
+    """
+    Make the reminders of a Court Hearing match its schedule: future offsets are (re)armed,
+    reminders of a moved hearing are rescheduled, and pending ones that no longer apply are cancelled.
+    """
+    wanted = {}
+    if hearing.hearing_date and hearing.status not in INACTIVE_HEARING_STATUSES:
+        hearing_at = get_hearing_datetime(hearing)
+        current_time = now_datetime()
+        for label, delta in get_reminder_offsets():
+            if hearing_at - delta > current_time:
+                wanted[label] = hearing_at - delta
+
+    existing = {
+        row.reminder_offset: row for row in frappe.get_all("Hearing Reminder",
+            filters={"court_hearing": hearing.name},
+            fields=["name", "reminder_offset", "remind_at", "status"]
+        )
+    }
+
+    for label, remind_at in wanted.items():
+        row = existing.get(label)
+        if not row:
+            frappe.get_doc({
+                "doctype": "Hearing Reminder",
+                "court_hearing": hearing.name,
+                "legal_case": hearing.legal_case,
+                "reminder_offset": label,
+                "remind_at": remind_at,
+                "hearing_at": get_hearing_datetime(hearing),
+                "status": "Pending"
+            }).insert(ignore_permissions=True)
+        elif get_datetime(row.remind_at) != remind_at or row.status == "Cancelled":
+            frappe.db.set_value("Hearing Reminder", row.name, {
+                "remind_at": remind_at,
+                "hearing_at": get_hearing_datetime(hearing),
+                "legal_case": hearing.legal_case,
+                "status": "Pending",
+                "sent_at": None,
+                "recipients": None
+            })
+
+    stale = [row.name for label, row in existing.items() if label not in wanted and row.status == "Pending"]
+    if stale:
+        frappe.db.sql("""
+            UPDATE `tabHearing Reminder`
+            SET status = 'Cancelled', modified = %s
+            WHERE name IN %s
+        """, (now_datetime(), tuple(stale)))
+
+def clear_hearing_reminders(hearing_name):
+    """Delete the reminders of a deleted Court Hearing"""
+    frappe.db.delete("Hearing Reminder", {"court_hearing": hearing_name})
+
+def dispatch_hearing_reminders(chunk_size=DISPATCH_CHUNK_SIZE):
+    """
+    Scheduled job: queue every due reminder, one claimed and committed chunk at a time.
+    The claim is the checkpoint (claimed rows stop being Pending), so workers may run it side by side.
+    """
+    run_batch_job("dispatch_hearing_reminders",
+        lambda after, limit: claim_due_reminders(limit),
+        send_claimed_reminders,
+        chunk_size=chunk_size,
+        exclusive=False
+    )
+
+def claim_due_reminders(chunk_size):
+    """Lock a chunk of due reminders, skipping rows another worker has already locked"""
+    return frappe.db.sql("""
+        SELECT name, court_hearing, reminder_offset
+        FROM `tabHearing Reminder`
+        WHERE status = 'Pending' AND remind_at <= %(now)s
+        ORDER BY remind_at
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    """, {"now": now_datetime(), "limit": chunk_size}, as_dict=True)
+
+def send_claimed_reminders(reminders):
+    """Queue one email per claimed reminder and mark the whole chunk with a single UPDATE; returns the number queued"""
+    hearing_names = tuple({reminder.court_hearing for reminder in reminders})
+    hearings = {hearing.name: hearing for hearing in frappe.db.sql("""
+        SELECT h.name, h.hearing_title, h.hearing_type, h.hearing_date, h.hearing_time, h.status,
+            h.court_name, h.courtroom, h.legal_case, c.case_title
+        FROM `tabCourt Hearing` h
+        LEFT JOIN `tabLegal Case` c ON c.name = h.legal_case
+        WHERE h.name IN %(hearings)s
+    """, {"hearings": hearing_names}, as_dict=True)}
+    recipients = get_hearing_recipients(hearing_names)
+
+    current_time = now_datetime()
+    sent = {}
+    for reminder in reminders:
+        hearing = hearings.get(reminder.court_hearing)
+        emails = recipients.get(reminder.court_hearing)
+        if (not hearing or not emails or hearing.status in INACTIVE_HEARING_STATUSES
+                or get_hearing_datetime(hearing) <= current_time):
+            continue
+
+        queue_reminder_email(hearing, reminder.reminder_offset, emails)
+        sent[reminder.name] = ", ".join(emails)
+
+    # Reminders that could not go out (hearing gone, past or without attorneys) are skipped, not retried
+    recipients_column = "NULL"
+    if sent:
+        recipients_column = "CASE name {0} ELSE NULL END".format(" ".join(["WHEN %s THEN %s"] * len(sent)))
+    values = [value for item in sent.items() for value in item]
+    frappe.db.sql(f"""
+        UPDATE `tabHearing Reminder`
+        SET
+            status = IF(name IN %s, 'Sent', 'Skipped'),
+            recipients = {recipients_column},
+            sent_at = %s,
+            modified = %s
+        WHERE name IN %s
+    """, (tuple(sent) or ("",), *values, current_time, current_time,
+        tuple(reminder.name for reminder in reminders)))
+    return len(sent)
+
+def get_hearing_recipients(hearing_names):
+    """Emails of the enabled attending attorneys of each hearing, in one query"""
+    recipients = {}
+    for hearing, email in frappe.db.sql("""
+        SELECT DISTINCT m.parent, u.email
+        FROM `tabCase Team Member` m
+        JOIN `tabUser` u ON u.name = m.team_member
+        WHERE m.parenttype = 'Court Hearing' AND m.parentfield = 'attending_attorneys'
+        AND m.parent IN %(hearings)s
+        AND u.enabled = 1 AND IFNULL(u.email, '') != ''
+    """, {"hearings": hearing_names}):
+        recipients.setdefault(hearing, []).append(email)
+    return recipients
+
+def queue_reminder_email(hearing, offset, recipients):
+    """Add a reminder to the Email Queue; it is sent by the email flush job, not inline"""
+    title = hearing.hearing_title or hearing.hearing_type
+    starts = format_datetime(get_hearing_datetime(hearing))
+    location = ", ".join(filter(None, [hearing.court_name, hearing.courtroom]))
+
+    frappe.sendmail(
+        recipients=recipients,
+        subject=_("Reminder: {0} on {1}").format(title, starts),
+        message=f"""
+        Dear Attorney,
+
+        This is a reminder ({offset} ahead) that {title} is scheduled for {starts}{f' at {location}' if location else ''}.
+
+        Case: {hearing.case_title or hearing.legal_case}
+
+        Please ensure you are prepared.
+
+        Best regards,
+        Law Firm Management System
+        """,
+        reference_doctype="Court Hearing",
+        reference_name=hearing.name,
+        delayed=True
+    )
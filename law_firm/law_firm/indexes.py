@@ -0,0 +1,179 @@
+# indexes.py
+"""
+Managed index set for the reporting and dashboard queries, plus an EXPLAIN
+based check that none of those queries fall back to a full table scan.
+
+The add_reporting_indexes patch creates the whole set and skips the indexes a
+site already has. A change to REPORTING_INDEXES bumps that patch's entry in
+patches.txt so every site runs it again, rather than adding another patch.
+"""
+import frappe
+from frappe.utils import cint
+
+# Composite indexes, leading column first, keyed by doctype
+REPORTING_INDEXES = {
+    "Time Entry": [
+        ("docstatus", "activity_date", "employee"),
+        ("employee", "activity_date", "from_time"),
+        ("invoiced", "billing_status", "legal_case"),
+        ("invoice_reference",),
+        ("legal_case", "docstatus"),
+        ("client", "docstatus"),
+        ("client", "docstatus", "activity_date"),
+        ("legal_case", "modified"),
+        ("legal_case", "activity_date")
+    ],
+    "Invoice Item": [
+        ("time_entry",)
+    ],
+    "Legal Invoice": [
+        ("docstatus", "invoice_date"),
+        ("legal_case", "docstatus"),
+        ("client", "docstatus"),
+        ("status",),
+        ("legal_case", "modified"),
+        ("legal_case", "invoice_date")
+    ],
+    "Legal Case": [
+        ("status", "practice_area"),
+        ("statute_of_limitations", "status"),
+        ("client",)
+    ],
+    "Court Hearing": [
+        ("hearing_date", "status"),
+        ("legal_case", "modified"),
+        ("legal_case", "hearing_date")
+    ],
+    "Legal Document": [
+        ("legal_case", "modified"),
+        ("legal_case", "creation")
+    ],
+    "Client": [
+        ("status",),
+        ("email",),
+        ("normalized_mobile",),
+        ("normalized_phone",)
+    ],
+    "Case Activity": [
+        ("activity_time", "name"),
+        ("legal_case", "activity_time", "name"),
+        ("client", "activity_time", "name"),
+        ("user", "activity_time", "name")
+    ],
+    "Invoice Aging Snapshot": [
+        ("snapshot_date", "client")
+    ],
+    "Hearing Reminder": [
+        ("status", "remind_at"),
+        ("court_hearing",),
+        ("legal_case",)
+    ],
+    "Batch Job Run": [
+        ("job_name", "status"),
+        ("modified",)
+    ],
+    "Case Deadline": [
+        ("deadline_date", "attorney"),
+        ("attorney", "modified"),
+        ("reference_doctype", "reference_name"),
+        ("legal_case",)
+    ]
+}
+
+# Plan rows estimated to examine more rows than this are reported even when they use an index
+MAX_EXAMINED_ROWS = 10000
+
+# Tables whose plans are checked; framework tables such as tabUser are out of scope
+CHECKED_TABLES = {f"tab{doctype}" for doctype in REPORTING_INDEXES} | {
+    "tabTime Entry Rollup",
+    "tabLegal Invoice Rollup"
+}
+
+
+def ensure_reporting_indexes():
+    """Create any missing index from REPORTING_INDEXES (add_index skips existing ones); idempotent"""
+    for doctype, indexes in REPORTING_INDEXES.items():
+        for columns in indexes:
+            frappe.db.add_index(doctype, list(columns))
+
+def capture_queries(func, *args, **kwargs):
+    """Run func and return the SELECT statements it issued as (query, values) pairs"""
+    queries = []
+    original_sql = frappe.db.sql
+
+    def recording_sql(query, values=(), *sql_args, **sql_kwargs):
+        if str(query).lstrip().upper().startswith("SELECT"):
+            queries.append((str(query), values))
+        return original_sql(query, values, *sql_args, **sql_kwargs)
+
+    frappe.db.sql = recording_sql
+    try:
+        func(*args, **kwargs)
+    finally:
+        frappe.db.sql = original_sql
+
+    return queries
+
+def find_full_scans(queries):
+    """
+    EXPLAIN each query and return the plan rows that scan a checked table: every type ALL,
+    including plans where the optimizer passed over possible_keys, and every row estimate
+    above MAX_EXAMINED_ROWS.
+    """
+    full_scans = []
+    for query, values in queries:
+        for row in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True):
+            if row.table in CHECKED_TABLES and (row.type == "ALL" or cint(row.rows) > MAX_EXAMINED_ROWS):
+                full_scans.append({"query": query.strip(), "table": row.table, "type": row.type,
+                    "rows": cint(row.rows)})
+    return full_scans
+
+def find_unindexed_plans(queries):
+    """
+    EXPLAIN each query with the optimizer told to prefer index lookups over table scans, and
+    return the plan rows of a checked table that use no index at all. Unlike find_full_scans
+    this does not depend on how many rows the tables hold, so it holds on nearly empty test data.
+    """
+    max_seeks = frappe.db.sql("SELECT @@SESSION.max_seeks_for_key")[0][0]
+    frappe.db.sql("SET SESSION max_seeks_for_key = 1")
+    try:
+        unindexed = []
+        for query, values in queries:
+            for row in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True):
+                if row.table in CHECKED_TABLES and not row.key:
+                    unindexed.append({"query": query.strip(), "table": row.table, "type": row.type,
+                        "rows": cint(row.rows)})
+        return unindexed
+    finally:
+        frappe.db.sql("SET SESSION max_seeks_for_key = %s", max_seeks)
+
+def get_checked_functions():
+    """Dashboard and report functions whose queries must stay index-backed"""
+    from law_firm.law_firm import api
+
+    checks = [
+        api.get_summary_cards,
+        api.get_case_statistics,
+        api.get_billing_overview,
+        api.get_recent_activities,
+        api.get_upcoming_deadlines,
+        api.get_team_productivity
+    ]
+
+    sample_case = frappe.db.get_value("Legal Case", {}, "name")
+    if sample_case:
+        case = frappe.get_doc("Legal Case", sample_case)
+        checks += [
+            lambda: api.generate_case_summary_report(case),
+            lambda: api.generate_case_billing_report(case),
+            lambda: api.generate_case_timeline_report(case)
+        ]
+
+    return checks
+
+def check_query_plans(find=find_full_scans):
+    """Return every full scan issued by the dashboard and report queries (empty list when clean)"""
+    full_scans = []
+    for check in get_checked_functions():
+        full_scans += find(capture_queries(check))
+    return full_scans
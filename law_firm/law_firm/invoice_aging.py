@@ -0,0 +1,143 @@
+# invoice_aging.py
+"""
+Nightly invoice status and aging refresh.
+
+Invoices turn Overdue with the calendar, not with an edit, so a daily job
+recomputes status, days overdue and aging bucket for every open invoice
+with chunked, set-based UPDATEs, then stores the receivables aging per
+client in Invoice Aging Snapshot. AR aging reads are a lookup of one
+snapshot row instead of an aggregate over the invoices.
+"""
+import frappe
+from frappe.utils import add_days, getdate, nowdate, now
+from law_firm.law_firm.dashboard_cache import SECTION_DEPENDENCIES, invalidate_sections
+from law_firm.law_firm.client_portal import invalidate_all_client_portals
+
+REFRESH_CHUNK_SIZE = 5000
+SNAPSHOT_RETENTION_DAYS = 400
+
+# (bucket, upper bound in days overdue); not-yet-due balances fall in the first bucket
+AGING_BUCKETS = [("0-30", 30), ("31-60", 60), ("61-90", 90), ("90+", None)]
+
+# SQL for the refreshed values of an invoice, mirroring LegalInvoice.validate_status and set_aging
+DAYS_OVERDUE_SQL = "IF(balance_due > 0 AND due_date < %(today)s, DATEDIFF(%(today)s, due_date), 0)"
+AGING_BUCKET_SQL = """CASE
+    WHEN balance_due <= 0 THEN ''
+    WHEN due_date IS NULL OR DATEDIFF(%(today)s, due_date) <= 30 THEN '0-30'
+    WHEN DATEDIFF(%(today)s, due_date) <= 60 THEN '31-60'
+    WHEN DATEDIFF(%(today)s, due_date) <= 90 THEN '61-90'
+    ELSE '90+'
+END"""
+STATUS_SQL = """CASE
+    WHEN balance_due <= 0 AND grand_total > 0 THEN 'Paid'
+    WHEN balance_due > 0 AND due_date < %(today)s THEN 'Overdue'
+    WHEN balance_due > 0 THEN 'Unpaid'
+    ELSE status
+END"""
+
+
+def get_aging_bucket(days_overdue):
+    """Aging bucket of an outstanding balance that is `days_overdue` days past due"""
+    for bucket, upper in AGING_BUCKETS:
+        if upper is None or days_overdue <= upper:
+            return bucket
+
+def refresh_invoice_aging():
+    """Scheduled job: bring invoice status and aging up to date, then store today's snapshot"""
+    refresh_invoice_status()
+    store_aging_snapshot()
+    sections = SECTION_DEPENDENCIES["Legal Invoice"]
+    frappe.db.after_commit.add(lambda: invalidate_sections(sections))
+    frappe.db.after_commit.add(invalidate_all_client_portals)
+    frappe.db.commit()
+
+def refresh_invoice_status(chunk_size=REFRESH_CHUNK_SIZE):
+    """
+    Recompute status, days_overdue and aging_bucket of submitted invoices, one chunk of names at a time.
+    Mirrors LegalInvoice.validate_status and LegalInvoice.set_aging.
+    """
+    today = getdate(nowdate())
+    last_name = ""
+    while True:
+        # Only invoices with a balance, or with aging left over from when they had one, can change
+        names = [row[0] for row in frappe.db.sql("""
+            SELECT name
+            FROM `tabLegal Invoice`
+            WHERE docstatus = 1
+            AND status != 'Cancelled'
+            AND (balance_due > 0 OR status IN ('Overdue', 'Unpaid') OR IFNULL(aging_bucket, '') != '')
+            AND name > %(last_name)s
+            ORDER BY name
+            LIMIT %(limit)s
+        """, {"last_name": last_name, "limit": chunk_size})]
+        if not names:
+            break
+
+        # modified is set first, while the columns still hold their old values, and only moves for
+        # invoices that change, so MAX(modified)-keyed caches such as the case report memo see the refresh
+        frappe.db.sql(f"""
+            UPDATE `tabLegal Invoice`
+            SET
+                modified = IF(days_overdue <=> {DAYS_OVERDUE_SQL}
+                    AND IFNULL(aging_bucket, '') <=> {AGING_BUCKET_SQL}
+                    AND status <=> {STATUS_SQL}, modified, %(now)s),
+                days_overdue = {DAYS_OVERDUE_SQL},
+                aging_bucket = {AGING_BUCKET_SQL},
+                status = {STATUS_SQL}
+            WHERE name IN %(names)s
+        """, {"today": today, "now": now(), "names": tuple(names)})
+        frappe.db.commit()
+        last_name = names[-1]
+
+def store_aging_snapshot():
+    """Replace today's Invoice Aging Snapshot: one row per client plus a firm-wide row without a client"""
+    today = getdate(nowdate())
+    timestamp = now()
+
+    frappe.db.sql("""
+        DELETE FROM `tabInvoice Aging Snapshot`
+        WHERE snapshot_date = %s OR snapshot_date < %s
+    """, (today, add_days(today, -SNAPSHOT_RETENTION_DAYS)))
+
+    for client, group_by in (("client", "GROUP BY client"), ("NULL", "")):
+        frappe.db.sql(f"""
+            INSERT INTO `tabInvoice Aging Snapshot`
+                (name, creation, modified, owner, modified_by, snapshot_date, client, invoice_count,
+                 bucket_0_30, bucket_31_60, bucket_61_90, bucket_90_plus, total_outstanding)
+            SELECT
+                SHA1(CONCAT_WS('|', %(today)s, IFNULL({client}, ''))),
+                %(now)s, %(now)s, 'Administrator', 'Administrator',
+                %(today)s, {client}, COUNT(*),
+                IFNULL(SUM(IF(aging_bucket = '0-30', balance_due, 0)), 0),
+                IFNULL(SUM(IF(aging_bucket = '31-60', balance_due, 0)), 0),
+                IFNULL(SUM(IF(aging_bucket = '61-90', balance_due, 0)), 0),
+                IFNULL(SUM(IF(aging_bucket = '90+', balance_due, 0)), 0),
+                IFNULL(SUM(balance_due), 0)
+            FROM `tabLegal Invoice`
+            WHERE docstatus = 1
+            AND status != 'Cancelled'
+            AND balance_due > 0
+            {group_by}
+        """, {"today": today, "now": timestamp})
+
+@frappe.whitelist()
+def get_ar_aging(client=None):
+    """Receivables aging from the latest snapshot, for one client or the whole firm"""
+    frappe.has_permission("Invoice Aging Snapshot", throw=True)
+
+    snapshot_date = frappe.db.sql("SELECT MAX(snapshot_date) FROM `tabInvoice Aging Snapshot`")[0][0]
+    if not snapshot_date:
+        return None
+
+    client_condition = "client = %(client)s" if client else "client IS NULL"
+    rows = frappe.db.sql(f"""
+        SELECT snapshot_date, client, invoice_count, bucket_0_30, bucket_31_60,
+            bucket_61_90, bucket_90_plus, total_outstanding
+        FROM `tabInvoice Aging Snapshot`
+        WHERE snapshot_date = %(snapshot_date)s AND {client_condition}
+    """, {"snapshot_date": snapshot_date, "client": client}, as_dict=True)
+
+    return rows[0] if rows else {
+        "snapshot_date": snapshot_date, "client": client, "invoice_count": 0, "bucket_0_30": 0,
+        "bucket_31_60": 0, "bucket_61_90": 0, "bucket_90_plus": 0, "total_outstanding": 0
+    }
@@ -0,0 +1,214 @@
+# invoice_pdfs.py
+"""
+Batch rendering of Legal Invoice PDFs.
+
+A background job renders the requested invoices over a pool of worker
+processes, each with its own site context and database connection. Every
+rendered PDF is stored as a private attachment of its invoice, named after
+the invoice and a stamp of (print format, modified). That attachment is the
+render cache: an invoice that has not changed since its last render is not
+rendered again. The job can stop there or stream all PDFs into one ZIP.
+"""
+import hashlib
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+
+RENDER_WORKERS = 4
+RENDER_JOB_TIMEOUT = 2 * 60 * 60
+COMMIT_EVERY = 50  # rendered PDFs saved per commit
+MAX_BATCH_INVOICES = 10000
+
+
+@frappe.whitelist()
+def render_invoice_pdfs(invoices, print_format=None, output="zip"):
+    """
+    Queue PDF rendering for a list of invoices (JSON list of names).
+    output "zip" builds one ZIP of all PDFs; "attach" only attaches each PDF to its invoice.
+    """
+    names = frappe.parse_json(invoices) if isinstance(invoices, str) else invoices
+    names = list(dict.fromkeys(names or []))
+    if not names:
+        frappe.throw(_("Select at least one invoice"))
+    if len(names) > MAX_BATCH_INVOICES:
+        frappe.throw(_("A batch can render at most {0} invoices").format(MAX_BATCH_INVOICES))
+    if output not in ("zip", "attach"):
+        frappe.throw(_("Output must be 'zip' or 'attach'"))
+    frappe.has_permission("Legal Invoice", "print", throw=True)
+
+    # The job reads invoices without permission checks; keep only those this user may read
+    readable = set(frappe.get_list("Legal Invoice",
+        filters={"name": ["in", names]},
+        pluck="name",
+        limit_page_length=0
+    ))
+    names = [name for name in names if name in readable]
+    if not names:
+        frappe.throw(_("You do not have access to any of the selected invoices"), frappe.PermissionError)
+
+    frappe.enqueue(run_invoice_pdf_render,
+        queue="long",
+        timeout=RENDER_JOB_TIMEOUT,
+        names=names,
+        print_format=print_format,
+        output=output
+    )
+
+def run_invoice_pdf_render(names, print_format=None, output="zip"):
+    """Background job: render the invoices missing from the cache, then optionally zip them all"""
+    invoices = frappe.get_all("Legal Invoice",
+        filters={"name": ["in", names]},
+        fields=["name", "modified"]
+    )
+    cached = get_cached_pdfs(invoices, print_format)
+    missing = [invoice for invoice in invoices if invoice.name not in cached]
+
+    publish_render_progress(len(invoices), len(cached))
+    cached.update(render_missing(missing, print_format, done=len(cached), total=len(invoices)))
+
+    if output == "zip":
+        file_url = build_zip([invoice.name for invoice in invoices if invoice.name in cached], cached)
+        frappe.publish_realtime("invoice_pdfs_ready", {"file_url": file_url}, user=frappe.session.user)
+    else:
+        frappe.publish_realtime("invoice_pdfs_ready", {"count": len(cached)}, user=frappe.session.user)
+
+def get_pdf_file_name(invoice, print_format):
+    """Attachment name for an invoice rendered at its current `modified` with a print format"""
+    stamp = hashlib.sha1(f"{print_format or ''}|{invoice.modified}".encode()).hexdigest()[:12]
+    return f"{invoice.name}-{stamp}.pdf"
+
+def get_cached_pdfs(invoices, print_format):
+    """Map invoice name to the path of a PDF rendered from its current version, in one query"""
+    if not invoices:
+        return {}
+
+    expected = {get_pdf_file_name(invoice, print_format): invoice.name for invoice in invoices}
+    files = frappe.get_all("File",
+        filters={
+            "attached_to_doctype": "Legal Invoice",
+            "attached_to_name": ["in", [invoice.name for invoice in invoices]],
+            "file_name": ["in", list(expected)]
+        },
+        fields=["file_name", "file_url"]
+    )
+
+    cached = {}
+    for file in files:
+        path = get_file_path(file.file_url)
+        if os.path.exists(path):
+            cached[expected[file.file_name]] = path
+    return cached
+
+def render_missing(invoices, print_format, done, total):
+    """Render invoices over the process pool and store each PDF as an attachment"""
+    rendered = {}
+    if not invoices:
+        return rendered
+
+    # Spawned workers start clean instead of inheriting this job's database connection
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(RENDER_WORKERS, len(invoices)),
+        mp_context=context,
+        initializer=init_render_worker,
+        initargs=(frappe.local.site, frappe.local.sites_path, frappe.session.user)
+    ) as pool:
+        futures = {pool.submit(render_invoice_pdf, invoice.name, print_format): invoice for invoice in invoices}
+        for future in as_completed(futures):
+            invoice = futures[future]
+            try:
+                pdf = future.result()
+            except Exception:
+                frappe.log_error(f"Could not render invoice {invoice.name}", "Invoice PDF Render")
+                continue
+
+            rendered[invoice.name] = save_pdf(invoice, print_format, pdf)
+            if len(rendered) % COMMIT_EVERY == 0:
+                frappe.db.commit()
+                publish_render_progress(total, done + len(rendered))
+
+    frappe.db.commit()
+    return rendered
+
+def init_render_worker(site, sites_path, user):
+    """Process pool initializer: give the worker its own site context and connection"""
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user(user)
+
+def render_invoice_pdf(name, print_format=None):
+    """Render one invoice to PDF bytes (runs in a pool worker)"""
+    try:
+        return frappe.get_print("Legal Invoice", name, print_format=print_format, as_pdf=True)
+    finally:
+        # Read-only work; drop the snapshot so the next invoice sees fresh data
+        frappe.db.rollback()
+
+def save_pdf(invoice, print_format, pdf):
+    """Attach a rendered PDF to its invoice, replacing renders of older versions; returns its path"""
+    file_name = get_pdf_file_name(invoice, print_format)
+    for file in get_stale_renders(invoice.name, file_name):
+        frappe.delete_doc("File", file, ignore_permissions=True)
+
+    file = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "attached_to_doctype": "Legal Invoice",
+        "attached_to_name": invoice.name,
+        "is_private": 1,
+        "content": pdf
+    })
+    file.insert(ignore_permissions=True)
+    return get_file_path(file.file_url)
+
+def get_stale_renders(invoice_name, file_name):
+    """
+    Attachments of an invoice that are earlier renders: named exactly like get_pdf_file_name
+    (invoice, dash, 12 hex digit stamp), other than a current render still on disk.
+    User uploads such as INV-0001-signed.pdf do not have that shape and are never returned.
+    """
+    render_name = re.compile(rf"{re.escape(invoice_name)}-[0-9a-f]{{12}}\.pdf")
+    files = frappe.get_all("File",
+        filters={
+            "attached_to_doctype": "Legal Invoice",
+            "attached_to_name": invoice_name,
+            "file_name": ["like", f"{invoice_name}-%.pdf"]
+        },
+        fields=["name", "file_name", "file_url"]
+    )
+    return [file.name for file in files if render_name.fullmatch(file.file_name or "")
+        and not (file.file_name == file_name and os.path.exists(get_file_path(file.file_url)))]
+
+def build_zip(names, paths):
+    """Stream the PDFs into one private ZIP file, one entry at a time; returns its URL"""
+    zip_name = f"invoices-{now_datetime().strftime('%Y%m%d-%H%M%S')}-{frappe.generate_hash(length=6)}.zip"
+    zip_path = frappe.get_site_path("private", "files", zip_name)
+
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name in names:
+            archive.write(paths[name], arcname=f"{name}.pdf")
+
+    file = frappe.get_doc({
+        "doctype": "File",
+        "file_name": zip_name,
+        "file_url": f"/private/files/{zip_name}",
+        "is_private": 1
+    })
+    file.insert(ignore_permissions=True)
+    frappe.db.commit()
+    return file.file_url
+
+def get_file_path(file_url):
+    """Absolute path of a stored file from its URL"""
+    if file_url.startswith("/private/"):
+        return frappe.get_site_path(file_url.lstrip("/"))
+    return frappe.get_site_path("public", file_url.lstrip("/"))
+
+def publish_render_progress(total, done):
+    frappe.publish_realtime("invoice_pdf_progress", {"total": total, "done": done}, user=frappe.session.user)
@@ -0,0 +1,219 @@
+# lead_conversion.py
+"""
+Lead to Client and Legal Case conversion, one lead at a time or in bulk.
+
+A bulk conversion runs as a background job over chunks of leads. Each chunk
+reads its leads in one query and matches them to existing clients by
+normalized email or phone in one more, through the Client.email,
+Client.normalized_mobile and Client.normalized_phone indexes; leads sharing an email or phone within the
+run share one new client. Clients and cases are inserted under a savepoint
+per lead and committed once per chunk. The folder and welcome email that
+Client.after_insert would create are queued per chunk instead of running
+inline.
+"""
+import re
+
+import frappe
+from frappe import _
+from frappe.utils import today
+
+CONVERSION_CHUNK_SIZE = 200
+CONVERSION_JOB_TIMEOUT = 2 * 60 * 60
+MAX_CONVERSION_LEADS = 20000
+
+# Lead fields copied to the client; read only where the installed Lead doctype has them
+LEAD_FIELDS = ["name", "lead_name", "email_id", "phone", "mobile_no", "address_line1", "address_line2",
+    "city", "state", "country"]
+
+
+def normalize_email(email):
+    """Email trimmed and lowercased, or None"""
+    return (email or "").strip().lower() or None
+
+def normalize_phone(phone):
+    """Last 10 digits of a phone number, or None when it has fewer"""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 10 else None
+
+def find_existing_client(lead):
+    """Name of the client matching a lead's email or phone, if any"""
+    clients = ClientMatcher()
+    clients.load([lead])
+    return clients.match(lead)
+
+def create_client(lead, defer_setup=False):
+    """Insert a Prospect client from a lead (without committing); returns the Client document"""
+    client = frappe.new_doc("Client")
+    client.client_name = lead.lead_name
+    client.client_type = "Individual"  # Assuming lead is an individual unless specified
+    client.email = lead.email_id
+    client.phone = lead.get("phone")
+    client.mobile = lead.get("mobile_no")
+    client.status = "Prospect"
+    client.address_line1 = lead.get("address_line1")
+    client.address_line2 = lead.get("address_line2")
+    client.city = lead.get("city")
+    client.state = lead.get("state")
+    client.country = lead.get("country")
+
+    client.flags.defer_setup = defer_setup
+    client.insert()
+    return client
+
+def create_case(lead, client, case_title, practice_area):
+    """Insert an open Legal Case for a converted lead (without committing); returns its name"""
+    case = frappe.new_doc("Legal Case")
+    case.case_title = case_title or lead.lead_name
+    case.client = client
+    case.practice_area = practice_area
+    case.status = "Open"
+    case.date_opened = today()
+    case.case_description = f"Case created from lead: {lead.lead_name}"
+    case.insert()
+    return case.name
+
+class ClientMatcher:
+    """Existing and newly created clients of a conversion run, by normalized email and phone"""
+
+    def __init__(self):
+        self.by_email = {}
+        self.by_phone = {}
+
+    def load(self, leads):
+        """Fetch the clients matching any of the leads' emails or phones in one indexed query"""
+        emails = {normalize_email(lead.email_id) for lead in leads} - {None} - set(self.by_email)
+        phones = {phone for lead in leads for phone in get_lead_phones(lead)} - set(self.by_phone)
+        if not emails and not phones:
+            return
+
+        conditions = []
+        if emails:
+            conditions.append("email IN %(emails)s")
+        if phones:
+            # A lead's number may be the client's mobile or landline; both columns are indexed
+            conditions.append("normalized_mobile IN %(phones)s")
+            conditions.append("normalized_phone IN %(phones)s")
+        clients = frappe.db.sql(f"""
+            SELECT name, email, normalized_mobile, normalized_phone
+            FROM `tabClient`
+            WHERE {' OR '.join(conditions)}
+            ORDER BY creation
+        """, {"emails": tuple(emails), "phones": tuple(phones)}, as_dict=True)
+
+        for client in clients:
+            self.add(client.name, client.email, client.normalized_mobile)
+            self.add(client.name, client.email, client.normalized_phone)
+
+    def add(self, name, email, phone):
+        # The oldest client wins when several share an email or phone
+        if normalize_email(email):
+            self.by_email.setdefault(normalize_email(email), name)
+        if phone:
+            self.by_phone.setdefault(phone, name)
+
+    def match(self, lead):
+        email = normalize_email(lead.email_id)
+        if email and email in self.by_email:
+            return self.by_email[email]
+        for phone in get_lead_phones(lead):
+            if phone in self.by_phone:
+                return self.by_phone[phone]
+
+def get_lead_phones(lead):
+    return [phone for phone in (normalize_phone(lead.get("mobile_no")), normalize_phone(lead.get("phone"))) if phone]
+
+@frappe.whitelist()
+def start_lead_conversion(leads, practice_area=None):
+    """
+    Queue the conversion of many leads. `leads` is a JSON list of lead names, or of
+    {"lead", "case_title", "practice_area"} objects; practice_area is the default for all.
+    Progress and the final counts are published to the requesting user.
+    """
+    frappe.has_permission("Client", "create", throw=True)
+    frappe.has_permission("Legal Case", "create", throw=True)
+
+    leads = frappe.parse_json(leads) if isinstance(leads, str) else leads
+    rows = []
+    for lead in leads or []:
+        row = {"lead": lead} if isinstance(lead, str) else dict(lead)
+        row.setdefault("practice_area", practice_area)
+        rows.append(row)
+
+    rows = list({row["lead"]: row for row in rows if row.get("lead")}.values())
+    if not rows:
+        frappe.throw(_("Select at least one lead"))
+    if len(rows) > MAX_CONVERSION_LEADS:
+        frappe.throw(_("A conversion can include at most {0} leads").format(MAX_CONVERSION_LEADS))
+
+    frappe.enqueue(run_lead_conversion,
+        queue="long",
+        timeout=CONVERSION_JOB_TIMEOUT,
+        enqueue_after_commit=True,
+        rows=rows
+    )
+    return {"queued": len(rows)}
+
+def run_lead_conversion(rows, chunk_size=CONVERSION_CHUNK_SIZE):
+    """Background job: convert leads chunk by chunk, committing once per chunk"""
+    clients = ClientMatcher()
+    summary = {"clients_created": 0, "clients_matched": 0, "cases_created": 0, "errors": []}
+
+    for start in range(0, len(rows), chunk_size):
+        convert_chunk(rows[start:start + chunk_size], clients, summary)
+        publish_conversion_progress(len(rows), min(start + chunk_size, len(rows)))
+
+    frappe.publish_realtime("lead_conversion_done", summary, user=frappe.session.user)
+    return summary
+
+def convert_chunk(rows, clients, summary):
+    """Convert one chunk of leads and queue the setup of the clients it created"""
+    meta = frappe.get_meta("Lead")
+    fields = [field for field in LEAD_FIELDS if field == "name" or meta.has_field(field)]
+    leads = {lead.name: lead for lead in frappe.get_all("Lead",
+        filters={"name": ["in", [row["lead"] for row in rows]]},
+        fields=fields
+    )}
+    clients.load(leads.values())
+
+    created = []
+    for row in rows:
+        lead = leads.get(row["lead"])
+        if not lead:
+            summary["errors"].append({"lead": row["lead"], "error": _("Lead not found")})
+            continue
+
+        frappe.db.savepoint("lead_conversion")
+        try:
+            client = clients.match(lead)
+            new_client = None if client else create_client(lead, defer_setup=True)
+            create_case(lead, client or new_client.name, row.get("case_title"), row.get("practice_area"))
+        except Exception as e:
+            frappe.db.rollback(save_point="lead_conversion")
+            frappe.clear_messages()
+            summary["errors"].append({"lead": row["lead"], "error": str(e)})
+            continue
+
+        summary["cases_created"] += 1
+        if new_client:
+            # Later leads with the same email or phone reuse this client
+            for phone in [new_client.normalized_mobile, new_client.normalized_phone, *get_lead_phones(lead)]:
+                clients.add(new_client.name, new_client.email, phone)
+            created.append(new_client.name)
+            summary["clients_created"] += 1
+        else:
+            summary["clients_matched"] += 1
+
+    if created:
+        frappe.enqueue(run_client_setup, queue="default", enqueue_after_commit=True, clients=created)
+    frappe.db.commit()
+
+def run_client_setup(clients):
+    """Background job: the after_insert side effects deferred by a bulk conversion"""
+    for name in clients:
+        client = frappe.get_doc("Client", name)
+        client.create_client_folder()
+        client.send_welcome_email()
+        frappe.db.commit()
+
+def publish_conversion_progress(total, done):
+    frappe.publish_realtime("lead_conversion_progress", {"total": total, "done": done}, user=frappe.session.user)
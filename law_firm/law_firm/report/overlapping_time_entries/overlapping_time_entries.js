@@ -0,0 +1,26 @@
+// file: law_firm/law_firm/report/overlapping_time_entries/overlapping_time_entries.js
+
+frappe.query_reports['Overlapping Time Entries'] = {
+    filters: [
+        {
+            fieldname: 'from_date',
+            label: __('From Date'),
+            fieldtype: 'Date',
+            default: frappe.datetime.add_months(frappe.datetime.get_today(), -1),
+            reqd: 1
+        },
+        {
+            fieldname: 'to_date',
+            label: __('To Date'),
+            fieldtype: 'Date',
+            default: frappe.datetime.get_today(),
+            reqd: 1
+        },
+        {
+            fieldname: 'employee',
+            label: __('Attorney'),
+            fieldtype: 'Link',
+            options: 'Employee'
+        }
+    ]
+};
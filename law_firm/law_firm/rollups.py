@@ -0,0 +1,161 @@
+# rollups.py
+"""
+Daily rollup tables behind the firm dashboard.
+
+Submitted Time Entries and Legal Invoices are folded into one row per
+(day, employee, case, client) bucket as they are submitted or cancelled,
+so dashboard queries scan a handful of rows per day instead of every entry.
+"""
+import hashlib
+
+import frappe
+from frappe.utils import flt, getdate, get_first_day, now
+
+TIME_ENTRY_ROLLUP = "Time Entry Rollup"
+INVOICE_ROLLUP = "Legal Invoice Rollup"
+
+# Rows outside archived cases; the base documents of archived cases are no longer in the hot tables
+NOT_ARCHIVED = """(legal_case IS NULL OR legal_case NOT IN (
+    SELECT name FROM `tabLegal Case` WHERE status = 'Archived'
+))"""
+
+
+def rollup_key(*parts):
+    """Deterministic row name for a rollup bucket (mirrored by the SQL in rebuild_rollups)"""
+    return hashlib.sha1("|".join(str(p or "") for p in parts).encode()).hexdigest()
+
+def update_time_entry_rollup(entry, sign=1):
+    """Add (sign=1) or remove (sign=-1) a submitted Time Entry from its daily bucket"""
+    activity_date = getdate(entry.activity_date)
+    apply_to_bucket(TIME_ENTRY_ROLLUP,
+        name=rollup_key(activity_date, entry.employee, entry.legal_case, entry.client),
+        dimensions={
+            "rollup_date": activity_date,
+            "month": get_first_day(activity_date),
+            "employee": entry.employee,
+            "legal_case": entry.legal_case,
+            "client": entry.client
+        },
+        measures={
+            "entry_count": sign,
+            "hours": sign * flt(entry.hours),
+            "billable_hours": sign * flt(entry.billable_hours),
+            "billable_amount": sign * flt(entry.billable_amount)
+        },
+        count_field="entry_count"
+    )
+
+def update_invoice_rollup(invoice, sign=1):
+    """Add (sign=1) or remove (sign=-1) a submitted Legal Invoice from its daily bucket"""
+    invoice_date = getdate(invoice.invoice_date)
+    apply_to_bucket(INVOICE_ROLLUP,
+        name=rollup_key(invoice_date, invoice.legal_case, invoice.client),
+        dimensions={
+            "rollup_date": invoice_date,
+            "month": get_first_day(invoice_date),
+            "legal_case": invoice.legal_case,
+            "client": invoice.client
+        },
+        measures={
+            "invoice_count": sign,
+            "total_billed": sign * flt(invoice.grand_total),
+            "outstanding": sign * flt(invoice.balance_due)
+        },
+        count_field="invoice_count"
+    )
+
+def update_invoice_balance_rollup(invoice):
+    """Carry a change of balance_due on a submitted invoice (e.g. a payment) to its bucket's outstanding"""
+    previous = invoice.get_doc_before_save()
+    delta = flt(invoice.balance_due) - flt(previous.balance_due) if previous else 0
+    if not delta:
+        return
+
+    invoice_date = getdate(invoice.invoice_date)
+    frappe.db.sql(f"""
+        UPDATE `tab{INVOICE_ROLLUP}`
+        SET outstanding = outstanding + %(delta)s, modified = %(now)s
+        WHERE name = %(name)s
+    """, {"delta": delta, "now": now(), "name": rollup_key(invoice_date, invoice.legal_case, invoice.client)})
+
+def apply_to_bucket(doctype, name, dimensions, measures, count_field):
+    """Upsert a bucket row, adding the measures to whatever is already there"""
+    timestamp = now()
+    values = {
+        "name": name,
+        "creation": timestamp,
+        "modified": timestamp,
+        "owner": "Administrator",
+        "modified_by": "Administrator",
+        **dimensions,
+        **measures
+    }
+    columns = ", ".join(f"`{column}`" for column in values)
+    placeholders = ", ".join(f"%({column})s" for column in values)
+    increments = ", ".join(f"`{column}` = `{column}` + VALUES(`{column}`)" for column in measures)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tab{doctype}` ({columns})
+        VALUES ({placeholders})
+        ON DUPLICATE KEY UPDATE {increments}, `modified` = VALUES(`modified`)
+    """, values)
+
+    # Drop buckets whose last document was cancelled so ranges stay dense
+    frappe.db.sql(f"""
+        DELETE FROM `tab{doctype}`
+        WHERE name = %s AND `{count_field}` <= 0
+    """, name)
+
+def rebuild_rollups():
+    """
+    Recompute every rollup bucket from the submitted base documents.
+    Use after bulk imports that bypassed the document hooks, or to repair drift.
+    Buckets of archived cases are kept as they are, since their documents live in the archive files.
+    """
+    timestamp = now()
+
+    frappe.db.sql(f"DELETE FROM `tab{TIME_ENTRY_ROLLUP}` WHERE {NOT_ARCHIVED}")
+    frappe.db.sql(f"""
+        INSERT INTO `tab{TIME_ENTRY_ROLLUP}`
+            (name, creation, modified, owner, modified_by,
+             rollup_date, month, employee, legal_case, client,
+             entry_count, hours, billable_hours, billable_amount)
+        SELECT
+            SHA1(CONCAT_WS('|', activity_date, IFNULL(employee, ''), IFNULL(legal_case, ''), IFNULL(client, ''))),
+            %(now)s, %(now)s, 'Administrator', 'Administrator',
+            activity_date,
+            DATE_FORMAT(activity_date, '%%Y-%%m-01'),
+            employee,
+            legal_case,
+            client,
+            COUNT(*),
+            IFNULL(SUM(hours), 0),
+            IFNULL(SUM(billable_hours), 0),
+            IFNULL(SUM(billable_amount), 0)
+        FROM `tabTime Entry`
+        WHERE docstatus = 1 AND {NOT_ARCHIVED}
+        GROUP BY activity_date, employee, legal_case, client
+    """, {"now": timestamp})
+
+    frappe.db.sql(f"DELETE FROM `tab{INVOICE_ROLLUP}` WHERE {NOT_ARCHIVED}")
+    frappe.db.sql(f"""
+        INSERT INTO `tab{INVOICE_ROLLUP}`
+            (name, creation, modified, owner, modified_by,
+             rollup_date, month, legal_case, client,
+             invoice_count, total_billed, outstanding)
+        SELECT
+            SHA1(CONCAT_WS('|', invoice_date, IFNULL(legal_case, ''), IFNULL(client, ''))),
+            %(now)s, %(now)s, 'Administrator', 'Administrator',
+            invoice_date,
+            DATE_FORMAT(invoice_date, '%%Y-%%m-01'),
+            legal_case,
+            client,
+            COUNT(*),
+            IFNULL(SUM(grand_total), 0),
+            IFNULL(SUM(balance_due), 0)
+        FROM `tabLegal Invoice`
+        WHERE docstatus = 1 AND {NOT_ARCHIVED}
+        GROUP BY invoice_date, legal_case, client
+    """, {"now": timestamp})
+
+    frappe.db.commit()
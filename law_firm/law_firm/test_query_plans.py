@@ -0,0 +1,36 @@
+# test_query_plans.py
+"""
+Regression test for the reporting index set: the dashboard and report
+queries must not fall back to full table scans.
+
+Test tables hold a handful of rows, where the optimizer may scan a table
+whatever indexes exist, so the test checks that every plan can use an index
+(find_unindexed_plans) rather than the size-dependent find_full_scans that
+check-query-plans runs against real data.
+"""
+from frappe.tests.utils import FrappeTestCase
+from law_firm.law_firm.indexes import check_query_plans, find_full_scans, find_unindexed_plans
+
+
+class TestQueryPlans(FrappeTestCase):
+    def test_dashboard_and_report_queries_use_indexes(self):
+        unindexed = check_query_plans(find_unindexed_plans)
+        self.assertEqual(unindexed, [], "\n\n".join(
+            f"{plan['table']} ({plan['type']}, ~{plan['rows']} rows): {plan['query']}" for plan in unindexed))
+
+    def test_unindexed_plan_is_reported(self):
+        # A function around an indexed column leaves the optimizer no index to use
+        unindexed = find_unindexed_plans([("SELECT * FROM `tabClient` WHERE IFNULL(status, '') = %s", ("Active",))])
+        self.assertEqual([plan["table"] for plan in unindexed], ["tabClient"])
+
+    def test_indexed_lookup_is_not_reported_on_a_small_table(self):
+        self.assertEqual(find_unindexed_plans([("SELECT name FROM `tabClient` WHERE status = %s", ("Active",))]), [])
+
+    def test_full_scan_is_reported(self):
+        full_scans = find_full_scans([("SELECT * FROM `tabClient` WHERE IFNULL(status, '') = %s", ("Active",))])
+        self.assertEqual([scan["table"] for scan in full_scans], ["tabClient"])
+        self.assertEqual(full_scans[0]["type"], "ALL")
+
+    def test_tables_outside_the_index_set_are_ignored(self):
+        self.assertEqual(find_full_scans([("SELECT * FROM `tabUser`", ())]), [])
+        self.assertEqual(find_unindexed_plans([("SELECT * FROM `tabUser`", ())]), [])
@@ -0,0 +1,387 @@
+# time_entry_ingest.py
+"""
+Fast path for loading many Time Entries at once.
+
+Instead of one insert() per entry - each with its own Legal Case lookup,
+naming-series update and INSERT - a batch prefetches every referenced case
+in one query, checks the other links with one query per linked doctype, runs the TimeEntry calculations and checks in memory, reserves
+a block of names, and writes the valid rows with multi-row INSERTs. Rows that
+fail validation are reported back instead of aborting the whole batch.
+
+Large files go through Time Entry Import: the file is streamed row by row and
+fed to the same fast path in fixed-size chunks, committing the chunk together
+with the import's checkpoint so a crashed job resumes where it stopped.
+
+Integrations that retry on timeouts use ingest_time_entries: every entry
+carries an idempotency key backed by a unique index, and keys that were
+already stored return the original Time Entry instead of a duplicate.
+"""
+import csv
+import json
+from itertools import islice
+
+import frappe
+from frappe import _
+from frappe.model.naming import parse_naming_series
+from frappe.utils import now
+from law_firm.law_firm.dashboard_cache import SECTION_DEPENDENCIES, invalidate_sections
+from law_firm.law_firm.time_overlaps import find_batch_overlaps, get_overlap_message
+
+INSERT_BATCH_SIZE = 500
+NAME_DIGITS = 5
+MAX_LOGGED_ERRORS = 500
+MAX_DUPLICATE_RETRIES = 3
+IMPORT_JOB_TIMEOUT = 6 * 60 * 60
+
+
+def insert_time_entries(entries):
+    """
+    Validate and insert Time Entry drafts in bulk.
+    Returns {"created": [names], "errors": [{"row": index, "error": message}]}, rows indexed from 0.
+    """
+    frappe.has_permission("Time Entry", "create", throw=True)
+
+    cases = get_cases({entry.get("legal_case") for entry in entries})
+    built, errors = [], []
+
+    for row, entry_data in enumerate(entries):
+        try:
+            built.append((row, build_time_entry(entry_data, cases)))
+        except frappe.ValidationError as e:
+            errors.append({"row": row, "error": str(e)})
+
+    # Links are checked for the whole batch with one query per linked doctype, as insert() would reject them
+    links = get_existing_links([doc for _row, doc in built])
+    linked = []
+    for row, doc in built:
+        missing = get_missing_link(doc, links)
+        if missing:
+            errors.append({"row": row, "error": missing})
+        else:
+            linked.append((row, doc))
+    built = linked
+
+    # Overlaps are checked for the whole batch at once, against stored entries and each other
+    overlaps = find_batch_overlaps([doc for _row, doc in built])
+    valid_docs = []
+    for position, (row, doc) in enumerate(built):
+        if position in overlaps:
+            errors.append({"row": row, "error": get_overlap_message(overlaps[position])})
+        else:
+            valid_docs.append(doc)
+    errors.sort(key=lambda error: error["row"])
+
+    assign_names(valid_docs)
+    write_time_entries(valid_docs)
+
+    if valid_docs:
+        sections = SECTION_DEPENDENCIES["Time Entry"]
+        frappe.db.after_commit.add(lambda: invalidate_sections(sections))
+
+    return {"created": [doc.name for doc in valid_docs], "errors": errors}
+
+def get_cases(case_names):
+    """Map every referenced Legal Case to its client, practice area and status in a single query"""
+    case_names = [name for name in case_names if name]
+    if not case_names:
+        return {}
+    return {case.name: case for case in frappe.get_all("Legal Case",
+        filters={"name": ["in", case_names]},
+        fields=["name", "client", "practice_area", "status"]
+    )}
+
+def get_link_fields():
+    """Time Entry Link fields checked in bulk; legal_case is checked against the prefetched cases"""
+    return [df for df in frappe.get_meta("Time Entry").get_link_fields() if df.fieldname != "legal_case"]
+
+def get_existing_links(docs):
+    """Map each linked doctype to the names the documents reference that exist, in one query per doctype"""
+    referenced = {}
+    for df in get_link_fields():
+        for doc in docs:
+            if doc.get(df.fieldname):
+                referenced.setdefault(df.options, set()).add(doc.get(df.fieldname))
+
+    return {doctype: set(frappe.get_all(doctype, filters={"name": ["in", list(names)]}, pluck="name"))
+        for doctype, names in referenced.items()}
+
+def get_missing_link(doc, links):
+    """The LinkValidationError message insert() would raise for the document's first missing link, if any"""
+    for df in get_link_fields():
+        value = doc.get(df.fieldname)
+        if value and value not in links.get(df.options, ()):
+            return _("Could not find {0}: {1}").format(_(df.label), value)
+
+def build_time_entry(entry_data, cases):
+    """
+    Run the TimeEntry insert-time logic on an in-memory document.
+    Raises frappe.ValidationError for rows that insert() would have rejected.
+    """
+    doc = frappe.new_doc("Time Entry")
+    doc.update(entry_data)
+    # Values from files and JSON arrive as strings; cast numeric and check fields like a form save would
+    doc._fix_numeric_types()
+
+    if doc.legal_case and doc.legal_case not in cases:
+        frappe.throw(_("Legal Case {0} not found").format(doc.legal_case), frappe.LinkValidationError)
+
+    # Pre-set what TimeEntry would look up on the case; rates then resolve from the cached rate table
+    case = cases.get(doc.legal_case) or {}
+    if not doc.client:
+        doc.client = case.get("client")
+    doc.flags.practice_area = case.get("practice_area") or ""
+    doc.flags.case_status = case.get("status")
+    # insert_time_entries checks overlaps for the whole batch with one query
+    doc.flags.skip_overlap_check = True
+
+    # frappe.throw also queues a message for the user; row errors are reported in the response instead
+    message_count = len(frappe.local.message_log)
+    try:
+        doc.before_insert()
+        doc.before_validate()
+        doc._validate_mandatory()
+        doc._validate_selects()
+        doc.validate()
+    finally:
+        del frappe.local.message_log[message_count:]
+
+    return doc
+
+def assign_names(docs):
+    """Give each document a name from its naming series, reserving one block of numbers per series"""
+    by_prefix = {}
+    for doc in docs:
+        by_prefix.setdefault(parse_naming_series(doc.naming_series), []).append(doc)
+
+    for prefix, prefix_docs in by_prefix.items():
+        first = reserve_series(prefix, len(prefix_docs))
+        for offset, doc in enumerate(prefix_docs):
+            doc.name = f"{prefix}{str(first + offset).zfill(NAME_DIGITS)}"
+
+def reserve_series(prefix, count):
+    """Advance a naming series by `count` and return the first number of the reserved block"""
+    frappe.db.sql("""
+        INSERT INTO `tabSeries` (name, current) VALUES (%s, 0)
+        ON DUPLICATE KEY UPDATE name = name
+    """, prefix)
+    current = frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %s FOR UPDATE", prefix)[0][0]
+    frappe.db.sql("UPDATE `tabSeries` SET current = current + %s WHERE name = %s", (count, prefix))
+    return current + 1
+
+def write_time_entries(docs):
+    """Write validated Time Entry documents with multi-row INSERTs"""
+    if not docs:
+        return
+
+    timestamp, user = now(), frappe.session.user
+    rows = []
+    for doc in docs:
+        doc.owner = doc.modified_by = user
+        doc.creation = doc.modified = timestamp
+        doc.docstatus = 0
+        rows.append(doc.get_valid_dict(convert_dates_to_str=True))
+
+    fields = list(rows[0])
+    frappe.db.bulk_insert("Time Entry",
+        fields=fields,
+        values=[tuple(row.get(field) for field in fields) for row in rows],
+        chunk_size=INSERT_BATCH_SIZE
+    )
+
+@frappe.whitelist()
+def ingest_time_entries(entries_json):
+    """
+    Retry-safe bulk insert. Each entry needs an "idempotency_key"; entries whose key was
+    already ingested are no-ops that return the original Time Entry name.
+    Returns {"results": [{"idempotency_key", "name", "status", "error"}]} in request order,
+    status being "created", "duplicate" or "error".
+    """
+    entries = json.loads(entries_json) if isinstance(entries_json, str) else entries_json
+    result = ingest_with_keys(entries)
+    frappe.db.commit()
+    return result
+
+def ingest_with_keys(entries):
+    """Insert the entries whose idempotency key is new; resolve the rest to their existing names"""
+    results = [{"idempotency_key": str(entry.get("idempotency_key") or "").strip() or None} for entry in entries]
+    for result in results:
+        if not result["idempotency_key"]:
+            result.update({"status": "error", "error": _("Idempotency Key is required")})
+
+    for attempt in range(MAX_DUPLICATE_RETRIES):
+        existing = get_existing_keys({r["idempotency_key"] for r in results if r["idempotency_key"]})
+
+        # First occurrence of each unseen key is inserted; repeats in the same request reuse its result
+        pending = {}
+        for row, result in enumerate(results):
+            key = result["idempotency_key"]
+            if not key or result.get("status") == "error":
+                continue
+            if key in existing:
+                result.update({"name": existing[key], "status": result.get("status") or "duplicate"})
+            elif key not in pending:
+                pending[key] = row
+
+        if not pending:
+            break
+
+        frappe.db.savepoint("ingest_time_entries")
+        try:
+            inserted = insert_time_entries([
+                {**entries[row], "idempotency_key": key} for key, row in pending.items()
+            ])
+        except Exception as e:
+            # A concurrent request stored one of these keys first; undo this batch and resolve it again
+            if not frappe.db.is_duplicate_entry(e) or attempt == MAX_DUPLICATE_RETRIES - 1:
+                raise
+            frappe.db.rollback(save_point="ingest_time_entries")
+            continue
+
+        # insert_time_entries reports errors by position and returns created names in input order
+        rows = list(pending.values())
+        created_rows = set(range(len(rows))) - {error["row"] for error in inserted["errors"]}
+        for position, name in zip(sorted(created_rows), inserted["created"]):
+            results[rows[position]].update({"name": name, "status": "created"})
+        for error in inserted["errors"]:
+            results[rows[error["row"]]].update({"status": "error", "error": error["error"]})
+
+        # Later repeats of a key take the outcome of its first occurrence
+        outcome = {results[row]["idempotency_key"]: results[row] for row in rows}
+        for result in results:
+            first = outcome.get(result["idempotency_key"])
+            if first and result is not first and not result.get("status"):
+                result.update({
+                    "name": first.get("name"),
+                    "status": "duplicate" if first["status"] == "created" else first["status"],
+                    "error": first.get("error")
+                })
+        break
+
+    return {"results": results}
+
+def get_existing_keys(keys):
+    """Map already-ingested idempotency keys to their Time Entry names in one indexed query"""
+    if not keys:
+        return {}
+    return dict(frappe.get_all("Time Entry",
+        filters={"idempotency_key": ["in", list(keys)]},
+        fields=["idempotency_key", "name"],
+        as_list=True
+    ))
+
+@frappe.whitelist()
+def start_time_entry_import(import_name):
+    """Queue a Time Entry Import, or resume one that was interrupted"""
+    job = frappe.get_doc("Time Entry Import", import_name)
+    job.check_permission("write")
+
+    if job.status == "Completed":
+        frappe.throw(_("Time Entry Import {0} has already completed").format(import_name))
+
+    job.db_set("status", "Queued")
+    frappe.enqueue(run_time_entry_import,
+        queue="long",
+        timeout=IMPORT_JOB_TIMEOUT,
+        job_id=f"time_entry_import::{import_name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        import_name=import_name
+    )
+
+def run_time_entry_import(import_name):
+    """Background job: stream the import file and insert it chunk by chunk"""
+    job = frappe.get_doc("Time Entry Import", import_name)
+    if job.status == "Completed":
+        return
+
+    path = frappe.get_doc("File", {"file_url": job.import_file}).get_full_path()
+    job.db_set({"status": "In Progress", "started_at": job.started_at or now()}, commit=True)
+    if not job.total_rows:
+        job.db_set("total_rows", count_file_rows(path), commit=True)
+
+    errors = json.loads(job.import_errors or "[]")
+    # Rows up to the checkpoint were committed by an earlier run; skip past them
+    rows = islice(iter_file_rows(path), job.rows_processed, None)
+
+    try:
+        while True:
+            chunk = list(islice(rows, job.chunk_size))
+            if not chunk:
+                break
+
+            created, chunk_errors = import_chunk(chunk, first_row=job.rows_processed + 1)
+            errors = (errors + chunk_errors)[:MAX_LOGGED_ERRORS]
+
+            # The checkpoint is committed in the same transaction as the chunk it covers
+            job.db_set({
+                "rows_processed": job.rows_processed + len(chunk),
+                "entries_created": job.entries_created + created,
+                "errors_count": job.errors_count + len(chunk_errors),
+                "import_errors": json.dumps(errors, indent=1)
+            }, update_modified=False)
+            frappe.db.commit()
+            publish_import_progress(job)
+    except Exception:
+        frappe.db.rollback()
+        job.db_set("status", "Failed", commit=True)
+        job.log_error("Time Entry Import failed")
+        raise
+
+    job.db_set({"status": "Completed", "finished_at": now()}, commit=True)
+    publish_import_progress(job)
+
+def import_chunk(chunk, first_row):
+    """
+    Insert one chunk of file rows through the bulk fast path.
+    Returns (entries created, errors keyed by 1-based file row number).
+    """
+    positions, entries, errors = [], [], []
+    for offset, row in enumerate(chunk):
+        if isinstance(row, dict):
+            positions.append(first_row + offset)
+            entries.append(row)
+        else:
+            errors.append({"row": first_row + offset, "error": row})
+
+    result = insert_time_entries(entries)
+    errors += [{"row": positions[error["row"]], "error": error["error"]} for error in result["errors"]]
+    errors.sort(key=lambda error: error["row"])
+
+    return len(result["created"]), errors
+
+def iter_file_rows(path):
+    """
+    Yield the rows of a CSV or JSON Lines file one at a time.
+    Lines that cannot be parsed are yielded as an error message string so they keep their position.
+    """
+    if path.lower().endswith(".jsonl"):
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield _("Invalid JSON: {0}").format(e)
+                    continue
+                yield row if isinstance(row, dict) else _("Each line must be a JSON object")
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                # Empty cells mean "not set", not an empty string value
+                yield {fieldname: value for fieldname, value in row.items() if fieldname and value != ""}
+
+def count_file_rows(path):
+    """Count the data rows of an import file without holding it in memory"""
+    return sum(1 for _row in iter_file_rows(path))
+
+def publish_import_progress(job):
+    """Push the import's progress to anyone watching the document"""
+    frappe.publish_realtime("time_entry_import_progress", {
+        "name": job.name,
+        "status": job.status,
+        "total_rows": job.total_rows,
+        "rows_processed": job.rows_processed,
+        "entries_created": job.entries_created,
+        "errors_count": job.errors_count
+    }, doctype=job.doctype, docname=job.name, user=job.owner)
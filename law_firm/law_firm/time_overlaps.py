@@ -0,0 +1,129 @@
+# time_overlaps.py
+"""
+Overlapping Time Entry detection.
+
+A Time Entry covers [activity_date + from_time, activity_date + to_time),
+running into the next day when to_time is earlier than from_time. Single
+saves look up the attorney's neighbouring entries through the
+(employee, activity_date, from_time) index; batches and the audit report
+sort entries by (employee, start) and sweep them once, keeping only the
+entry that reaches furthest so far, instead of comparing every pair.
+"""
+from datetime import datetime, time
+
+import frappe
+from frappe import _
+from frappe.utils import getdate, to_timedelta, add_days
+
+
+def get_interval(activity_date, from_time, to_time):
+    """(start, end) datetimes covered by an entry, or None when it has no time range"""
+    if not (activity_date and from_time and to_time):
+        return None
+
+    day = datetime.combine(getdate(activity_date), time.min)
+    start = day + to_timedelta(from_time)
+    end = day + to_timedelta(to_time)
+    if end < start:
+        end = add_days(end, 1)
+    return (start, end) if end > start else None
+
+def find_overlapping_entry(doc):
+    """Name of another active entry of the same attorney overlapping `doc`, if any"""
+    interval = get_interval(doc.activity_date, doc.from_time, doc.to_time)
+    if not interval or not doc.employee:
+        return None
+
+    # An entry can only reach into the next day, so neighbours start the day before at the earliest
+    activity_date = getdate(doc.activity_date)
+    candidates = frappe.db.sql("""
+        SELECT name, activity_date, from_time, to_time
+        FROM `tabTime Entry`
+        WHERE employee = %(employee)s
+        AND activity_date BETWEEN %(from_date)s AND %(to_date)s
+        AND docstatus < 2
+        AND name != %(name)s
+    """, {
+        "employee": doc.employee,
+        "from_date": add_days(activity_date, -1),
+        "to_date": add_days(activity_date, 1),
+        "name": doc.name or ""
+    }, as_dict=True)
+
+    start, end = interval
+    for candidate in candidates:
+        other = get_interval(candidate.activity_date, candidate.from_time, candidate.to_time)
+        if other and other[0] < end and start < other[1]:
+            return candidate.name
+    return None
+
+def sweep_overlaps(entries):
+    """
+    Yield (earlier, later) pairs of overlapping entries from entries sorted by (employee, start).
+    Each entry that overlaps an earlier one is reported once, paired with the earlier entry
+    reaching furthest. Entries are dicts with employee, start and end.
+    """
+    current_employee, furthest = None, None
+    for entry in entries:
+        if entry["employee"] != current_employee:
+            current_employee, furthest = entry["employee"], None
+
+        if furthest and entry["start"] < furthest["end"]:
+            yield furthest, entry
+
+        if not furthest or entry["end"] > furthest["end"]:
+            furthest = entry
+
+def find_batch_overlaps(docs):
+    """
+    Map the position of every new document that overlaps a stored entry or another document
+    of the batch to the name of the stored entry it overlaps (None for a batch document).
+    One query for the whole batch.
+    """
+    new_entries = []
+    for position, doc in enumerate(docs):
+        interval = get_interval(doc.activity_date, doc.from_time, doc.to_time)
+        if interval and doc.employee:
+            new_entries.append({"employee": doc.employee, "start": interval[0], "end": interval[1],
+                "position": position, "name": doc.name})
+
+    if not new_entries:
+        return {}
+
+    dates = [getdate(docs[entry["position"]].activity_date) for entry in new_entries]
+    stored = frappe.db.sql("""
+        SELECT name, employee, activity_date, from_time, to_time
+        FROM `tabTime Entry`
+        WHERE employee IN %(employees)s
+        AND activity_date BETWEEN %(from_date)s AND %(to_date)s
+        AND docstatus < 2
+    """, {
+        "employees": tuple({entry["employee"] for entry in new_entries}),
+        "from_date": add_days(min(dates), -1),
+        "to_date": add_days(max(dates), 1)
+    }, as_dict=True)
+
+    entries = list(new_entries)
+    for row in stored:
+        interval = get_interval(row.activity_date, row.from_time, row.to_time)
+        if interval:
+            entries.append({"employee": row.employee, "start": interval[0], "end": interval[1],
+                "position": None, "name": row.name})
+
+    # Stored entries sort ahead of new ones starting at the same time, so they win the pairing
+    entries.sort(key=lambda entry: (entry["employee"], entry["start"], entry["position"] is not None))
+
+    overlaps = {}
+    for earlier, later in sweep_overlaps(entries):
+        # Blame the new document of the pair; two stored entries overlapping is not this batch's problem
+        if later["position"] is not None:
+            overlaps.setdefault(later["position"], earlier["name"])
+        elif earlier["position"] is not None:
+            overlaps.setdefault(earlier["position"], later["name"])
+    return overlaps
+
+def get_overlap_message(other_name):
+    """User-facing error for an entry overlapping `other_name` (None: another entry of the same batch)"""
+    if other_name:
+        return _("This entry overlaps Time Entry {0} logged by the same attorney").format(other_name)
+    return _("This entry overlaps another entry of the same attorney in this batch")
@@ -0,0 +1,138 @@
+# timeline.py
+"""
+Case timeline across time entries, court hearings, documents and invoices.
+
+Each source is read in (date, name) order through a (legal_case, date)
+index, fetching just one page past the cursor, and the per-source pages are
+k-way merged on (date, source, name). A page of a case with tens of
+thousands of rows therefore costs one small indexed read per source, and
+the last item's key is the keyset cursor for the next page.
+"""
+import heapq
+
+import frappe
+from frappe import _
+from frappe.utils import cint, get_datetime
+
+MAX_TIMELINE_PAGE = 200
+
+# Merge order of sources sharing a timestamp follows this list
+TIMELINE_SOURCES = [
+    {
+        "doctype": "Time Entry",
+        "date_field": "activity_date",
+        "fields": ["employee", "activity_type", "hours"],
+        "conditions": ["docstatus = 1"]
+    },
+    {
+        "doctype": "Court Hearing",
+        "date_field": "hearing_date",
+        "fields": ["hearing_type", "status"],
+        "conditions": ["hearing_date IS NOT NULL"]
+    },
+    {
+        "doctype": "Legal Document",
+        "date_field": "creation",
+        "fields": ["document_name", "document_type", "author"],
+        "conditions": []
+    },
+    {
+        "doctype": "Legal Invoice",
+        "date_field": "invoice_date",
+        "fields": ["grand_total", "status"],
+        "conditions": ["docstatus = 1"]
+    }
+]
+
+
+@frappe.whitelist()
+def get_case_timeline(legal_case, cursor=None, limit=50, descending=0):
+    """
+    One page of a case's timeline, oldest first (newest first with descending=1).
+    Returns {"timeline": [...], "next_cursor": cursor or None}.
+    """
+    frappe.has_permission("Legal Case", "read", legal_case, throw=True)
+    return get_timeline_page(legal_case, cursor, limit, cint(descending))
+
+def get_timeline_page(legal_case, cursor=None, limit=50, descending=False):
+    """Merge one page from every source, starting after the cursor"""
+    limit = min(cint(limit) or 50, MAX_TIMELINE_PAGE)
+    after = parse_cursor(cursor) if cursor else None
+
+    streams = [
+        fetch_source(rank, source, legal_case, after, limit + 1, descending)
+        for rank, source in enumerate(TIMELINE_SOURCES)
+    ]
+    merged = heapq.merge(*streams, key=lambda item: item["key"], reverse=descending)
+    page = [item for _i, item in zip(range(limit + 1), merged)]
+
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    return {
+        "timeline": [item["entry"] for item in page],
+        "next_cursor": make_cursor(page[-1]["key"]) if has_more else None
+    }
+
+def fetch_source(rank, source, legal_case, after, limit, descending):
+    """Up to `limit` rows of one source after the cursor, in merge order"""
+    date_field = source["date_field"]
+    comparison, order = ("<", "DESC") if descending else (">", "ASC")
+    values = {"legal_case": legal_case, "limit": limit}
+    conditions = ["legal_case = %(legal_case)s", *source["conditions"]]
+
+    if after:
+        cursor_time, cursor_rank, cursor_name = after
+        values.update({"cursor_time": cursor_time, "cursor_name": cursor_name})
+        # Sources ranked before the cursor's source have already been read at the cursor timestamp
+        source_is_after = rank < cursor_rank if descending else rank > cursor_rank
+        if source_is_after:
+            conditions.append(f"{date_field} {comparison}= %(cursor_time)s")
+        elif rank == cursor_rank:
+            conditions.append(f"""({date_field} {comparison} %(cursor_time)s
+                OR ({date_field} = %(cursor_time)s AND name {comparison} %(cursor_name)s))""")
+        else:
+            conditions.append(f"{date_field} {comparison} %(cursor_time)s")
+
+    rows = frappe.db.sql(f"""
+        SELECT name, {date_field} AS timeline_date, {', '.join(source['fields'])}
+        FROM `tab{source['doctype']}`
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {date_field} {order}, name {order}
+        LIMIT %(limit)s
+    """, values, as_dict=True)
+
+    return [{
+        "key": (get_datetime(row.timeline_date), rank, row.name),
+        "entry": format_entry(source["doctype"], row)
+    } for row in rows]
+
+def format_entry(doctype, row):
+    """Shape a source row as a timeline entry"""
+    if doctype == "Time Entry":
+        title, author = f"Logged {row.hours} hours for {row.activity_type}", row.employee
+    elif doctype == "Court Hearing":
+        title, author = f"{row.hearing_type} ({row.status})", None
+    elif doctype == "Legal Document":
+        title, author = f"{row.document_type or 'Document'}: {row.document_name}", row.author
+    else:
+        title, author = f"Invoice {row.name} for {row.grand_total} ({row.status})", None
+
+    return {
+        "type": doctype,
+        "date": row.timeline_date,
+        "title": title,
+        "author": author,
+        "link": f"/app/{frappe.scrub(doctype).replace('_', '-')}/{row.name}"
+    }
+
+def make_cursor(key):
+    timestamp, rank, name = key
+    return f"{timestamp}|{rank}|{name}"
+
+def parse_cursor(cursor):
+    try:
+        timestamp, rank, name = cursor.split("|", 2)
+        return get_datetime(timestamp), cint(rank), name
+    except ValueError:
+        frappe.throw(_("Invalid timeline cursor"))
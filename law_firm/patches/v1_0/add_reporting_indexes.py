@@ -0,0 +1,9 @@
+from law_firm.law_firm.indexes import ensure_reporting_indexes
+
+
+def execute():
+    """
+    Add the managed reporting index set (indexes.REPORTING_INDEXES), skipping existing indexes.
+    Bump this patch's entry in patches.txt whenever the set changes.
+    """
+    ensure_reporting_indexes()
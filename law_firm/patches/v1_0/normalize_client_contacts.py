@@ -0,0 +1,15 @@
+import frappe
+from law_firm.law_firm.lead_conversion import normalize_email, normalize_phone
+
+
+def execute():
+    """Normalize existing client emails and phones so lead conversion can match them"""
+    for client in frappe.get_all("Client",
+            fields=["name", "email", "mobile", "phone", "normalized_mobile", "normalized_phone"]):
+        email = normalize_email(client.email)
+        mobile = normalize_phone(client.mobile)
+        phone = normalize_phone(client.phone)
+        if (email, mobile, phone) != (client.email, client.normalized_mobile, client.normalized_phone):
+            frappe.db.sql("""
+                UPDATE `tabClient` SET email = %s, normalized_mobile = %s, normalized_phone = %s WHERE name = %s
+            """, (email, mobile, phone, client.name))
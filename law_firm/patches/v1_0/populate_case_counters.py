@@ -0,0 +1,6 @@
+from law_firm.law_firm.case_counters import reconcile_case_counters
+
+
+def execute():
+    """Fill the new Legal Case counters from existing time entries, invoices, documents and hearings"""
+    reconcile_case_counters()
@@ -0,0 +1,6 @@
+from law_firm.law_firm.deadlines import rebuild_deadlines
+
+
+def execute():
+    """Fill the Case Deadline calendar from existing cases and hearings"""
+    rebuild_deadlines()
@@ -0,0 +1,10 @@
+import frappe
+from frappe.utils import today
+from law_firm.law_firm.hearing_reminders import sync_hearing_reminders
+
+
+def execute():
+    """Arm the reminders of every upcoming hearing"""
+    for name in frappe.get_all("Court Hearing", filters={"hearing_date": [">=", today()]}, pluck="name"):
+        sync_hearing_reminders(frappe.get_doc("Court Hearing", name))
+    frappe.db.commit()
@@ -0,0 +1,6 @@
+from law_firm.law_firm.invoice_aging import refresh_invoice_aging
+
+
+def execute():
+    """Compute invoice aging for the first time"""
+    refresh_invoice_aging()
@@ -17,7 +17,18 @@ frappe.ui.form.on('Legal Case', {
         frm.trigger('billing_method');
 
         // Add custom buttons to the toolbar for quick actions
-        if (!frm.is_new() && frm.doc.name) {
+        if (frm.doc.status === 'Archived') {
+            // Records of an archived case live in its archive file until it is restored
+            frm.add_custom_button(__('Restore from Archive'), function() {
+                frappe.call({
+                    method: 'law_firm.law_firm.case_archive.rehydrate_case',
+                    args: { legal_case: frm.doc.name },
+                    callback: function() {
+                        frappe.show_alert({ message: __('Restore queued'), indicator: 'blue' });
+                    }
+                });
+            });
+        } else if (!frm.is_new() && frm.doc.name) {
             // Button to create a new Time Entry linked to this case
             frm.add_custom_button(__('Log Time'), function() {
                 frappe.new_doc('Time Entry', {
@@ -71,14 +82,28 @@ frappe.ui.form.on('Legal Case', {
     },
 
     client: function(frm) {
-        // When a client is selected, fetch their standard billing rate if it exists
-        if (frm.doc.client) {
-            frappe.db.get_value('Client', frm.doc.client, 'billing_rate')
-                .then(r => {
-                    if (r.message && r.message.billing_rate) {
-                        frm.set_value('hourly_rate', r.message.billing_rate);
-                    }
-                });
+        // When a client is selected, default the hourly rate from the Billing Rate table
+        frm.trigger('set_default_hourly_rate');
+    },
+
+    practice_area: function(frm) {
+        frm.trigger('set_default_hourly_rate');
+    },
+
+    set_default_hourly_rate: function(frm) {
+        if (!frm.doc.client || frm.doc.hourly_rate) {
+            return;
         }
+        frappe.call({
+            method: 'law_firm.law_firm.billing_rates.get_billing_rate',
+            args: {
+                client: frm.doc.client,
+                practice_area: frm.doc.practice_area
+            }
+        }).then(r => {
+            if (r.message) {
+                frm.set_value('hourly_rate', r.message);
+            }
+        });
     }
 });
\ No newline at end of file
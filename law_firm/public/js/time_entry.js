@@ -105,7 +105,6 @@ frappe.ui.form.on('Time Entry', {
     billable: function(frm) {
         // Show/hide and make fields required based on 'Billable' checkbox.
         frm.toggle_display(['billing_rate', 'billable_hours', 'billable_amount'], frm.doc.billable);
-        frm.toggle_reqd('billing_rate', frm.doc.billable);
         frm.toggle_reqd('billable_hours', frm.doc.billable);
 
         if (frm.doc.billable) {
@@ -113,6 +112,9 @@ frappe.ui.form.on('Time Entry', {
             if (!frm.doc.billable_hours) {
                 frm.set_value('billable_hours', frm.doc.hours || 0);
             }
+            if (!frm.doc.billing_rate) {
+                frm.trigger('set_default_billing_rate');
+            }
             frm.trigger('calculate_billable_amount'); // Recalculate when billable status changes
         } else {
             // Clear values if not billable
@@ -122,6 +124,24 @@ frappe.ui.form.on('Time Entry', {
         }
     },
 
+    set_default_billing_rate: function(frm) {
+        // Look up the rate the server would apply from the Billing Rate table
+        frappe.call({
+            method: 'law_firm.law_firm.billing_rates.get_billing_rate',
+            args: {
+                employee: frm.doc.employee,
+                legal_case: frm.doc.legal_case,
+                client: frm.doc.client,
+                activity_type: frm.doc.activity_type,
+                date: frm.doc.activity_date
+            }
+        }).then(r => {
+            if (r.message && !frm.doc.billing_rate) {
+                frm.set_value('billing_rate', r.message);
+            }
+        });
+    },
+
     billing_rate: function(frm) {
         // Recalculate billable amount when 'Billing Rate' changes.
         frm.trigger('calculate_billable_amount');
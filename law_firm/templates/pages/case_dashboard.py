@@ -0,0 +1,32 @@
+# case_dashboard.py
+import frappe
+from frappe import _
+
+no_cache = 1
+
+CASE_HEADER_FIELDS = ["name", "case_title", "client", "practice_area", "status", "total_hours",
+    "billable_hours", "billed_amount", "outstanding_amount", "document_count", "hearing_count"]
+
+
+def get_context(context):
+    """Case header and metrics from the case row's maintained counters, without aggregating its records"""
+    name = frappe.form_dict.case or frappe.form_dict.name
+    if not name or not frappe.has_permission("Legal Case", "read", name):
+        raise frappe.PermissionError(_("Not permitted to view this case"))
+
+    case = frappe.db.get_value("Legal Case", name, CASE_HEADER_FIELDS, as_dict=True)
+    if not case:
+        raise frappe.DoesNotExistError(_("Legal Case {0} not found").format(name))
+
+    context.case = frappe._dict(case, case_number=case.name, case_status=case.status)
+    context.summary = frappe._dict(
+        total_hours=case.total_hours or 0,
+        billable_hours=case.billable_hours or 0,
+        billed_amount=case.billed_amount or 0,
+        outstanding_amount=case.outstanding_amount or 0,
+        documents_count=case.document_count or 0,
+        hearing_count=case.hearing_count or 0,
+        pending_tasks=frappe.db.count("ToDo",
+            {"reference_type": "Legal Case", "reference_name": case.name, "status": "Open"})
+    )
+    return context